@@ -2,7 +2,7 @@ import { useAtom, useAtomValue, useSetAtom } from "jotai"
 import { bankRecRecordJournalEntryModalAtom, bankRecSelectedTransactionAtom, bankRecUnreconcileModalAtom, selectedBankAccountAtom } from "./bankRecAtoms"
 import { Dialog, DialogContent, DialogTitle, DialogDescription, DialogHeader, DialogFooter, DialogClose } from "@/components/ui/dialog"
 import _ from "@/lib/translate"
-import { UnreconciledTransaction, useGetRuleForTransaction, useRefreshUnreconciledTransactions, useUpdateActionLog } from "./utils"
+import { showReconciliationJobErrors, UnreconciledTransaction, useGetRuleForTransaction, useIdempotencyKey, useRefreshUnreconciledTransactions, useUpdateActionLog, useWaitForReconciliationJob } from "./utils"
 import { useFieldArray, useForm, useFormContext, useWatch } from "react-hook-form"
 import { JournalEntry } from "@/types/Accounts/JournalEntry"
 import { getCompanyCostCenter, getCompanyCurrency } from "@/lib/company"
@@ -79,7 +79,11 @@ const BulkBankEntryForm = ({ selectedTransactions }: { selectedTransactions: Unr
         }
     })
 
-    const { call, loading, error } = useFrappePostCall<{ message: { transaction: BankTransaction, journal_entry: JournalEntry }[] }>('mint.apis.bank_reconciliation.create_bulk_bank_entry_and_reconcile')
+    const { call, loading: isEnqueuing, error } = useFrappePostCall<{ message: { job: string } }>('mint.apis.bank_reconciliation.create_bulk_bank_entry_and_reconcile')
+
+    const { waitForJob, isWaiting } = useWaitForReconciliationJob<JournalEntry>()
+
+    const loading = isEnqueuing || isWaiting
 
     const onReconcile = useRefreshUnreconciledTransactions()
     const addToActionLog = useUpdateActionLog()
@@ -91,29 +95,33 @@ const BulkBankEntryForm = ({ selectedTransactions }: { selectedTransactions: Unr
         call({
             bank_transactions: selectedTransactions.map(transaction => transaction.name),
             account: data.account
-        }).then(({ message }) => {
-
-            addToActionLog({
-                type: 'bank_entry',
-                timestamp: (new Date()).getTime(),
-                isBulk: true,
-                items: message.map((item) => ({
-                    bankTransaction: item.transaction,
-                    voucher: {
-                        reference_doctype: "Journal Entry",
-                        reference_name: item.journal_entry.name,
-                        doc: item.journal_entry,
-                        posting_date: item.journal_entry.posting_date,
+        }).then(({ message }) => waitForJob(message.job)).then((result) => {
+
+            if (result.items.length > 0) {
+                addToActionLog({
+                    type: 'bank_entry',
+                    timestamp: (new Date()).getTime(),
+                    isBulk: true,
+                    items: result.items.map((item) => ({
+                        bankTransaction: item.transaction,
+                        voucher: {
+                            reference_doctype: "Journal Entry",
+                            reference_name: item.voucher.name,
+                            doc: item.voucher,
+                            posting_date: item.voucher.posting_date,
+                        }
+                    })),
+                    bulkCommonData: {
+                        account: data.account,
                     }
-                })),
-                bulkCommonData: {
-                    account: data.account,
-                }
-            })
+                })
 
-            toast.success(_("Bank Entries Created"), {
-                duration: 4000,
-            })
+                toast.success(_("Bank Entries Created"), {
+                    duration: 4000,
+                })
+            }
+
+            showReconciliationJobErrors(result)
 
             // Set this to the last selected transaction
             onReconcile(selectedTransactions[selectedTransactions.length - 1])
@@ -296,6 +304,8 @@ const BankEntryForm = ({ selectedTransaction }: { selectedTransaction: Unreconci
 
     const onReconcile = useRefreshUnreconciledTransactions()
 
+    const idempotencyKey = useIdempotencyKey(selectedTransaction.name)
+
     const { call: createBankEntry, loading, error, isCompleted } = useFrappePostCall<{ message: { transaction: BankTransaction, journal_entry: JournalEntry } }>('mint.apis.bank_reconciliation.create_bank_entry_and_reconcile')
 
     const setBankRecUnreconcileModalAtom = useSetAtom(bankRecUnreconcileModalAtom)
@@ -312,6 +322,7 @@ const BankEntryForm = ({ selectedTransaction }: { selectedTransaction: Unreconci
 
         createBankEntry({
             bank_transaction_name: selectedTransaction.name,
+            idempotency_key: idempotencyKey,
             ...data
         }).then(async ({ message }) => {
 
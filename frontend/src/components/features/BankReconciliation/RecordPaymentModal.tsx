@@ -2,7 +2,7 @@ import { atom, useAtom, useAtomValue, useSetAtom } from "jotai"
 import { bankRecRecordPaymentModalAtom, bankRecSelectedTransactionAtom, bankRecUnreconcileModalAtom, SelectedBank, selectedBankAccountAtom } from "./bankRecAtoms"
 import { Dialog, DialogContent, DialogTitle, DialogDescription, DialogHeader, DialogFooter, DialogClose, DialogTrigger } from "@/components/ui/dialog"
 import _ from "@/lib/translate"
-import { UnreconciledTransaction, useGetRuleForTransaction, useRefreshUnreconciledTransactions, useUpdateActionLog } from "./utils"
+import { showReconciliationJobErrors, UnreconciledTransaction, useGetRuleForTransaction, useIdempotencyKey, useRefreshUnreconciledTransactions, useUpdateActionLog, useWaitForReconciliationJob } from "./utils"
 import { useFieldArray, useForm, useFormContext, useWatch } from "react-hook-form"
 import { getCompanyCostCenter, getCompanyCurrency } from "@/lib/company"
 import { FrappeConfig, FrappeContext, useFrappeGetCall, useFrappePostCall } from "frappe-react-sdk"
@@ -93,7 +93,11 @@ const BulkPaymentEntryForm = ({ transactions }: { transactions: UnreconciledTran
         mode_of_payment: PaymentEntry['mode_of_payment']
     }>()
 
-    const { call: createPaymentEntry, loading, error } = useFrappePostCall<{ message: { transaction: BankTransaction, payment_entry: PaymentEntry }[] }>('mint.apis.bank_reconciliation.create_bulk_payment_entry_and_reconcile')
+    const { call: createPaymentEntry, loading: isEnqueuing, error } = useFrappePostCall<{ message: { job: string } }>('mint.apis.bank_reconciliation.create_bulk_payment_entry_and_reconcile')
+
+    const { waitForJob, isWaiting } = useWaitForReconciliationJob<PaymentEntry>()
+
+    const loading = isEnqueuing || isWaiting
 
     const onReconcile = useRefreshUnreconciledTransactions()
 
@@ -106,36 +110,39 @@ const BulkPaymentEntryForm = ({ transactions }: { transactions: UnreconciledTran
             party_type: data.party_type,
             party: data.party,
             account: data.account
-        }).then(({ message }) => {
-
-            addToActionLog({
-                type: 'payment',
-                timestamp: (new Date()).getTime(),
-                isBulk: true,
-                items: message.map((item) => ({
-                    bankTransaction: item.transaction,
-                    voucher: {
-                        reference_doctype: "Payment Entry",
-                        reference_name: item.payment_entry.name,
-                        reference_no: item.payment_entry.reference_no,
-                        reference_date: item.payment_entry.reference_date,
-                        posting_date: item.payment_entry.posting_date,
-                        party_type: item.payment_entry.party_type,
-                        party: item.payment_entry.party,
-                        doc: item.payment_entry,
+        }).then(({ message }) => waitForJob(message.job)).then((result) => {
+            if (result.items.length > 0) {
+                addToActionLog({
+                    type: 'payment',
+                    timestamp: (new Date()).getTime(),
+                    isBulk: true,
+                    items: result.items.map((item) => ({
+                        bankTransaction: item.transaction,
+                        voucher: {
+                            reference_doctype: "Payment Entry",
+                            reference_name: item.voucher.name,
+                            reference_no: item.voucher.reference_no,
+                            reference_date: item.voucher.reference_date,
+                            posting_date: item.voucher.posting_date,
+                            party_type: item.voucher.party_type,
+                            party: item.voucher.party,
+                            doc: item.voucher,
+                        }
+                    })),
+                    bulkCommonData: {
+                        party_type: data.party_type,
+                        party: data.party,
+                        account: data.account,
                     }
-                })),
-                bulkCommonData: {
-                    party_type: data.party_type,
-                    party: data.party,
-                    account: data.account,
-                }
-            })
+                })
 
-            toast.success(_("Payment Recorded"), {
-                duration: 4000,
-                closeButton: true,
-            })
+                toast.success(_("Payment Recorded"), {
+                    duration: 4000,
+                    closeButton: true,
+                })
+            }
+
+            showReconciliationJobErrors(result)
             onReconcile(transactions[transactions.length - 1])
             setIsOpen(false)
         })
@@ -316,6 +323,8 @@ const PaymentEntryForm = ({ selectedTransaction, selectedBankAccount }: { select
 
     }, [rule, setUnpaidInvoiceOpen])
 
+    const idempotencyKey = useIdempotencyKey(selectedTransaction.name)
+
     const { call: createPaymentEntry, loading, error, isCompleted } = useFrappePostCall<{ message: { transaction: BankTransaction, payment_entry: PaymentEntry } }>('mint.apis.bank_reconciliation.create_payment_entry_and_reconcile')
 
     const setBankRecUnreconcileModalAtom = useSetAtom(bankRecUnreconcileModalAtom)
@@ -333,6 +342,7 @@ const PaymentEntryForm = ({ selectedTransaction, selectedBankAccount }: { select
 
         createPaymentEntry({
             bank_transaction_name: selectedTransaction.name,
+            idempotency_key: idempotencyKey,
             payment_entry_doc: {
                 ...data,
                 custom_remarks: data.remarks ? true : false
@@ -2,7 +2,7 @@ import { useAtom, useAtomValue, useSetAtom } from 'jotai'
 import { bankRecSelectedTransactionAtom, bankRecTransferModalAtom, bankRecUnreconcileModalAtom, SelectedBank, selectedBankAccountAtom } from './bankRecAtoms'
 import { Dialog, DialogContent, DialogHeader, DialogFooter, DialogClose, DialogTitle, DialogDescription } from '@/components/ui/dialog'
 import _ from '@/lib/translate'
-import { UnreconciledTransaction, useGetBankAccounts, useGetRuleForTransaction, useRefreshUnreconciledTransactions, useUpdateActionLog } from './utils'
+import { showReconciliationJobErrors, UnreconciledTransaction, useGetBankAccounts, useGetRuleForTransaction, useRefreshUnreconciledTransactions, useUpdateActionLog, useWaitForReconciliationJob } from './utils'
 import { Button } from '@/components/ui/button'
 import SelectedTransactionDetails from './SelectedTransactionDetails'
 import { PaymentEntry } from '@/types/Accounts/PaymentEntry'
@@ -75,7 +75,11 @@ const BulkInternalTransferForm = ({ transactions }: { transactions: Unreconciled
 
     const setIsOpen = useSetAtom(bankRecTransferModalAtom)
 
-    const { call: createPaymentEntry, loading, error } = useFrappePostCall<{ message: { transaction: BankTransaction, payment_entry: PaymentEntry }[] }>('mint.apis.bank_reconciliation.create_bulk_internal_transfer')
+    const { call: createPaymentEntry, loading: isEnqueuing, error } = useFrappePostCall<{ message: { job: string } }>('mint.apis.bank_reconciliation.create_bulk_internal_transfer')
+
+    const { waitForJob, isWaiting } = useWaitForReconciliationJob<PaymentEntry>()
+
+    const loading = isEnqueuing || isWaiting
 
     const onReconcile = useRefreshUnreconciledTransactions()
     const addToActionLog = useUpdateActionLog()
@@ -85,28 +89,32 @@ const BulkInternalTransferForm = ({ transactions }: { transactions: Unreconciled
         createPaymentEntry({
             bank_transaction_names: transactions.map((transaction) => transaction.name),
             bank_account: data.bank_account
-        }).then(({ message }) => {
-            addToActionLog({
-                type: 'transfer',
-                timestamp: (new Date()).getTime(),
-                isBulk: true,
-                items: message.map((item) => ({
-                    bankTransaction: item.transaction,
-                    voucher: {
-                        reference_doctype: "Payment Entry",
-                        reference_name: item.payment_entry.name,
-                        posting_date: item.payment_entry.posting_date,
-                        doc: item.payment_entry,
+        }).then(({ message }) => waitForJob(message.job)).then((result) => {
+            if (result.items.length > 0) {
+                addToActionLog({
+                    type: 'transfer',
+                    timestamp: (new Date()).getTime(),
+                    isBulk: true,
+                    items: result.items.map((item) => ({
+                        bankTransaction: item.transaction,
+                        voucher: {
+                            reference_doctype: "Payment Entry",
+                            reference_name: item.voucher.name,
+                            posting_date: item.voucher.posting_date,
+                            doc: item.voucher,
+                        }
+                    })),
+                    bulkCommonData: {
+                        bank_account: data.bank_account,
                     }
-                })),
-                bulkCommonData: {
-                    bank_account: data.bank_account,
-                }
-            })
-            toast.success(_("Transfer Recorded"), {
-                duration: 4000,
-                closeButton: true,
-            })
+                })
+                toast.success(_("Transfer Recorded"), {
+                    duration: 4000,
+                    closeButton: true,
+                })
+            }
+
+            showReconciliationJobErrors(result)
             onReconcile(transactions[transactions.length - 1])
             setIsOpen(false)
         })
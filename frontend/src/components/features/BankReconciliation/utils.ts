@@ -1,7 +1,7 @@
 import { ActionLog, bankRecActionLog, bankRecAmountFilter, bankRecDateAtom, bankRecMatchFilters, bankRecSearchText, bankRecSelectedTransactionAtom, bankRecTransactionTypeFilter, bankRecUnreconcileModalAtom, SelectedBank, selectedBankAccountAtom } from './bankRecAtoms'
 import { useAtom, useAtomValue, useSetAtom } from 'jotai'
-import { useMemo } from 'react'
-import { SWRConfiguration, useFrappeGetCall, useFrappeGetDoc, useFrappePostCall, useSWRConfig } from 'frappe-react-sdk'
+import { useContext, useMemo, useState } from 'react'
+import { FrappeConfig, FrappeContext, SWRConfiguration, useFrappeGetCall, useFrappeGetDoc, useFrappePostCall, useSWRConfig } from 'frappe-react-sdk'
 import { BankTransaction } from '@/types/Accounts/BankTransaction'
 import { BankAccount } from '@/types/Accounts/BankAccount'
 import dayjs from 'dayjs'
@@ -122,21 +122,68 @@ export const useGetBankTransactions = () => {
 }
 
 
+/** Number of transactions after the selected one whose vouchers are fetched in the same call */
+const VOUCHER_PREFETCH_COUNT = 5
+
+const getVouchersCacheKey = (transactionName: string, fromDate: string, toDate: string, matchFilters: string[]) => {
+    return `bank-reconciliation-vouchers-${transactionName}-${fromDate}-${toDate}-${matchFilters.join(',')}`
+}
+
 export const useGetVouchersForTransaction = (transaction: UnreconciledTransaction) => {
 
     const dates = useAtomValue(bankRecDateAtom)
 
     const matchFilters = useAtomValue(bankRecMatchFilters)
 
-    return useFrappeGetCall<{ message: LinkedPayment[] }>('erpnext.accounts.doctype.bank_reconciliation_tool.bank_reconciliation_tool.get_linked_payments', {
-        bank_transaction_name: transaction.name,
+    const { cache, mutate } = useSWRConfig()
+
+    const { data: unreconciledTransactions } = useGetUnreconciledTransactions()
+
+    // Along with the selected transaction, fetch the vouchers of the next few transactions that are not loaded yet
+    // so that they show up immediately when the user moves on to them
+    const transactionNames = useMemo(() => {
+        const names = [transaction.name]
+        const transactions = unreconciledTransactions?.message ?? []
+        const currentIndex = transactions.findIndex(t => t.name === transaction.name)
+
+        if (currentIndex !== -1) {
+            for (const nextTransaction of transactions.slice(currentIndex + 1)) {
+                if (names.length > VOUCHER_PREFETCH_COUNT) {
+                    break
+                }
+                if (!cache.get(getVouchersCacheKey(nextTransaction.name, dates.fromDate, dates.toDate, matchFilters))) {
+                    names.push(nextTransaction.name)
+                }
+            }
+        }
+
+        return names
+        // eslint-disable-next-line react-hooks/exhaustive-deps
+    }, [transaction.name, unreconciledTransactions, dates.fromDate, dates.toDate, matchFilters])
+
+    const { data, ...response } = useFrappeGetCall<{ message: Record<string, LinkedPayment[]> }>('mint.apis.auto_match.get_linked_payments', {
+        bank_transaction_names: transactionNames,
         document_types: matchFilters ?? ['payment_entry', 'journal_entry'],
         from_date: dates.fromDate,
         to_date: dates.toDate,
         filter_by_reference_date: 0
-    }, `bank-reconciliation-vouchers-${transaction.name}-${dates.fromDate}-${dates.toDate}-${matchFilters.join(',')}`, {
-        revalidateOnFocus: false
+    }, getVouchersCacheKey(transaction.name, dates.fromDate, dates.toDate, matchFilters), {
+        revalidateOnFocus: false,
+        onSuccess: (data) => {
+            // Seed the cache of the prefetched transactions - they are revalidated in the background when selected
+            transactionNames.slice(1).forEach(name => {
+                mutate(getVouchersCacheKey(name, dates.fromDate, dates.toDate, matchFilters), {
+                    message: { [name]: data.message[name] ?? [] }
+                }, { revalidate: false })
+            })
+        }
     })
+
+    const vouchers = useMemo(() => {
+        return data ? { message: data.message[transaction.name] ?? [] } : undefined
+    }, [data, transaction.name])
+
+    return { data: vouchers, ...response }
 }
 
 /**
@@ -170,7 +217,7 @@ export const useRefreshUnreconciledTransactions = () => {
             mutate(`bank-reconciliation-unreconciled-transactions-${selectedBank?.name}-${dates.fromDate}-${dates.toDate}`)
             mutate(`bank-reconciliation-account-closing-balance-${selectedBank?.name}-${dates.toDate}`)
             // Update the matching vouchers for the selected transaction
-            mutate(`bank-reconciliation-vouchers-${transaction.name}-${dates.fromDate}-${dates.toDate}-${matchFilters.join(',')}`)
+            mutate(getVouchersCacheKey(transaction.name, dates.fromDate, dates.toDate, matchFilters))
             return
         }
 
@@ -218,6 +265,21 @@ export const useRefreshUnreconciledTransactions = () => {
 
 }
 
+/**
+ * Idempotency key for a request that creates a voucher for the transaction.
+ * The same key is sent when the form is submitted again, so a retry after a timeout returns the voucher created by the first attempt
+ */
+export const useIdempotencyKey = (transactionName: string) => {
+    return useMemo(() => {
+        if (typeof crypto !== 'undefined' && crypto.randomUUID) {
+            return crypto.randomUUID()
+        }
+        // randomUUID is only available in secure contexts
+        return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`
+        // eslint-disable-next-line react-hooks/exhaustive-deps
+    }, [transactionName])
+}
+
 export const useReconcileTransaction = () => {
 
     const { call, loading } = useFrappePostCall<{ message: BankTransaction }>('mint.apis.bank_reconciliation.reconcile_vouchers')
@@ -430,4 +492,89 @@ export const useUpdateActionLog = () => {
     }
 
     return addToActionLog
-}
\ No newline at end of file
+}
+export interface ReconciliationJobResult<T = any> {
+    name: string,
+    action: string,
+    status: 'Queued' | 'In Progress' | 'Completed' | 'Partially Completed' | 'Failed',
+    total: number,
+    successful: number,
+    failed: number,
+    /** Traceback if the job itself crashed */
+    error?: string | null,
+    items: {
+        transaction: BankTransaction,
+        voucher_type: string,
+        voucher: T
+    }[],
+    errors: {
+        bank_transaction: string,
+        error: string
+    }[]
+}
+
+/**
+ * Bulk actions are run as a background job on the server.
+ * Returns a function that polls the job until it has finished and resolves with its result.
+ * Rejects if the job itself failed, or if it is still not done after `timeout` milliseconds.
+ */
+export const useWaitForReconciliationJob = <T = any>(interval: number = 1500, timeout: number = 10 * 60 * 1000) => {
+
+    const { call } = useContext(FrappeContext) as FrappeConfig
+
+    const [isWaiting, setIsWaiting] = useState(false)
+
+    const waitForJob = (job: string): Promise<ReconciliationJobResult<T>> => {
+        setIsWaiting(true)
+
+        const startedAt = Date.now()
+
+        return new Promise<ReconciliationJobResult<T>>((resolve, reject) => {
+            const poll = () => {
+                call.get('mint.apis.reconciliation_jobs.get_reconciliation_job_result', { job })
+                    .then(({ message }: { message: ReconciliationJobResult<T> }) => {
+                        if (message.status === 'Queued' || message.status === 'In Progress') {
+                            if (Date.now() - startedAt > timeout) {
+                                toast.error(_("The job is taking longer than expected. Check Mint Reconciliation Job {0} for its progress.", [job]), {
+                                    duration: 8000,
+                                    closeButton: true,
+                                })
+                                reject(new Error(`Timed out waiting for reconciliation job ${job}`))
+                            } else {
+                                setTimeout(poll, interval)
+                            }
+                        } else if (message.error) {
+                            toast.error(_("The job could not be completed"), {
+                                duration: 8000,
+                                closeButton: true,
+                                description: message.error.split('\n').filter(Boolean).pop()
+                            })
+                            reject(new Error(message.error))
+                        } else {
+                            resolve(message)
+                        }
+                    })
+                    .catch(reject)
+            }
+
+            poll()
+        }).finally(() => setIsWaiting(false))
+    }
+
+    return { waitForJob, isWaiting }
+}
+
+/**
+ * Show a toast with the number of transactions that could not be processed by a bulk action
+ */
+export const showReconciliationJobErrors = (result: ReconciliationJobResult) => {
+    if (result.errors.length === 0) {
+        return
+    }
+
+    toast.error(_("{0} of {1} transactions could not be processed", [result.errors.length.toString(), result.total.toString()]), {
+        duration: 8000,
+        closeButton: true,
+        description: result.errors.slice(0, 3).map((error) => `${error.bank_transaction}: ${error.error}`).join('\n')
+    })
+}
@@ -3,7 +3,8 @@ import { cn } from "@/lib/utils"
 import { ArrowDownRightIcon, ArrowUpRightIcon, BanknoteIcon, CalendarIcon, DollarSignIcon, FileTextIcon, ListIcon, ReceiptIcon } from "lucide-react"
 import { Tooltip, TooltipContent, TooltipTrigger } from "@/components/ui/tooltip"
 import _ from "@/lib/translate"
-import { GetStatementDetailsResponse } from "../import_utils"
+import { GetStatementDetailsResponse, useStatementPages } from "../import_utils"
+import LoadMore from "./LoadMore"
 
 
 const CSVRawDataPreview = ({ data }: { data: GetStatementDetailsResponse }) => {
@@ -13,81 +14,109 @@ const CSVRawDataPreview = ({ data }: { data: GetStatementDetailsResponse }) => {
     // Reverse the column mapping to get a map of column index to variable name
     const columnIndexMap: Record<number, StandardColumnTypes> = Object.fromEntries(Object.entries(data.column_mapping).map(([variable, columnIndex]) => [columnIndex, variable as StandardColumnTypes]))
 
+    // Only the first and last rows come with the preview - the rows in between are loaded on demand
+    const rows = useStatementPages<Array<string>>('mint.apis.statement_import.get_statement_rows', data.session_id, data.first_rows, data.total_rows)
+
     // Loop over the contents of the CSV file and show a preview - highlight the header row and the transaction rows
     return (
         <Table>
             <TableBody>
-                {data.data.map((row, index) => {
-
-                    const isHeaderRow = index === data.header_index;
-                    const isTransactionRow = index >= data.transaction_starting_index && index <= data.transaction_ending_index;
-
-                    return <TableRow key={index}
-                        title={isHeaderRow ? "Header Row" : ""}
-                        className={cn({
-                            // "bg-yellow-100": isHeaderRow,
-                            // "hover:bg-yellow-100": isHeaderRow,
-                            "bg-green-50": isTransactionRow,
-                            "hover:bg-green-50": isTransactionRow,
-                            "text-muted-foreground/70": !isTransactionRow && !isHeaderRow,
-                        })}>
-                        {isHeaderRow ? <TableHead className="bg-yellow-100 hover:bg-yellow-100 text-center">
-                            {index + 1}
-                        </TableHead> :
-                            <TableCell className="text-center px-1 py-0.5">
-                                {index + 1}
-                            </TableCell>
-                        }
-                        {row.map((cell, cellIndex) => {
-
-                            const isValidColumn = validColumns.includes(cellIndex);
-                            const columnType = columnIndexMap[cellIndex];
-                            const isAmountColumn = ["Amount", "Withdrawal", "Deposit", "Balance"].includes(columnType);
-
-                            if (isHeaderRow) {
-                                return <TableHead key={cellIndex} className={cn("max-w-[250px] w-fit overflow-hidden text-ellipsis py-0.5",
-                                    isValidColumn ? "bg-yellow-100 hover:bg-yellow-100" : "bg-muted",
-                                )}>
-                                    <div className={cn("flex items-center text-xs gap-1 px-1", {
-                                        "justify-end": isAmountColumn && isValidColumn
-                                    })}>
-                                        {columnType && <Tooltip>
-                                            <TooltipTrigger>
-                                                <ColumnHeaderIcon columnType={columnType} />
-                                            </TooltipTrigger>
-                                            <TooltipContent>
-                                                {_(columnType)}
-                                            </TooltipContent>
-                                        </Tooltip>
-                                        }
-                                        {cell}
-                                    </div>
-                                </TableHead>
-                            } else {
-                                return <TableCell key={cellIndex} className={cn("max-w-[200px] w-fit overflow-hidden text-ellipsis py-0.5",
-                                    {
-                                        "bg-green-100": isValidColumn && isTransactionRow,
-                                        "hover:bg-green-100": isValidColumn && isTransactionRow,
-                                        "text-muted-foreground": !isValidColumn && isTransactionRow,
-                                    }
-                                )} >
-                                    <div className={cn("min-h-5 flex items-center text-xs px-1", {
-                                        "justify-end": isAmountColumn && isValidColumn && isTransactionRow
-                                    })} title={cell}>
-                                        {cell}
-                                    </div>
-                                </TableCell>
-                            }
-                        }
-
-                        )}
-                    </TableRow>
+                {rows.items.map((row, index) => <RawDataRow key={index} row={row} index={index} data={data} validColumns={validColumns} columnIndexMap={columnIndexMap} />)}
+                {rows.hasMore && <TableRow>
+                    <TableCell colSpan={data.header_row.length + 1}>
+                        <div className="sticky left-0 w-fit">
+                            <LoadMore pages={rows} />
+                        </div>
+                    </TableCell>
+                </TableRow>}
+                {rows.hasMore && data.last_rows.map((row, index) => {
+                    const rowIndex = data.last_rows_start + index
+                    // Rows that were loaded already are shown above
+                    if (rowIndex < rows.items.length) {
+                        return null
+                    }
+                    return <RawDataRow key={rowIndex} row={row} index={rowIndex} data={data} validColumns={validColumns} columnIndexMap={columnIndexMap} />
                 })}
             </TableBody>
         </Table >
     )
 }
 
+type RawDataRowProps = {
+    row: Array<string>,
+    index: number,
+    data: GetStatementDetailsResponse,
+    validColumns: number[],
+    columnIndexMap: Record<number, StandardColumnTypes>,
+}
+
+const RawDataRow = ({ row, index, data, validColumns, columnIndexMap }: RawDataRowProps) => {
+
+    const isHeaderRow = index === data.header_index;
+    const isTransactionRow = index >= data.transaction_starting_index && index <= data.transaction_ending_index;
+
+    return <TableRow
+        title={isHeaderRow ? "Header Row" : ""}
+        className={cn({
+            // "bg-yellow-100": isHeaderRow,
+            // "hover:bg-yellow-100": isHeaderRow,
+            "bg-green-50": isTransactionRow,
+            "hover:bg-green-50": isTransactionRow,
+            "text-muted-foreground/70": !isTransactionRow && !isHeaderRow,
+        })}>
+        {isHeaderRow ? <TableHead className="bg-yellow-100 hover:bg-yellow-100 text-center">
+            {index + 1}
+        </TableHead> :
+            <TableCell className="text-center px-1 py-0.5">
+                {index + 1}
+            </TableCell>
+        }
+        {row.map((cell, cellIndex) => {
+
+            const isValidColumn = validColumns.includes(cellIndex);
+            const columnType = columnIndexMap[cellIndex];
+            const isAmountColumn = ["Amount", "Withdrawal", "Deposit", "Balance"].includes(columnType);
+
+            if (isHeaderRow) {
+                return <TableHead key={cellIndex} className={cn("max-w-[250px] w-fit overflow-hidden text-ellipsis py-0.5",
+                    isValidColumn ? "bg-yellow-100 hover:bg-yellow-100" : "bg-muted",
+                )}>
+                    <div className={cn("flex items-center text-xs gap-1 px-1", {
+                        "justify-end": isAmountColumn && isValidColumn
+                    })}>
+                        {columnType && <Tooltip>
+                            <TooltipTrigger>
+                                <ColumnHeaderIcon columnType={columnType} />
+                            </TooltipTrigger>
+                            <TooltipContent>
+                                {_(columnType)}
+                            </TooltipContent>
+                        </Tooltip>
+                        }
+                        {cell}
+                    </div>
+                </TableHead>
+            } else {
+                return <TableCell key={cellIndex} className={cn("max-w-[200px] w-fit overflow-hidden text-ellipsis py-0.5",
+                    {
+                        "bg-green-100": isValidColumn && isTransactionRow,
+                        "hover:bg-green-100": isValidColumn && isTransactionRow,
+                        "text-muted-foreground": !isValidColumn && isTransactionRow,
+                    }
+                )} >
+                    <div className={cn("min-h-5 flex items-center text-xs px-1", {
+                        "justify-end": isAmountColumn && isValidColumn && isTransactionRow
+                    })} title={cell}>
+                        {cell}
+                    </div>
+                </TableCell>
+            }
+        }
+
+        )}
+    </TableRow>
+}
+
 type StandardColumnTypes = 'Amount' | 'Date' | 'Description' | 'Reference' | 'Transaction Type' | 'Balance' | 'Withdrawal' | 'Deposit';
 
 const ColumnHeaderIcon = ({ columnType }: { columnType?: StandardColumnTypes }) => {
@@ -0,0 +1,25 @@
+import _ from '@/lib/translate'
+import { Button } from '@/components/ui/button'
+import ErrorBanner from '@/components/ui/error-banner'
+import { FrappeError } from 'frappe-react-sdk'
+import { Loader2Icon } from 'lucide-react'
+
+/**
+ * Button to load the next page of rows of a statement parse session (see useStatementPages)
+ */
+const LoadMore = ({ pages }: { pages: { loadMore: () => void, loading: boolean, hasMore: boolean, error: FrappeError | null } }) => {
+
+    if (!pages.hasMore) {
+        return null
+    }
+
+    return <div className='flex flex-col items-center gap-2 py-2'>
+        {pages.error && <ErrorBanner error={pages.error} />}
+        <Button size='sm' variant='outline' type='button' onClick={pages.loadMore} disabled={pages.loading}>
+            {pages.loading ? <Loader2Icon className='size-4 animate-spin' /> : null}
+            {_("Load more")}
+        </Button>
+    </div>
+}
+
+export default LoadMore
@@ -1,5 +1,6 @@
 import _ from '@/lib/translate'
-import { GetStatementDetailsResponse } from '../import_utils'
+import { ConflictingTransaction, GetStatementDetailsResponse, StatementTransaction, useStatementPages } from '../import_utils'
+import LoadMore from './LoadMore'
 import { flt, formatCurrency } from '@/lib/numbers'
 import { formatDate } from '@/lib/date'
 import { bankRecDateAtom, SelectedBank } from '../../BankReconciliation/bankRecAtoms'
@@ -11,7 +12,7 @@ import { Table, TableBody, TableCaption, TableCell, TableHead, TableHeader, Tabl
 import { Separator } from '@/components/ui/separator'
 import { Button } from '@/components/ui/button'
 import { Tooltip, TooltipContent, TooltipTrigger } from '@/components/ui/tooltip'
-import { useFrappeEventListener, useFrappePostCall } from 'frappe-react-sdk'
+import { useFrappeEventListener, useFrappeGetCall, useFrappePostCall } from 'frappe-react-sdk'
 import { toast } from 'sonner'
 import ErrorBanner from '@/components/ui/error-banner'
 import { useNavigate } from 'react-router-dom'
@@ -52,6 +53,17 @@ const parseDateFormat = (dateFormat: string) => {
 
 }
 
+interface StatementImportProgressEvent {
+    import_id: string,
+    status: "Queued" | "In Progress" | "Completed" | "Failed",
+    progress: number,
+    imported: number,
+    total: number,
+    start_date?: string,
+    end_date?: string,
+    error: string | null,
+}
+
 type Props = {
     data: GetStatementDetailsResponse,
     bank: SelectedBank | null,
@@ -61,38 +73,97 @@ type Props = {
 const StatementDetails = ({ data, bank, onBack }: Props) => {
     const dateFormatMeta = parseDateFormat(data.date_format)
 
-    const { call, loading, error } = useFrappePostCall<{ message: { success: boolean, start_date: string, end_date: string } }>('mint.apis.statement_import.import_statement')
+    const { call, loading: isEnqueuing, error } = useFrappePostCall<{ message: { import_id: string } }>('mint.apis.statement_import.import_statement')
 
     const navigate = useNavigate()
 
     const setDates = useSetAtom(bankRecDateAtom)
 
+    const [importID, setImportID] = useState<string | null>(null)
+
+    // Set when an import failed, so that it can be resumed
+    const [failedImportID, setFailedImportID] = useState<string | null>(null)
+
+    const { call: resume, loading: isResuming, error: resumeError } = useFrappePostCall<{ message: { import_id: string } }>('mint.apis.statement_import.resume_statement_import')
+
     const onImport = () => {
 
         call({
             file_url: data.file_path,
             bank_account: bank?.name,
         }).then((response) => {
-            if (response.message.start_date && response.message.end_date) {
-                setDates({
-                    fromDate: response.message.start_date,
-                    toDate: response.message.end_date,
-                })
-            }
-            toast.success(_("Bank statement imported."))
-            navigate(`/`)
+            setImportID(response.message.import_id)
         }).catch(() => {
             toast.error(_("There was an error while importing the bank statement."))
         })
 
     }
 
+    const onResume = () => {
+        if (!failedImportID) {
+            return
+        }
+
+        resume({
+            import_id: failedImportID,
+        }).then((response) => {
+            setFailedImportID(null)
+            setImportError(null)
+            setImportID(response.message.import_id)
+        }).catch(() => {
+            toast.error(_("There was an error while resuming the import."))
+        })
+    }
+
     const [progress, setProgress] = useState(0)
 
-    useFrappeEventListener("mint-statement-import-progress", (event) => {
+    const [importError, setImportError] = useState<string | null>(null)
+
+    const onProgress = (event: StatementImportProgressEvent) => {
+        if (!importID || event.import_id !== importID) {
+            return
+        }
+
         setProgress(event.progress)
+
+        if (event.status === "Completed") {
+            setImportID(null)
+            if (event.start_date && event.end_date) {
+                setDates({
+                    fromDate: event.start_date,
+                    toDate: event.end_date,
+                })
+            }
+            toast.success(_("Bank statement imported."))
+            navigate(`/`)
+        } else if (event.status === "Failed") {
+            setImportID(null)
+            setFailedImportID(event.import_id)
+            setImportError(event.error)
+            toast.error(_("There was an error while importing the bank statement. {0} of {1} transactions were imported.", [event.imported.toString(), event.total.toString()]))
+        }
+    }
+
+    useFrappeEventListener("mint-statement-import-progress", onProgress)
+
+    // Realtime events are missed if the import finishes before the import ID is known, or if socket.io is not available -
+    // so the status is polled as well
+    useFrappeGetCall<{ message: StatementImportProgressEvent }>('mint.apis.statement_import.get_statement_import_status', {
+        import_id: importID,
+    }, importID ? `statement_import_status_${importID}` : null, {
+        refreshInterval: 3000,
+        revalidateOnFocus: false,
+        onSuccess: (response) => onProgress(response.message),
     })
 
+    const loading = isEnqueuing || isResuming || importID !== null
+
+    const conflicts = useStatementPages<ConflictingTransaction>('mint.apis.statement_import.get_statement_conflicts',
+        data.session_id, data.conflicting_transactions, data.number_of_conflicts)
+
+    const transactions = useStatementPages<StatementTransaction>('mint.apis.statement_import.get_statement_transactions',
+        data.session_id, data.first_transactions, data.number_of_transactions)
+
     return (
         <div className='flex flex-col gap-4'>
             <div className='flex flex-col gap-4'>
@@ -101,9 +172,9 @@ const StatementDetails = ({ data, bank, onBack }: Props) => {
                         <ChevronLeftIcon />
                         {_("Back")}
                     </Button>
-                    <Button onClick={onImport} disabled={loading} size='sm' type='button'>
+                    <Button onClick={onImport} disabled={loading || failedImportID !== null} size='sm' type='button'>
                         {loading ? <Loader2Icon className='size-4 animate-spin' /> : null}
-                        {loading ? _("Importing...") : _("Import {0} transactions", [data.final_transactions?.length?.toString() || "0"])}</Button>
+                        {loading ? _("Importing...") : _("Import {0} transactions", [data.number_of_transactions.toString()])}</Button>
                 </div>
                 <div className='flex items-start gap-4'>
                     <div className='flex flex-col gap-1'>
@@ -125,6 +196,17 @@ const StatementDetails = ({ data, bank, onBack }: Props) => {
 
                 {error && <ErrorBanner error={error} />}
 
+                {resumeError && <ErrorBanner error={resumeError} />}
+
+                {failedImportID && <div className='flex items-center justify-between gap-2'>
+                    <span className='text-sm'>{_("Transactions that were already imported are skipped when the import is resumed.")}</span>
+                    <Button onClick={onResume} disabled={loading} size='sm' variant='outline' type='button'>
+                        {_("Resume Import")}
+                    </Button>
+                </div>}
+
+                {importError && <pre className='text-xs text-destructive max-h-48 overflow-auto whitespace-pre-wrap'>{importError}</pre>}
+
                 <Table>
                     <TableBody>
                         <TableRow>
@@ -159,7 +241,7 @@ const StatementDetails = ({ data, bank, onBack }: Props) => {
                         </TableRow>
                         <TableRow>
                             <TableHead className='bg-muted/70'>{_("Number of Transactions")}</TableHead>
-                            <TableCell>{data.transaction_rows.length}</TableCell>
+                            <TableCell>{data.number_of_transactions}</TableCell>
                         </TableRow>
                         <TableRow>
                             <TableHead className='bg-muted/70'>{_("Closing Balance as of {}", [formatDate(data.statement_end_date, "Do MMMM YYYY")])}</TableHead>
@@ -199,15 +281,15 @@ const StatementDetails = ({ data, bank, onBack }: Props) => {
                 </Table>
             </div>
 
-            {data.conflicting_transactions.length > 0 && <Separator />}
+            {data.number_of_conflicts > 0 && <Separator />}
 
-            {data.conflicting_transactions.length > 0 ? <div className='flex flex-col gap-4'>
+            {data.number_of_conflicts > 0 ? <div className='flex flex-col gap-4'>
                 <div className='flex flex-col gap-1'>
                     <H3 className='text-base border-0 p-0'>{_("Conflicting Transactions")}</H3>
-                    {data.conflicting_transactions.length === 1 ? (
+                    {data.number_of_conflicts === 1 ? (
                         <Paragraph className='text-sm'>{_("We've found 1 existing transaction in the system that conflicts with the transactions in the statement file. Are you sure you want to proceed with the import?")}</Paragraph>
                     ) : (
-                        <Paragraph className='text-sm'>{_("We've found {0} existing transactions in the system that conflict with the transactions in the statement file. Are you sure you want to proceed with the import?", [data.conflicting_transactions.length.toString()])}</Paragraph>
+                        <Paragraph className='text-sm'>{_("We've found {0} existing transactions in the system that conflict with the transactions in the statement file. Are you sure you want to proceed with the import?", [data.number_of_conflicts.toString()])}</Paragraph>
                     )}
                 </div>
                 <div className='max-h-[400px] overflow-scroll border border-border rounded-md pb-2'>
@@ -225,7 +307,7 @@ const StatementDetails = ({ data, bank, onBack }: Props) => {
                             </TableRow>
                         </TableHeader>
                         <TableBody>
-                            {data.conflicting_transactions.map((transaction) => (
+                            {conflicts.items.map((transaction) => (
                                 <TableRow key={transaction.name}>
                                     <TableCell>{formatDate(transaction.date)}</TableCell>
                                     <TableCell>{transaction.description}</TableCell>
@@ -251,6 +333,7 @@ const StatementDetails = ({ data, bank, onBack }: Props) => {
                             ))}
                         </TableBody>
                     </Table>
+                    <LoadMore pages={conflicts} />
                 </div>
 
             </div> : null}
@@ -260,10 +343,10 @@ const StatementDetails = ({ data, bank, onBack }: Props) => {
             <div className='flex flex-col gap-4'>
                 <div className='flex flex-col gap-1'>
                     <H3 className='text-base border-0 p-0'>{_("Preview Transactions")}</H3>
-                    {data.final_transactions?.length === 1 ? (
+                    {data.number_of_transactions === 1 ? (
                         <Paragraph className='text-sm'>{_("We've found 1 transaction in the statement file that will be imported into the system. Please review the details below and click the 'Import' button to proceed.")}</Paragraph>
                     ) : (
-                        <Paragraph className='text-sm'>{_("{0} transactions will be imported into the system. Please review the details below and click the 'Import' button to proceed.", [data.final_transactions?.length?.toString() || "0"])}</Paragraph>
+                        <Paragraph className='text-sm'>{_("{0} transactions will be imported into the system. Please review the details below and click the 'Import' button to proceed.", [data.number_of_transactions.toString()])}</Paragraph>
                     )}
                 </div>
                 <div className='max-h-[400px] overflow-scroll border border-border rounded-md pb-2'>
@@ -280,16 +363,22 @@ const StatementDetails = ({ data, bank, onBack }: Props) => {
                             </TableRow>
                         </TableHeader>
                         <TableBody>
-                            {data.final_transactions?.map((transaction, index) => (
-                                <TableRow key={index}>
-                                    <TableCell className='w-8'>{index + 1}</TableCell>
-                                    <TableCell>{formatDate(transaction.date)}</TableCell>
-                                    <TableCell className='max-w-[200px] w-fit overflow-hidden text-ellipsis'>{transaction.description}</TableCell>
-                                    <TableCell className='max-w-[100px] w-fit overflow-hidden text-ellipsis'>{transaction.reference}</TableCell>
-                                    <TableCell className='text-right font-mono'>{formatCurrency(transaction.withdrawal, data.currency)}</TableCell>
-                                    <TableCell className='text-right font-mono'>{formatCurrency(transaction.deposit, data.currency)}</TableCell>
-                                </TableRow>
+                            {transactions.items.map((transaction, index) => (
+                                <StatementTransactionRow key={index} index={index} transaction={transaction} currency={data.currency} />
                             ))}
+                            {transactions.hasMore && <TableRow>
+                                <TableCell colSpan={6} className='text-center'>
+                                    <LoadMore pages={transactions} />
+                                </TableCell>
+                            </TableRow>}
+                            {transactions.hasMore && data.last_transactions.map((transaction, index) => {
+                                const rowIndex = data.last_transactions_start + index
+                                // Rows that were loaded already are shown above
+                                if (rowIndex < transactions.items.length) {
+                                    return null
+                                }
+                                return <StatementTransactionRow key={rowIndex} index={rowIndex} transaction={transaction} currency={data.currency} />
+                            })}
                         </TableBody>
                     </Table>
                 </div>
@@ -299,4 +388,15 @@ const StatementDetails = ({ data, bank, onBack }: Props) => {
     )
 }
 
+const StatementTransactionRow = ({ index, transaction, currency }: { index: number, transaction: StatementTransaction, currency: string }) => {
+    return <TableRow>
+        <TableCell className='w-8'>{index + 1}</TableCell>
+        <TableCell>{formatDate(transaction.date)}</TableCell>
+        <TableCell className='max-w-[200px] w-fit overflow-hidden text-ellipsis'>{transaction.description}</TableCell>
+        <TableCell className='max-w-[100px] w-fit overflow-hidden text-ellipsis'>{transaction.reference}</TableCell>
+        <TableCell className='text-right font-mono'>{formatCurrency(transaction.withdrawal, currency)}</TableCell>
+        <TableCell className='text-right font-mono'>{formatCurrency(transaction.deposit, currency)}</TableCell>
+    </TableRow>
+}
+
 export default StatementDetails
\ No newline at end of file
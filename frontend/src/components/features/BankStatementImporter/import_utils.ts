@@ -1,57 +1,122 @@
-import { useFrappeGetCall } from "frappe-react-sdk"
+import { FrappeConfig, FrappeContext, FrappeError, useFrappeGetCall } from "frappe-react-sdk"
+import { useContext, useEffect, useRef, useState } from "react"
 
 
+export interface StatementTransaction {
+    date: string,
+    withdrawal: number,
+    deposit: number,
+    description: string,
+    reference: string,
+    transaction_type: string,
+}
+
+export interface ConflictingTransaction {
+    name: string,
+    date: string,
+    withdrawal: number,
+    deposit: number,
+    description: string,
+    reference_number: string,
+    currency: string,
+}
+
+/**
+ * Preview of a statement file - only the first and last rows are included, the rest is loaded page by page from the parse session
+ */
 export interface GetStatementDetailsResponse {
+    session_id: string,
     file_name: string,
     file_path: string,
-    data: Array<Array<string>>,
     header_index: number,
     header_row: Array<string>,
     column_mapping: Record<string, number>,
     transaction_starting_index: number,
     transaction_ending_index: number,
-    transaction_rows: Array<{
-        date_format: string,
-        date?: string,
-        amount?: number,
-        withdrawal?: number,
-        deposit?: number,
-        balance?: number,
-        reference?: string,
-        description?: string,
-        transaction_type?: string,
-    }>,
     date_format: string,
     amount_format: string,
+    /** The header, column mapping and formats were taken from the saved import template of the bank account */
+    from_template: boolean,
     statement_start_date: string,
     statement_end_date: string,
     closing_balance: number,
-    conflicting_transactions: Array<{
-        name: string,
-        date: string,
-        withdrawal: number,
-        deposit: number,
-        description: string,
-        reference_number: string,
-        currency: string,
-    }>,
-    final_transactions: Array<{
-        date: string,
-        withdrawal: number,
-        deposit: number,
-        description: string,
-        reference: string,
-        transaction_type: string,
-    }>,
     currency: string,
+    total_rows: number,
+    first_rows: Array<Array<string>>,
+    last_rows_start: number,
+    last_rows: Array<Array<string>>,
+    number_of_transactions: number,
+    first_transactions: Array<StatementTransaction>,
+    last_transactions_start: number,
+    last_transactions: Array<StatementTransaction>,
+    number_of_conflicts: number,
+    conflicting_transactions: Array<ConflictingTransaction>,
 }
 
 export const useGetStatementDetails = (fileURL: string, bankAccount: string) => {
     return useFrappeGetCall<{ message: GetStatementDetailsResponse }>("mint.apis.statement_import.get_statement_details", {
         file_url: fileURL,
         bank_account: bankAccount,
+        preview: 1,
     }, undefined, {
-        revalidateOnFocus: false
+        revalidateOnFocus: false,
+        revalidateIfStale: false
     })
 
-}
\ No newline at end of file
+}
+
+const STATEMENT_PAGE_LENGTH = 200
+
+/**
+ * Rows of a parse session that are loaded on demand - starts with the rows sent with the preview
+ * @param method - paged API of the parse session, e.g. "mint.apis.statement_import.get_statement_rows"
+ */
+export const useStatementPages = <T>(method: string, sessionID: string, initialItems: T[], total: number) => {
+
+    const { call } = useContext(FrappeContext) as FrappeConfig
+
+    const [items, setItems] = useState<T[]>(initialItems)
+    const [loading, setLoading] = useState(false)
+    const [error, setError] = useState<FrappeError | null>(null)
+
+    // A new preview (another file) starts a new session - start over with its rows and ignore pages of the old one
+    const currentSessionID = useRef(sessionID)
+
+    useEffect(() => {
+        currentSessionID.current = sessionID
+        setItems(initialItems)
+        setLoading(false)
+        setError(null)
+        // eslint-disable-next-line react-hooks/exhaustive-deps
+    }, [sessionID])
+
+    const loadMore = () => {
+        setLoading(true)
+        setError(null)
+        call.get<{ message: { items: T[], start: number, total: number } }>(method, {
+            session_id: sessionID,
+            start: items.length,
+            page_length: STATEMENT_PAGE_LENGTH,
+        }).then(({ message }) => {
+            if (currentSessionID.current === sessionID) {
+                setItems(current => [...current, ...message.items])
+            }
+        }).catch((e: FrappeError) => {
+            if (currentSessionID.current === sessionID) {
+                setError(e)
+            }
+        }).finally(() => {
+            if (currentSessionID.current === sessionID) {
+                setLoading(false)
+            }
+        })
+    }
+
+    return {
+        items,
+        loadMore,
+        loading,
+        error,
+        hasMore: items.length < total,
+    }
+}
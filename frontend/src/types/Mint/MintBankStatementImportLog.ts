@@ -22,4 +22,10 @@ export interface MintBankStatementImportLog{
 	end_date?: string
 	/**	Closing Balance : Currency	*/
 	closing_balance?: number
+	/**	Status : Select	*/
+	status?: "Queued" | "In Progress" | "Completed" | "Failed"
+	/**	Imported Transactions : Int	*/
+	imported_transactions?: number
+	/**	Error : Code	*/
+	error?: string
 }
\ No newline at end of file
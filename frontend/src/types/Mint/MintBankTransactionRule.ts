@@ -34,6 +34,8 @@ export interface MintBankTransactionRule{
 	account?: string
 	/**	Bank Entry Type : Select	*/
 	bank_entry_type?: "Single Account" | "Multiple Accounts"
+	/**	Automatically Apply : Check - Create and reconcile the voucher for matched transactions in the background, without manual review	*/
+	auto_apply?: 0 | 1
 	/**	Party Type : Link - Party Type	*/
 	party_type?: string
 	/**	Party : Dynamic Link	*/
@@ -12,6 +12,8 @@ export interface MintSettings{
 	idx?: number
 	/**	Match Transfers across (days) : Int - Number of days to consider for transfer matching across bank accounts.	*/
 	transfer_match_days?: number
+	/**	Cache rule evaluation results : Check - Remember which rule matched a description between rule evaluation runs. The cache is cleared whenever a rule of the company changes.	*/
+	cache_rule_evaluation_results?: 0 | 1
 	/**	Automatically run rules on unreconciled transactions : Check - If checked, this job will run every 30 minutes	*/
 	automatically_run_rules_on_unreconciled_transactions?: 0 | 1
 	/**	Google Project ID : Data	*/
@@ -0,0 +1,519 @@
+import frappe
+import datetime
+import json
+from bisect import bisect_left, bisect_right
+from frappe import _
+from mint.apis.reconciliation_jobs import enqueue_reconciliation_job
+from mint.apis.voucher_cache import VOUCHER_DOCUMENT_TYPES, get_uncleared_vouchers
+from mint.apis.voucher_matcher import VoucherIndex, find_subset_sum, get_cents, get_exact_unique_matches
+
+# Number of ranked candidates returned per transaction
+AUTO_MATCH_CANDIDATE_LIMIT = 5
+
+# Split matches are kept for a day after they were computed
+SPLIT_MATCH_EXPIRY = 24 * 60 * 60
+
+
+@frappe.whitelist(methods=["GET"])
+def get_auto_matches(bank_account: str,
+                     from_date: str,
+                     to_date: str,
+                     document_types: list[str] | str | None = None,
+                     amount_tolerance: float = 0.0,
+                     limit: int = AUTO_MATCH_CANDIDATE_LIMIT):
+    """
+    Match all unreconciled transactions of a bank account against its uncleared vouchers in one pass.
+
+    Returns the ranked candidates per transaction and the pairs that are an exact, unique match on both sides.
+    """
+    frappe.has_permission("Bank Transaction", "read", throw=True)
+
+    transactions, candidates = match_bank_account(bank_account, from_date, to_date, document_types, amount_tolerance)
+
+    limit = frappe.utils.cint(limit)
+
+    return {
+        "matches": {transaction: transaction_candidates[:limit] if limit else transaction_candidates
+                    for transaction, transaction_candidates in candidates.items()},
+        "exact_matches": get_exact_unique_matches(candidates),
+    }
+
+@frappe.whitelist(methods=["POST"])
+def reconcile_exact_matches(bank_account: str,
+                            from_date: str,
+                            to_date: str,
+                            document_types: list[str] | str | None = None):
+    """
+    Reconcile every transaction of the bank account that has an exact, unique voucher match.
+
+    The matches are computed again on the server and reconciled in a background Mint Reconciliation Job.
+    """
+    frappe.has_permission("Bank Transaction", "write", throw=True)
+
+    _transactions, candidates = match_bank_account(bank_account, from_date, to_date, document_types)
+
+    matches = get_exact_unique_matches(candidates)
+
+    if not matches:
+        return {"job": None, "count": 0}
+
+    job = enqueue_reconciliation_job("Match Vouchers",
+                                     [match["bank_transaction"] for match in matches],
+                                     frappe.get_cached_value("Bank Account", bank_account, "company"),
+                                     vouchers={match["bank_transaction"]: [[match["voucher_type"], match["voucher"], match["amount"]]]
+                                               for match in matches})
+
+    return {"job": job, "count": len(matches)}
+
+def match_bank_account(bank_account: str,
+                       from_date: str,
+                       to_date: str,
+                       document_types: list[str] | str | None = None,
+                       amount_tolerance: float = 0.0):
+    """
+    Load the unreconciled transactions and uncleared vouchers of the bank account once,
+    and return the transactions along with all ranked candidates for each of them.
+    """
+    transactions = get_unreconciled_transactions(bank_account, from_date, to_date)
+
+    if not transactions:
+        return [], {}
+
+    vouchers = get_uncleared_vouchers(bank_account, from_date, to_date, document_types)
+
+    return transactions, get_candidates(transactions, vouchers, amount_tolerance)
+
+def get_candidates(transactions: list, vouchers: list, amount_tolerance: float = 0.0):
+    index = VoucherIndex(vouchers, frappe.utils.flt(amount_tolerance))
+
+    candidates = {}
+    for transaction in transactions:
+        candidates[transaction.name] = index.get_candidates(transaction)
+
+    return candidates
+
+@frappe.whitelist(methods=["GET"])
+def get_linked_payments(bank_transaction_names: list[str] | str,
+                        from_date: str,
+                        to_date: str,
+                        document_types: list[str] | str | None = None,
+                        filter_by_reference_date: int = 0,
+                        from_reference_date: str | None = None,
+                        to_reference_date: str | None = None):
+    """
+    Batch version of ERPNext's `get_linked_payments` - the suggested vouchers for several transactions at once,
+    returned as a map from transaction to vouchers.
+
+    Payment Entries and Journal Entries are loaded once per bank account (from the voucher cache) and matched in memory.
+    Other document types, and filtering by reference date, are passed on to ERPNext for every transaction.
+    """
+    frappe.has_permission("Bank Transaction", "read", throw=True)
+
+    if isinstance(bank_transaction_names, str):
+        bank_transaction_names = json.loads(bank_transaction_names)
+
+    if isinstance(document_types, str):
+        document_types = json.loads(document_types)
+
+    document_types = document_types or []
+
+    exact_match = "exact_match" in document_types
+    filter_by_reference_date = frappe.utils.cint(filter_by_reference_date)
+
+    # The voucher cache is organised by posting date - it can't be used to filter by reference date
+    cached_types = [] if filter_by_reference_date else [document_type for document_type in document_types
+                                                        if document_type in VOUCHER_DOCUMENT_TYPES]
+    other_types = [document_type for document_type in document_types
+                   if document_type != "exact_match" and document_type not in cached_types]
+
+    transactions = frappe.get_all("Bank Transaction",
+                                  filters={"name": ["in", bank_transaction_names], "docstatus": 1},
+                                  fields=["name", "bank_account", "date", "deposit", "withdrawal", "currency",
+                                          "unallocated_amount", "reference_number", "description", "party_type", "party"])
+
+    linked_payments = {transaction.name: [] for transaction in transactions}
+
+    if cached_types:
+        by_bank_account = {}
+        for transaction in transactions:
+            transaction.is_deposit = transaction.deposit > 0.0
+            transaction.amount = transaction.unallocated_amount
+            by_bank_account.setdefault(transaction.bank_account, []).append(transaction)
+
+        for bank_account, account_transactions in by_bank_account.items():
+            index = VoucherIndex(get_uncleared_vouchers(bank_account, from_date, to_date, cached_types))
+            for transaction in account_transactions:
+                linked_payments[transaction.name] = index.get_linked_payments(transaction, exact_match)
+
+    if other_types:
+        from erpnext.accounts.doctype.bank_reconciliation_tool.bank_reconciliation_tool import get_linked_payments as get_erpnext_linked_payments
+
+        if exact_match:
+            other_types.append("exact_match")
+
+        for transaction in transactions:
+            vouchers = get_erpnext_linked_payments(transaction.name, other_types, from_date, to_date,
+                                                   filter_by_reference_date, from_reference_date, to_reference_date)
+            linked_payments[transaction.name] = sorted(linked_payments[transaction.name] + list(vouchers),
+                                                       key=lambda voucher: -(voucher.get("rank") or 0))
+
+    return linked_payments
+
+@frappe.whitelist(methods=["POST"])
+def run_split_matching(bank_account: str,
+                       from_date: str,
+                       to_date: str,
+                       document_types: list[str] | str | None = None,
+                       amount_tolerance: float = 0.0,
+                       date_window: int = 7):
+    """
+    Search for combinations of vouchers that add up to a transaction (and of transactions that add up to a voucher)
+    in the background. The result is published as a realtime event and can be fetched with `get_split_matches`.
+    """
+    frappe.has_permission("Bank Transaction", "read", throw=True)
+
+    frappe.enqueue(method=_run_split_matching,
+                   queue="long",
+                   job_id=f"mint_split_matching::{bank_account}",
+                   deduplicate=True,
+                   bank_account=bank_account,
+                   from_date=from_date,
+                   to_date=to_date,
+                   document_types=document_types,
+                   amount_tolerance=amount_tolerance,
+                   date_window=date_window)
+
+def _run_split_matching(bank_account: str,
+                        from_date: str,
+                        to_date: str,
+                        document_types: list[str] | str | None = None,
+                        amount_tolerance: float = 0.0,
+                        date_window: int = 7):
+    matches = find_split_matches(bank_account, from_date, to_date, document_types, amount_tolerance, date_window)
+
+    frappe.cache.set_value(get_split_matches_key(bank_account), {
+        "from_date": str(from_date),
+        "to_date": str(to_date),
+        "matches": matches,
+    }, expires_in_sec=SPLIT_MATCH_EXPIRY)
+
+    frappe.publish_realtime("mint-split-matching-complete", {
+        "bank_account": bank_account,
+        "count": len(matches),
+    }, user=frappe.session.user)
+
+@frappe.whitelist(methods=["GET"])
+def get_split_matches(bank_account: str):
+    """
+    Result of the last split matching run of the bank account
+    """
+    frappe.has_permission("Bank Transaction", "read", throw=True)
+
+    return frappe.cache.get_value(get_split_matches_key(bank_account))
+
+@frappe.whitelist(methods=["POST"])
+def reconcile_split_matches(bank_account: str, matches: list[dict] | str):
+    """
+    Reconcile the selected split matches in a background Mint Reconciliation Job
+    """
+    frappe.has_permission("Bank Transaction", "write", throw=True)
+
+    if isinstance(matches, str):
+        matches = json.loads(matches)
+
+    vouchers = {}
+    for match in matches:
+        for bank_transaction in match["bank_transactions"]:
+            if bank_transaction in vouchers:
+                frappe.throw(_("Bank Transaction {0} is part of more than one match").format(bank_transaction))
+
+            vouchers[bank_transaction] = [[voucher["voucher_type"], voucher["voucher"], voucher["amount"]] for voucher in match["vouchers"]]
+
+    if not vouchers:
+        return {"job": None}
+
+    job = enqueue_reconciliation_job("Match Vouchers",
+                                     list(vouchers.keys()),
+                                     frappe.get_cached_value("Bank Account", bank_account, "company"),
+                                     vouchers=vouchers)
+
+    frappe.cache.delete_value(get_split_matches_key(bank_account))
+
+    return {"job": job}
+
+def get_split_matches_key(bank_account: str):
+    return f"mint:split_matches:{bank_account}"
+
+def find_split_matches(bank_account: str,
+                       from_date: str,
+                       to_date: str,
+                       document_types: list[str] | str | None = None,
+                       amount_tolerance: float = 0.0,
+                       date_window: int = 7):
+    """
+    Find split payments in a bank account:
+
+    - Many to One: several vouchers that together make up one transaction (a customer paying three invoices at once)
+    - One to Many: one voucher that cleared as several transactions (a payroll voucher paid out as separate withdrawals)
+
+    Transactions and vouchers that already have an exact single match are left out. Every transaction and voucher
+    is used in at most one match. The combination search is bounded per target, see `find_subset_sum`.
+    """
+    transactions = get_unreconciled_transactions(bank_account, from_date, to_date)
+
+    if not transactions:
+        return []
+
+    vouchers = get_uncleared_vouchers(bank_account, from_date, to_date, document_types)
+
+    candidates = get_candidates(transactions, vouchers, amount_tolerance)
+
+    tolerance = get_cents(frappe.utils.flt(amount_tolerance))
+    window = datetime.timedelta(days=frappe.utils.cint(date_window))
+
+    # Anything with an exact single match should be reconciled as a pair, not as part of a combination
+    used_transactions = set()
+    used_vouchers = set()
+    for transaction, transaction_candidates in candidates.items():
+        for candidate in transaction_candidates:
+            if candidate["amount_match"] == "Exact":
+                used_transactions.add(transaction)
+                used_vouchers.add((candidate["doctype"], candidate["name"]))
+
+    matches = []
+
+    vouchers_by_date = SortedByDate(vouchers, "posting_date")
+
+    for transaction in transactions:
+        if transaction.name in used_transactions:
+            continue
+
+        items = [
+            ((voucher["doctype"], voucher["name"]), get_cents(voucher["amount"]))
+            for voucher in vouchers_by_date.get_near(transaction.date, window)
+            if voucher["is_deposit"] == transaction.is_deposit and (voucher["doctype"], voucher["name"]) not in used_vouchers
+        ]
+
+        combination = find_subset_sum(get_cents(transaction.amount), items, tolerance)
+        if not combination:
+            continue
+
+        used_transactions.add(transaction.name)
+        used_vouchers.update(combination)
+
+        combination = set(combination)
+        matched = [voucher for voucher in vouchers if (voucher["doctype"], voucher["name"]) in combination]
+
+        matches.append({
+            "type": "Many to One",
+            "bank_transactions": [transaction.name],
+            "vouchers": [{"voucher_type": voucher["doctype"], "voucher": voucher["name"], "amount": voucher["amount"]} for voucher in matched],
+            "amount": transaction.amount,
+        })
+
+    transactions_by_date = SortedByDate(transactions, "date")
+    transactions_by_name = {transaction.name: transaction for transaction in transactions}
+
+    for voucher in vouchers:
+        if (voucher["doctype"], voucher["name"]) in used_vouchers:
+            continue
+
+        items = [
+            (transaction.name, get_cents(transaction.amount))
+            for transaction in transactions_by_date.get_near(voucher["posting_date"], window)
+            if transaction.is_deposit == voucher["is_deposit"] and transaction.name not in used_transactions
+        ]
+
+        combination = find_subset_sum(get_cents(voucher["amount"]), items, tolerance)
+        if not combination:
+            continue
+
+        used_vouchers.add((voucher["doctype"], voucher["name"]))
+        used_transactions.update(combination)
+
+        matches.append({
+            "type": "One to Many",
+            "bank_transactions": combination,
+            "vouchers": [{"voucher_type": voucher["doctype"], "voucher": voucher["name"], "amount": voucher["amount"]}],
+            "amount": sum(transactions_by_name[name].amount for name in combination),
+        })
+
+    return matches
+
+
+class SortedByDate:
+    """
+    Rows sorted by a date field, to get the rows within a number of days of a date with two bisects.
+    Rows closest to the date come first.
+    """
+
+    def __init__(self, rows: list, fieldname: str):
+        self.rows = sorted(rows, key=lambda row: row[fieldname])
+        self.dates = [row[fieldname] for row in self.rows]
+        self.fieldname = fieldname
+
+    def get_near(self, date: datetime.date, window: datetime.timedelta):
+        start = bisect_left(self.dates, date - window)
+        end = bisect_right(self.dates, date + window)
+        return sorted(self.rows[start:end], key=lambda row: abs(row[self.fieldname] - date))
+
+def get_unreconciled_transactions(bank_account: str, from_date: str, to_date: str):
+    transactions = frappe.get_all("Bank Transaction",
+                                  filters={
+                                      "bank_account": bank_account,
+                                      "docstatus": 1,
+                                      "unallocated_amount": [">", 0.0],
+                                      "date": ["between", [from_date, to_date]],
+                                  },
+                                  fields=["name", "date", "deposit", "withdrawal", "currency", "unallocated_amount",
+                                          "reference_number", "description", "party_type", "party"],
+                                  order_by="date asc, name asc")
+
+    for transaction in transactions:
+        transaction.is_deposit = transaction.deposit > 0.0
+        transaction.amount = transaction.unallocated_amount
+
+    return transactions
+
+
+@frappe.whitelist(methods=["GET"])
+def get_mirror_transfers(company: str, from_date: str, to_date: str):
+    """
+    Find all pairs of a withdrawal in one bank account and a deposit of the same amount in another bank account
+    of the company, within the "Transfer Match Days" of Mint Settings.
+    """
+    frappe.has_permission("Bank Transaction", "read", throw=True)
+
+    return find_mirror_transfers(company, from_date, to_date)
+
+@frappe.whitelist(methods=["POST"])
+def create_mirror_transfers(company: str, pairs: list[dict] | str):
+    """
+    Create an internal transfer for every pair of mirror transactions and reconcile both sides,
+    in a background Mint Reconciliation Job.
+
+    `pairs` is a list of dicts with the withdrawal and deposit transaction names (as returned by `get_mirror_transfers`)
+    """
+    frappe.has_permission("Bank Transaction", "write", throw=True)
+
+    from mint.apis.bank_reconciliation import get_bank_transaction_details
+
+    if isinstance(pairs, str):
+        pairs = json.loads(pairs)
+
+    if not pairs:
+        return {"job": None}
+
+    transactions = get_bank_transaction_details([pair["withdrawal"] for pair in pairs] + [pair["deposit"] for pair in pairs])
+
+    for transaction in transactions.values():
+        if transaction.company != company:
+            frappe.throw(_("Bank Transaction {0} does not belong to company {1}").format(transaction.name, company))
+
+    mirror_transactions = {}
+    used_deposits = set()
+    for pair in pairs:
+        if pair["withdrawal"] in mirror_transactions:
+            frappe.throw(_("Bank Transaction {0} is part of more than one transfer").format(pair["withdrawal"]))
+
+        if pair["deposit"] in used_deposits:
+            frappe.throw(_("Bank Transaction {0} is part of more than one transfer").format(pair["deposit"]))
+
+        used_deposits.add(pair["deposit"])
+        mirror_transactions[pair["withdrawal"]] = [pair["deposit"], transactions[pair["deposit"]].bank_gl_account]
+
+    job = enqueue_reconciliation_job("Internal Transfer",
+                                     list(mirror_transactions.keys()),
+                                     company,
+                                     mirror_transactions=mirror_transactions)
+
+    return {"job": job}
+
+def find_mirror_transfers(company: str, from_date: str, to_date: str):
+    """
+    Sort-merge withdrawals and deposits of the same amount by date to find mirror transactions across bank accounts.
+
+    When a transaction could pair with several others, the pairs closest in date are taken first and every
+    transaction is used once. Pairs where either side had more than one candidate are flagged as ambiguous.
+    """
+    days = frappe.db.get_single_value("Mint Settings", "transfer_match_days") or 4
+    window = datetime.timedelta(days=days)
+
+    transactions = frappe.get_all("Bank Transaction",
+                                  filters={
+                                      "company": company,
+                                      "docstatus": 1,
+                                      "status": "Unreconciled",
+                                      "date": ["between", [frappe.utils.add_days(from_date, -days), frappe.utils.add_days(to_date, days)]],
+                                  },
+                                  fields=["name", "date", "withdrawal", "deposit", "bank_account",
+                                          "currency", "reference_number", "description"],
+                                  order_by="date asc, name asc")
+
+    withdrawals = {}
+    deposits = {}
+    for transaction in transactions:
+        if transaction.withdrawal > 0.0:
+            withdrawals.setdefault((transaction.currency, get_cents(transaction.withdrawal)), []).append(transaction)
+        elif transaction.deposit > 0.0:
+            deposits.setdefault((transaction.currency, get_cents(transaction.deposit)), []).append(transaction)
+
+    from_date = frappe.utils.getdate(from_date)
+    to_date = frappe.utils.getdate(to_date)
+
+    pairs = []
+
+    for key, amount_withdrawals in withdrawals.items():
+        amount_deposits = deposits.get(key)
+        if not amount_deposits:
+            continue
+
+        # Both lists are sorted by date - move the start of the deposit window along with the withdrawals
+        edges = []
+        start = 0
+        for withdrawal in amount_withdrawals:
+            while start < len(amount_deposits) and amount_deposits[start].date < withdrawal.date - window:
+                start += 1
+
+            idx = start
+            while idx < len(amount_deposits) and amount_deposits[idx].date <= withdrawal.date + window:
+                deposit = amount_deposits[idx]
+                if deposit.bank_account != withdrawal.bank_account:
+                    edges.append((abs((deposit.date - withdrawal.date).days), withdrawal, deposit))
+                idx += 1
+
+        candidate_counts = {}
+        for _difference, withdrawal, deposit in edges:
+            candidate_counts[withdrawal.name] = candidate_counts.get(withdrawal.name, 0) + 1
+            candidate_counts[deposit.name] = candidate_counts.get(deposit.name, 0) + 1
+
+        used = set()
+        for difference, withdrawal, deposit in sorted(edges, key=lambda edge: (edge[0], edge[1].date, edge[1].name, edge[2].name)):
+            if withdrawal.name in used or deposit.name in used:
+                continue
+
+            # The window was widened to find mirrors of transactions at the edges - one side has to be in the range
+            if not (from_date <= withdrawal.date <= to_date or from_date <= deposit.date <= to_date):
+                continue
+
+            used.add(withdrawal.name)
+            used.add(deposit.name)
+
+            pairs.append({
+                "withdrawal": withdrawal.name,
+                "deposit": deposit.name,
+                "amount": withdrawal.withdrawal,
+                "currency": withdrawal.currency,
+                "withdrawal_date": withdrawal.date,
+                "deposit_date": deposit.date,
+                "withdrawal_bank_account": withdrawal.bank_account,
+                "deposit_bank_account": deposit.bank_account,
+                "withdrawal_description": withdrawal.description,
+                "deposit_description": deposit.description,
+                "date_difference": difference,
+                "is_ambiguous": candidate_counts[withdrawal.name] > 1 or candidate_counts[deposit.name] > 1,
+            })
+
+    pairs.sort(key=lambda pair: (pair["withdrawal_date"], pair["withdrawal"]))
+
+    return pairs
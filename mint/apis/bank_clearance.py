@@ -1,4 +1,5 @@
 import frappe
+from mint.apis.voucher_cache import queue_voucher_cache_update
 
 @frappe.whitelist()
 def update_clearance_date(payment_document: str, payment_entry: str, account: str, clearance_date: str | None):
@@ -24,3 +25,4 @@ def update_clearance_date(payment_document: str, payment_entry: str, account: st
         frappe.db.set_value(
             payment_document, payment_entry, "clearance_date", clearance_date
         )
+        queue_voucher_cache_update([(payment_document, payment_entry)])
@@ -5,6 +5,11 @@ import datetime
 from erpnext.accounts.doctype.bank_reconciliation_tool.bank_reconciliation_tool import create_payment_entry_bts, create_journal_entry_bts
 from erpnext.accounts.party import get_party_account
 from erpnext import get_default_cost_center
+from mint.apis.reconciliation_jobs import enqueue_reconciliation_job
+from mint.apis.voucher_cache import queue_voucher_cache_update
+
+# Results of requests sent with an idempotency key are kept for a day, so that clients can retry them safely
+IDEMPOTENCY_KEY_EXPIRY = 24 * 60 * 60
 
 @frappe.whitelist()
 def clear_clearing_date(voucher_type: str, voucher_name: str):
@@ -16,22 +21,30 @@ def clear_clearing_date(voucher_type: str, voucher_name: str):
 
     if payment_entry.has_permission("write"):
         payment_entry.db_set("clearance_date", None)
+        queue_voucher_cache_update([(voucher_type, voucher_name)])
 
 
 @frappe.whitelist()
 def reconcile_vouchers(bank_transaction_name: str | int, vouchers: str, is_new_voucher: bool = False):
-	 
-    # updated clear date of all the vouchers based on the bank transaction
+    """
+        Reconcile vouchers against a bank transaction without saving the whole Bank Transaction document.
+
+        The transaction row is locked, the allocation is computed in memory with ERPNext's own methods,
+        and only the new payment rows and the changed amount/status columns are written.
+        Results are the same as saving the Bank Transaction - see mint/tests/test_reconcile_vouchers.py
+    """
     vouchers = json.loads(vouchers)
-    transaction = frappe.get_doc("Bank Transaction", bank_transaction_name)
-    
-    # Add the vouchers with zero allocation. Save() will perform the allocations and clearance
-    # We are overriding the default behavior of the method to set the reconciliation type
+
+    transaction = get_locked_bank_transaction(bank_transaction_name)
+
     if 0.0 >= transaction.unallocated_amount:
         frappe.throw(_("Bank Transaction {0} is already fully reconciled").format(transaction.name))
-    
+
+    transaction.check_permission("write")
+
+    new_rows = []
     for voucher in vouchers:
-        transaction.append(
+        new_rows.append(transaction.append(
             "payment_entries",
             {
                 "payment_document": voucher["payment_doctype"],
@@ -39,15 +52,104 @@ def reconcile_vouchers(bank_transaction_name: str | int, vouchers: str, is_new_v
                 "allocated_amount": 0.0,  # Temporary
                 "reconciliation_type": "Voucher Created" if is_new_voucher else "Matched",
             },
-        )
+        ))
+
+    # Existing rows are already allocated, so only the new rows are allocated (and their vouchers cleared) here
     transaction.validate_duplicate_references()
     transaction.allocate_payment_entries()
     transaction.update_allocated_amount()
-    transaction.set_status()
-    transaction.save()
-    
+
+    now = frappe.utils.now()
+
+    # Vouchers that had nothing left to allocate are dropped by the allocation
+    remaining_rows = {id(row) for row in transaction.payment_entries}
+    new_rows = [row for row in new_rows if id(row) in remaining_rows]
+    existing_rows = len(transaction.payment_entries) - len(new_rows)
+
+    for idx, row in enumerate(new_rows, start=existing_rows + 1):
+        row.idx = idx
+        row.docstatus = transaction.docstatus
+        row.owner = row.modified_by = frappe.session.user
+        row.creation = row.modified = now
+        row.db_insert()
+
+    transaction.status = "Unreconciled" if transaction.unallocated_amount > 0 else "Reconciled"
+    transaction.modified = now
+    transaction.modified_by = frappe.session.user
+
+    frappe.db.set_value("Bank Transaction", transaction.name, {
+        "allocated_amount": transaction.allocated_amount,
+        "unallocated_amount": transaction.unallocated_amount,
+        "status": transaction.status,
+        "modified": transaction.modified,
+        "modified_by": transaction.modified_by,
+    }, update_modified=False)
+
+    # No document hooks run here - update the cached vouchers whose allocation or clearance changed
+    queue_voucher_cache_update([(row.payment_document, row.payment_entry) for row in new_rows])
+
     return transaction
 
+def get_locked_bank_transaction(bank_transaction_name: str | int):
+    """
+        Lock the bank transaction row (SELECT ... FOR UPDATE) and load it with its payment rows
+        without running any document hooks.
+    """
+    transaction = frappe.db.sql("""
+        SELECT * FROM `tabBank Transaction` WHERE name = %s FOR UPDATE
+    """, (bank_transaction_name,), as_dict=True)
+
+    if not transaction:
+        frappe.throw(_("Bank Transaction {0} not found").format(bank_transaction_name), frappe.DoesNotExistError)
+
+    payment_entries = frappe.db.sql("""
+        SELECT * FROM `tabBank Transaction Payments`
+        WHERE parent = %s AND parenttype = 'Bank Transaction' AND parentfield = 'payment_entries'
+        ORDER BY idx
+    """, (bank_transaction_name,), as_dict=True)
+
+    return frappe.get_doc({
+        **transaction[0],
+        "doctype": "Bank Transaction",
+        "payment_entries": payment_entries,
+    })
+
+def lock_bank_transaction(bank_transaction_name: str | int, throw_if_reconciled: bool = True):
+    """
+        Lock the bank transaction row until the end of the request.
+
+        Called before a voucher is created for the transaction - a concurrent request for the same transaction
+        waits for this one to finish, and then fails here instead of after it has already submitted its voucher.
+    """
+    transaction = frappe.db.sql("""
+        SELECT name, unallocated_amount FROM `tabBank Transaction` WHERE name = %s FOR UPDATE
+    """, (bank_transaction_name,), as_dict=True)
+
+    if not transaction:
+        frappe.throw(_("Bank Transaction {0} not found").format(bank_transaction_name), frappe.DoesNotExistError)
+
+    if throw_if_reconciled:
+        validate_not_reconciled(transaction[0])
+
+    return transaction[0]
+
+def validate_not_reconciled(transaction: dict):
+    if 0.0 >= transaction.unallocated_amount:
+        frappe.throw(_("Bank Transaction {0} is already fully reconciled").format(transaction.name))
+
+def get_locked_bank_transaction_details(bank_transaction_name: str | int, transaction_details: dict | None = None):
+    """
+        Lock the bank transaction, then load its details (see `get_bank_transaction_details`) inside the lock.
+
+        Details prefetched by bulk actions can be older than the lock - their unallocated amount is replaced
+        with the one of the locked row.
+    """
+    transaction = lock_bank_transaction(bank_transaction_name)
+
+    details = transaction_details or get_bank_transaction_details([bank_transaction_name])[bank_transaction_name]
+
+    return frappe._dict({**details, "unallocated_amount": transaction.unallocated_amount})
+
 @frappe.whitelist()
 def unreconcile_transaction(transaction_name: str | int):
     """
@@ -56,11 +158,20 @@ def unreconcile_transaction(transaction_name: str | int):
         If the individual entries in the bank transaction are matched, just remove the payment entries
         Else, cancel the individual entries
     """
+    unreconcile_bank_transaction(transaction_name)
+
+def unreconcile_bank_transaction(transaction_name: str | int):
+    """
+        Remove all payment entries of the transaction and cancel the vouchers that were created for it.
+        Returns the removed entries as (voucher type, voucher, reconciliation type)
+    """
     transaction = frappe.get_doc("Bank Transaction", transaction_name)
 
     vouchers_to_cancel = []
+    removed_entries = []
 
     for entry in transaction.payment_entries:
+        removed_entries.append((entry.payment_document, entry.payment_entry, entry.reconciliation_type))
         if entry.reconciliation_type == "Voucher Created":
             vouchers_to_cancel.append({
                 "doctype": entry.payment_document,
@@ -72,6 +183,62 @@ def unreconcile_transaction(transaction_name: str | int):
     for voucher in vouchers_to_cancel:
         frappe.get_doc(voucher["doctype"], voucher["name"]).cancel()
 
+    return removed_entries
+
+@frappe.whitelist(methods=["POST"])
+def bulk_unreconcile_transactions(bank_transaction_names: list[str | int] | str | None = None,
+                                  matched_rule: str | None = None,
+                                  bank_account: str | None = None,
+                                  from_date: str | datetime.date | None = None,
+                                  to_date: str | datetime.date | None = None):
+    """
+        Unreconcile many bank transactions in the background - vouchers created for them are cancelled
+        and matched vouchers are unlinked.
+
+        Pass either the transactions, or filters: all reconciled transactions matched to `matched_rule`
+        and/or of the `bank_account`, optionally in a date range.
+
+        Returns the Mint Reconciliation Job to poll for the result
+    """
+    if isinstance(bank_transaction_names, str):
+        bank_transaction_names = json.loads(bank_transaction_names)
+
+    if not bank_transaction_names:
+        if not matched_rule and not bank_account:
+            frappe.throw(_("Select the bank transactions to unreconcile, or filter them by rule or bank account"))
+
+        filters = {
+            "docstatus": 1,
+            "allocated_amount": [">", 0.0],
+        }
+
+        if matched_rule:
+            filters["matched_rule"] = matched_rule
+
+        if bank_account:
+            filters["bank_account"] = bank_account
+
+        if from_date and to_date:
+            filters["date"] = ["between", [from_date, to_date]]
+        elif from_date:
+            filters["date"] = [">=", from_date]
+        elif to_date:
+            filters["date"] = ["<=", to_date]
+
+        bank_transaction_names = frappe.get_list("Bank Transaction",
+                                                 filters=filters,
+                                                 pluck="name",
+                                                 order_by="date asc, name asc")
+
+    if not bank_transaction_names:
+        return {"job": None, "count": 0}
+
+    job = enqueue_reconciliation_job("Unreconcile",
+                                     bank_transaction_names,
+                                     get_bank_transaction_company(bank_transaction_names))
+
+    return {"job": job, "count": len(bank_transaction_names)}
+
 @frappe.whitelist()
 def undo_reconciliation_action(bank_transaction_id: str | int, voucher_type: str, voucher_id: str | int):
     """
@@ -99,36 +266,49 @@ def create_bulk_internal_transfer(bank_transaction_names: list[str|int],
                                   bank_account: str):
     """
         Create an internal transfer for multiple bank transactions
+
+        The transfers are created in the background - returns the Mint Reconciliation Job to poll for the result
     """
-    output = []
+    job = enqueue_reconciliation_job("Internal Transfer",
+                                     bank_transaction_names,
+                                     get_bank_transaction_company(bank_transaction_names),
+                                     account=bank_account)
 
-    for bank_transaction_name in bank_transaction_names:
+    return {"job": job}
 
-        bank_transaction = frappe.db.get_value("Bank Transaction", bank_transaction_name, ["name", "withdrawal", "bank_account", "date", "reference_number", "description"], as_dict=True)
+def create_internal_transfer_for_transaction(bank_transaction_name: str | int,
+                                             account: str,
+                                             transaction_details: dict | None = None,
+                                             mirror_transaction_name: str | int | None = None):
+    """
+        Create an internal transfer between the bank account of the transaction and the given account for the unallocated amount
 
-        transaction_account = frappe.get_cached_value("Bank Account", bank_transaction.bank_account, "account")
+        Bulk actions pass the `transaction_details` prefetched with `get_bank_transaction_details`.
+        If the transfer shows up as a transaction in the other bank account too, pass it as `mirror_transaction_name`
+        to reconcile it against the same payment entry.
+    """
+    bank_transaction = get_locked_bank_transaction_details(bank_transaction_name, transaction_details)
 
-        is_withdrawal = bank_transaction.withdrawal > 0.0
+    transaction_account = bank_transaction.bank_gl_account
 
-        if is_withdrawal:
-            paid_from = transaction_account
-            paid_to = bank_account
-        else:
-            paid_from = bank_account
-            paid_to = transaction_account
-        
-        reference_no = (bank_transaction.reference_number or bank_transaction.description or '')[:140]
-        
-        final_transaction = create_internal_transfer(bank_transaction_name=bank_transaction.name,
-                                 posting_date=bank_transaction.date,
-                                 reference_date=bank_transaction.date,
-                                 reference_no=reference_no,
-                                 paid_from=paid_from,
-                                 paid_to=paid_to,)
-        
-        output.append(final_transaction)
+    is_withdrawal = bank_transaction.withdrawal > 0.0
+
+    if is_withdrawal:
+        paid_from = transaction_account
+        paid_to = account
+    else:
+        paid_from = account
+        paid_to = transaction_account
     
-    return output
+    reference_no = (bank_transaction.reference_number or bank_transaction.description or '')[:140]
+    
+    return make_internal_transfer(bank_transaction,
+                                  posting_date=bank_transaction.date,
+                                  reference_date=bank_transaction.date,
+                                  reference_no=reference_no,
+                                  paid_from=paid_from,
+                                  paid_to=paid_to,
+                                  mirror_transaction_name=mirror_transaction_name)
 
 @frappe.whitelist()
 def create_internal_transfer(bank_transaction_name: str|int, 
@@ -145,10 +325,34 @@ def create_internal_transfer(bank_transaction_name: str|int,
     Create an internal transfer payment entry
     """
 
-    bank_transaction = frappe.get_doc("Bank Transaction", bank_transaction_name)
-
-    bank_account = frappe.get_cached_value("Bank Account", bank_transaction.bank_account, "account")
-    company = frappe.get_cached_value("Account", bank_account, "company")
+    bank_transaction = get_locked_bank_transaction_details(bank_transaction_name)
+
+    return make_internal_transfer(bank_transaction,
+                                  posting_date=posting_date,
+                                  reference_date=reference_date,
+                                  reference_no=reference_no,
+                                  paid_from=paid_from,
+                                  paid_to=paid_to,
+                                  custom_remarks=custom_remarks,
+                                  remarks=remarks,
+                                  mirror_transaction_name=mirror_transaction_name,
+                                  dimensions=dimensions)
+
+def make_internal_transfer(bank_transaction: dict,
+                           posting_date: str | datetime.date,
+                           reference_date: str | datetime.date,
+                           reference_no: str,
+                           paid_from: str,
+                           paid_to: str,
+                           custom_remarks: bool = False,
+                           remarks: str = None,
+                           mirror_transaction_name: str | int = None,
+                           dimensions: dict = None):
+    """
+    Create an internal transfer payment entry for a transaction loaded with `get_locked_bank_transaction_details`
+    """
+    bank_account = bank_transaction.bank_gl_account
+    company = bank_transaction.account_company
 
     is_withdrawal = bank_transaction.withdrawal > 0.0
 
@@ -192,7 +396,7 @@ def create_internal_transfer(bank_transaction_name: str|int,
 		]
 	)
 
-    transaction_id = reconcile_vouchers(bank_transaction_name, vouchers, is_new_voucher=True)
+    transaction_id = reconcile_vouchers(bank_transaction.name, vouchers, is_new_voucher=True)
 
     if mirror_transaction_name:
         # Reconcile the mirror transaction
@@ -208,67 +412,85 @@ def create_bulk_bank_entry_and_reconcile(bank_transactions: list[str|int],
                                          account: str):
     """
      Create bank entries for all transactions and reconcile them
-    """
 
-    output = []
-
-    for bank_transaction in bank_transactions:
-        transactions_details = frappe.db.get_value("Bank Transaction", bank_transaction, ["name", "deposit", "withdrawal", "bank_account", "currency", "unallocated_amount", "date", "reference_number", "description"], as_dict=True)
+     The entries are created in the background - returns the Mint Reconciliation Job to poll for the result
+    """
+    job = enqueue_reconciliation_job("Bank Entry",
+                                     bank_transactions,
+                                     get_bank_transaction_company(bank_transactions),
+                                     account=account)
+
+    return {"job": job}
+
+def create_bank_entry_for_transaction(bank_transaction: str | int,
+                                      account: str | None = None,
+                                      get_counter_entries=None,
+                                      transaction_details: dict | None = None,
+                                      report_types: dict | None = None):
+    """
+     Create a bank entry for the unallocated amount of the transaction and reconcile it
 
-        is_credit_card = frappe.get_cached_value("Bank Account", transactions_details.bank_account, "is_credit_card")
+     By default the full amount is posted against the given account.
+     To split it across multiple accounts, pass `get_counter_entries` - a function that receives the transaction details
+     and returns the entries for the other side of the bank account.
 
-        # Check Number will be limited to 140 characters
-        cheque_no = (transactions_details.reference_number or transactions_details.description or '')[:140]
+     Bulk actions pass the `transaction_details` and account `report_types` prefetched for all transactions.
+    """
+    transactions_details = get_locked_bank_transaction_details(bank_transaction, transaction_details)
 
-        is_withdrawal = transactions_details.withdrawal > 0.0
+    is_credit_card = transactions_details.is_credit_card
 
-        entries = []
+    # Check Number will be limited to 140 characters
+    cheque_no = (transactions_details.reference_number or transactions_details.description or '')[:140]
 
-        gl_account = frappe.get_cached_value("Bank Account", transactions_details.bank_account, "account")
+    is_withdrawal = transactions_details.withdrawal > 0.0
 
-        if is_withdrawal:
-            entries.append({
-                "account": gl_account,
-                "bank_account": transactions_details.bank_account,
-                "credit_in_account_currency": transactions_details.unallocated_amount,
-                "credit": transactions_details.unallocated_amount,
-                "debit_in_account_currency": 0,
-                "debit": 0,
-            })
+    entries = []
 
-            entries.append({
-                "account": account,
-                "credit": 0,
-                "debit": transactions_details.unallocated_amount,
-            })
-        else:
-            entries.append({
-                "account": gl_account,
-                "bank_account": transactions_details.bank_account,
-                "debit_in_account_currency": transactions_details.unallocated_amount,
-                "debit": transactions_details.unallocated_amount,
-                "credit_in_account_currency": 0,
-                "credit": 0,
-            })
+    gl_account = transactions_details.bank_gl_account
 
-            entries.append({
-                "account": account,
-                "debit": 0,
-                "credit": transactions_details.unallocated_amount,
-            })
+    if is_withdrawal:
+        entries.append({
+            "account": gl_account,
+            "bank_account": transactions_details.bank_account,
+            "credit_in_account_currency": transactions_details.unallocated_amount,
+            "credit": transactions_details.unallocated_amount,
+            "debit_in_account_currency": 0,
+            "debit": 0,
+        })
+    else:
+        entries.append({
+            "account": gl_account,
+            "bank_account": transactions_details.bank_account,
+            "debit_in_account_currency": transactions_details.unallocated_amount,
+            "debit": transactions_details.unallocated_amount,
+            "credit_in_account_currency": 0,
+            "credit": 0,
+        })
 
-        final_transaction = create_bank_entry_and_reconcile(bank_transaction_name=bank_transaction,
-                                        cheque_date=transactions_details.date,
-                                        posting_date=transactions_details.date,
-                                        cheque_no=cheque_no,
-                                        user_remark=transactions_details.description,
-                                        entries=entries,
-                                        voucher_type=("Credit Card Entry" if is_credit_card else "Bank Entry"))
-        
-        output.append(final_transaction)
-    
-    return output
+    if get_counter_entries:
+        entries.extend(get_counter_entries(transactions_details))
+    elif is_withdrawal:
+        entries.append({
+            "account": account,
+            "credit": 0,
+            "debit": transactions_details.unallocated_amount,
+        })
+    else:
+        entries.append({
+            "account": account,
+            "debit": 0,
+            "credit": transactions_details.unallocated_amount,
+        })
 
+    return make_bank_entry_and_reconcile(transactions_details,
+                                         cheque_date=transactions_details.date,
+                                         posting_date=transactions_details.date,
+                                         cheque_no=cheque_no,
+                                         user_remark=transactions_details.description,
+                                         entries=entries,
+                                         voucher_type=("Credit Card Entry" if is_credit_card else "Bank Entry"),
+                                         report_types=report_types)
 
 
 @frappe.whitelist(methods=['POST'])
@@ -279,20 +501,50 @@ def create_bank_entry_and_reconcile(bank_transaction_name: str | int,
                                     entries: list,
                                     user_remark: str = None,
                                     voucher_type: str = "Bank Entry",
-                                    dimensions: dict = None):
+                                    dimensions: dict = None,
+                                    idempotency_key: str | None = None):
     """
         Create a bank entry and reconcile it with the bank transaction
-    """
-    # Create a new journal entry based on the bank transaction
-    bank_transaction = frappe.db.get_values(
-        "Bank Transaction",
-        bank_transaction_name,
-        fieldname=["name", "deposit", "withdrawal", "bank_account", "currency", "unallocated_amount"],
-        as_dict=True,
-    )[0]
 
-    bank_account = frappe.get_cached_value("Bank Account", bank_transaction.bank_account, "account")
-    company = frappe.get_cached_value("Account", bank_account, "company")
+        A request that is retried with the same `idempotency_key` returns the result of the first request
+    """
+    locked_transaction = lock_bank_transaction(bank_transaction_name, throw_if_reconciled=False)
+
+    result = get_idempotent_result(idempotency_key, bank_transaction_name)
+    if result:
+        return result
+
+    validate_not_reconciled(locked_transaction)
+
+    bank_transaction = get_bank_transaction_details([bank_transaction_name])[bank_transaction_name]
+
+    result = make_bank_entry_and_reconcile(bank_transaction,
+                                           cheque_date=cheque_date,
+                                           posting_date=posting_date,
+                                           cheque_no=cheque_no,
+                                           entries=entries,
+                                           user_remark=user_remark,
+                                           voucher_type=voucher_type,
+                                           dimensions=dimensions)
+
+    set_idempotent_result(idempotency_key, bank_transaction_name, "journal_entry", result["journal_entry"])
+
+    return result
+
+def make_bank_entry_and_reconcile(bank_transaction: dict,
+                                  cheque_date: str | datetime.date,
+                                  posting_date: str | datetime.date,
+                                  cheque_no: str,
+                                  entries: list,
+                                  user_remark: str = None,
+                                  voucher_type: str = "Bank Entry",
+                                  dimensions: dict = None,
+                                  report_types: dict | None = None):
+    """
+        Create a bank entry for a transaction and reconcile it - the caller has to lock the transaction
+        (see `lock_bank_transaction`) before loading it with `get_bank_transaction_details`
+    """
+    company = bank_transaction.account_company
 
     default_cost_center = get_default_cost_center(company)
 
@@ -315,7 +567,10 @@ def create_bank_entry_and_reconcile(bank_transaction_name: str | int,
         cost_center = entry.get("cost_center")
 
         if not cost_center:
-            report_type = frappe.get_cached_value("Account", entry["account"], "report_type")
+            if report_types and entry["account"] in report_types:
+                report_type = report_types[entry["account"]]
+            else:
+                report_type = frappe.get_cached_value("Account", entry["account"], "report_type")
             if report_type == "Profit and Loss":
                 # Cost center is required
                 cost_center = default_cost_center
@@ -342,7 +597,7 @@ def create_bank_entry_and_reconcile(bank_transaction_name: str | int,
     else:
         paid_amount = bank_transaction.withdrawal
 
-    transaction = reconcile_vouchers(bank_transaction_name, json.dumps([{
+    transaction = reconcile_vouchers(bank_transaction.name, json.dumps([{
         "payment_doctype": "Journal Entry",
         "payment_name": bank_entry.name,
         "amount": paid_amount,
@@ -360,69 +615,97 @@ def create_bulk_payment_entry_and_reconcile(bank_transaction_names: list[str | i
                                             account: str,
                                             mode_of_payment: str | None = None):
     """
-        Create a payment entry and reconcile it with the bank transaction
-    """
-
-    output = []
+        Create a payment entry for each bank transaction and reconcile it
 
-    for bank_transaction_name in bank_transaction_names:
-        bank_transaction = frappe.db.get_value("Bank Transaction", bank_transaction_name, ["name", "deposit", "withdrawal", "bank_account", "currency", "unallocated_amount", "date", "reference_number", "description"], as_dict=True)
+        The entries are created in the background - returns the Mint Reconciliation Job to poll for the result
+    """
+    job = enqueue_reconciliation_job("Payment Entry",
+                                     bank_transaction_names,
+                                     get_bank_transaction_company(bank_transaction_names),
+                                     party_type=party_type,
+                                     party=party,
+                                     account=account,
+                                     mode_of_payment=mode_of_payment)
+
+    return {"job": job}
+
+def create_payment_entry_for_transaction(bank_transaction_name: str | int,
+                                         party_type: str,
+                                         party: str | int,
+                                         account: str,
+                                         mode_of_payment: str | None = None,
+                                         transaction_details: dict | None = None):
+    """
+        Create a payment entry against the party for the unallocated amount of the transaction and reconcile it
 
-        transaction_account = frappe.get_cached_value("Bank Account", bank_transaction.bank_account, "account")
+        Bulk actions pass the `transaction_details` prefetched with `get_bank_transaction_details`
+    """
+    bank_transaction = get_locked_bank_transaction_details(bank_transaction_name, transaction_details)
 
-        is_withdrawal = bank_transaction.withdrawal > 0.0
+    transaction_account = bank_transaction.bank_gl_account
 
-        if is_withdrawal:
-            paid_from = transaction_account
-            paid_to = account
-        else:
-            paid_from = account
-            paid_to = transaction_account
-        
-        payment_entry_doc = frappe.get_doc({
-            "doctype": "Payment Entry",
-            "payment_type": "Pay" if is_withdrawal else "Receive",
-            "bank_account": bank_transaction.bank_account,
-            "company": bank_transaction.company,
-            "mode_of_payment": mode_of_payment,
-            "party_type": party_type,
-            "party": party,
-            "paid_from": paid_from,
-            "paid_to": paid_to,
-            "paid_amount": bank_transaction.unallocated_amount,
-            "base_paid_amount": bank_transaction.unallocated_amount,
-            "received_amount": bank_transaction.unallocated_amount,
-            "base_received_amount": bank_transaction.unallocated_amount,
-            "target_exchange_rate": 1,
-            "source_exchange_rate": 1,
-            "reference_date": bank_transaction.date,
-            "posting_date": bank_transaction.date,
-            "reference_no": (bank_transaction.reference_number or bank_transaction.description or '')[:140],
-        })
+    is_withdrawal = bank_transaction.withdrawal > 0.0
 
-        payment_entry_doc.insert()
-        payment_entry_doc.submit()
+    if is_withdrawal:
+        paid_from = transaction_account
+        paid_to = account
+    else:
+        paid_from = account
+        paid_to = transaction_account
+    
+    payment_entry_doc = frappe.get_doc({
+        "doctype": "Payment Entry",
+        "payment_type": "Pay" if is_withdrawal else "Receive",
+        "bank_account": bank_transaction.bank_account,
+        "company": bank_transaction.company,
+        "mode_of_payment": mode_of_payment,
+        "party_type": party_type,
+        "party": party,
+        "paid_from": paid_from,
+        "paid_to": paid_to,
+        "paid_amount": bank_transaction.unallocated_amount,
+        "base_paid_amount": bank_transaction.unallocated_amount,
+        "received_amount": bank_transaction.unallocated_amount,
+        "base_received_amount": bank_transaction.unallocated_amount,
+        "target_exchange_rate": 1,
+        "source_exchange_rate": 1,
+        "reference_date": bank_transaction.date,
+        "posting_date": bank_transaction.date,
+        "reference_no": (bank_transaction.reference_number or bank_transaction.description or '')[:140],
+    })
 
-        final_transaction = reconcile_vouchers(bank_transaction_name, json.dumps([{
-            "payment_doctype": "Payment Entry",
-            "payment_name": payment_entry_doc.name,
-            "amount": payment_entry_doc.paid_amount,
-        }]), is_new_voucher=True)
+    payment_entry_doc.insert()
+    payment_entry_doc.submit()
 
-        output.append({
-            "transaction": final_transaction,
-            "payment_entry": payment_entry_doc,
-        })
+    final_transaction = reconcile_vouchers(bank_transaction.name, json.dumps([{
+        "payment_doctype": "Payment Entry",
+        "payment_name": payment_entry_doc.name,
+        "amount": payment_entry_doc.paid_amount,
+    }]), is_new_voucher=True)
 
-    return output
+    return {
+        "transaction": final_transaction,
+        "payment_entry": payment_entry_doc,
+    }
 
     
 @frappe.whitelist(methods=['POST'])
 def create_payment_entry_and_reconcile(bank_transaction_name: str | int, 
-                                       payment_entry_doc: dict):
+                                       payment_entry_doc: dict,
+                                       idempotency_key: str | None = None):
     """
         Create a payment entry and reconcile it with the bank transaction
+
+        A request that is retried with the same `idempotency_key` returns the result of the first request
     """
+    locked_transaction = lock_bank_transaction(bank_transaction_name, throw_if_reconciled=False)
+
+    result = get_idempotent_result(idempotency_key, bank_transaction_name)
+    if result:
+        return result
+
+    validate_not_reconciled(locked_transaction)
+
     payment_entry = frappe.get_doc({
         **payment_entry_doc,
         "doctype": "Payment Entry",
@@ -435,11 +718,136 @@ def create_payment_entry_and_reconcile(bank_transaction_name: str | int,
         "amount": payment_entry.paid_amount,
     }]), is_new_voucher=True)
 
+    set_idempotent_result(idempotency_key, bank_transaction_name, "payment_entry", payment_entry)
+
     return {
         "transaction": transaction,
         "payment_entry": payment_entry,
     }
 
+def get_idempotent_result(idempotency_key: str | None, bank_transaction_name: str | int):
+    """
+        Result of an earlier request with the same idempotency key, with the transaction and voucher reloaded
+    """
+    if not idempotency_key:
+        return None
+
+    result = frappe.cache.get_value(get_idempotency_cache_key(idempotency_key))
+
+    if not result:
+        return None
+
+    if str(result["bank_transaction"]) != str(bank_transaction_name):
+        frappe.throw(_("Idempotency key {0} was already used for another bank transaction").format(idempotency_key))
+
+    # The voucher is gone if the earlier request was rolled back before its result was removed - process this one
+    if frappe.db.get_value(result["voucher_type"], result["voucher"], "docstatus") != 1:
+        return None
+
+    return {
+        "transaction": frappe.get_doc("Bank Transaction", bank_transaction_name),
+        result["result_field"]: frappe.get_doc(result["voucher_type"], result["voucher"]),
+    }
+
+def set_idempotent_result(idempotency_key: str | None, bank_transaction_name: str | int, result_field: str, voucher):
+    """
+        Remember the voucher created for the request. The result is stored before the commit, so that a retry
+        waiting on the transaction lock finds it as soon as the lock is released.
+    """
+    if not idempotency_key:
+        return
+
+    key = get_idempotency_cache_key(idempotency_key)
+
+    frappe.cache.set_value(key, {
+        "bank_transaction": bank_transaction_name,
+        "result_field": result_field,
+        "voucher_type": voucher.doctype,
+        "voucher": voucher.name,
+    }, expires_in_sec=IDEMPOTENCY_KEY_EXPIRY)
+
+    # A request that fails after this point has to be processed again when it is retried
+    frappe.db.after_rollback.add(lambda: frappe.cache.delete_value(key))
+
+def get_idempotency_cache_key(idempotency_key: str):
+    return f"mint:idempotency:{frappe.session.user}:{idempotency_key}"
+
+
+def get_bank_transaction_details(bank_transaction_names: list[str | int], ignore_missing: bool = False):
+    """
+        Load the transactions along with the GL account, company and credit card flag of their bank account in one query.
+
+        Returns a dict of transaction name to details. Throws if a transaction does not exist, unless `ignore_missing` is set.
+    """
+    if not bank_transaction_names:
+        return {}
+
+    BankTransaction = frappe.qb.DocType("Bank Transaction")
+    BankAccount = frappe.qb.DocType("Bank Account")
+    Account = frappe.qb.DocType("Account")
+
+    transactions = (
+        frappe.qb.from_(BankTransaction)
+        .left_join(BankAccount).on(BankAccount.name == BankTransaction.bank_account)
+        .left_join(Account).on(Account.name == BankAccount.account)
+        .select(
+            BankTransaction.name,
+            BankTransaction.company,
+            BankTransaction.date,
+            BankTransaction.deposit,
+            BankTransaction.withdrawal,
+            BankTransaction.currency,
+            BankTransaction.unallocated_amount,
+            BankTransaction.reference_number,
+            BankTransaction.description,
+            BankTransaction.bank_account,
+            BankTransaction.matched_rule,
+            BankAccount.account.as_("bank_gl_account"),
+            BankAccount.is_credit_card,
+            Account.company.as_("account_company"),
+        )
+        .where(BankTransaction.name.isin(list(bank_transaction_names)))
+    ).run(as_dict=True)
+
+    details = {transaction.name: transaction for transaction in transactions}
+
+    if not ignore_missing:
+        for name in bank_transaction_names:
+            if name not in details:
+                frappe.throw(_("Bank Transaction {0} not found").format(name), frappe.DoesNotExistError)
+
+    return details
+
+def get_account_report_types(accounts: list[str]):
+    """
+        Get the report type (Balance Sheet / Profit and Loss) of multiple accounts in one query
+    """
+    accounts = [account for account in set(accounts) if account]
+
+    if not accounts:
+        return {}
+
+    return dict(frappe.get_all("Account",
+                               filters={"name": ["in", accounts]},
+                               fields=["name", "report_type"],
+                               as_list=True))
+
+def get_bank_transaction_company(bank_transaction_names: list[str | int]):
+    """
+        Bulk actions are always run from the bank account of a single company - selections across companies are rejected
+    """
+    if not bank_transaction_names:
+        return None
+
+    companies = frappe.get_all("Bank Transaction",
+                               filters={"name": ["in", list(bank_transaction_names)]},
+                               pluck="company",
+                               distinct=True)
+
+    if len(companies) > 1:
+        frappe.throw(_("The selected transactions belong to more than one company: {0}").format(", ".join(companies)))
+
+    return companies[0] if companies else None
 
 @frappe.whitelist(methods=['GET'])
 def get_account_defaults(account: str):
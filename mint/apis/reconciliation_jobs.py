@@ -0,0 +1,289 @@
+import frappe
+import json
+import time
+from frappe import _
+
+# Number of transactions processed between commits
+RECONCILIATION_JOB_BATCH_SIZE = 50
+
+# Number of transactions loaded per query when prefetching the details for a job
+RECONCILIATION_JOB_PREFETCH_SIZE = 1000
+
+# Minimum number of seconds between two realtime progress events of a job
+RECONCILIATION_JOB_PROGRESS_INTERVAL = 1
+
+RECONCILIATION_JOB_PROGRESS_EVENT = "mint-reconciliation-job-progress"
+
+
+def create_reconciliation_job(action: str, bank_transactions: list[str | int], company: str | None = None, **parameters):
+    """
+    Create a queued Mint Reconciliation Job for the given transactions.
+
+    The transactions and the parameters of the action are stored on the job so that it can be run (or resumed) from anywhere.
+    """
+    job = frappe.get_doc({
+        "doctype": "Mint Reconciliation Job",
+        "action": action,
+        "status": "Queued",
+        "company": company,
+        "total": len(bank_transactions),
+        "parameters": frappe.as_json({
+            **parameters,
+            "bank_transactions": list(bank_transactions),
+        }),
+    })
+    job.insert(ignore_permissions=True)
+    return job
+
+def enqueue_reconciliation_job(action: str, bank_transactions: list[str | int], company: str | None = None, **parameters):
+    """
+    Create a reconciliation job and run it in the background. Returns the name of the job.
+    """
+    job = create_reconciliation_job(action, bank_transactions, company, **parameters)
+
+    frappe.enqueue(method=run_reconciliation_job,
+                   queue="long",
+                   job_id=f"mint_reconciliation_job::{job.name}",
+                   deduplicate=True,
+                   enqueue_after_commit=True,
+                   job_name=job.name)
+
+    return job.name
+
+def run_reconciliation_job(job_name: str):
+    """
+    Process all transactions of a reconciliation job.
+
+    Every transaction is processed inside its own savepoint - if one fails, only that transaction is rolled back
+    and the error is recorded on the job. Results are committed in batches, so a job that is interrupted
+    can be run again and will skip transactions that already have a result.
+
+    If the job itself crashes, it is marked as failed with the traceback - so that nobody waits for it forever.
+    """
+    job = frappe.get_doc("Mint Reconciliation Job", job_name)
+
+    if job.status not in ("Queued", "In Progress"):
+        return
+
+    try:
+        process_reconciliation_job(job)
+    except Exception:
+        frappe.db.rollback()
+        job.fail(frappe.get_traceback())
+        frappe.db.commit()
+
+        publish_job_progress(job)
+        raise
+
+def process_reconciliation_job(job):
+    parameters = frappe.parse_json(job.parameters or "{}")
+    bank_transactions = parameters.pop("bank_transactions", [])
+
+    process_transaction = RECONCILIATION_JOB_ACTIONS[job.action]
+
+    processed = {item.bank_transaction for item in job.items}
+    pending = [bank_transaction for bank_transaction in bank_transactions if bank_transaction not in processed]
+
+    # Load everything the vouchers need for all transactions up front, instead of a few queries per transaction
+    transaction_details, report_types = get_reconciliation_job_context(pending, parameters)
+
+    if not job.started_on:
+        job.db_set("started_on", frappe.utils.now_datetime())
+
+    job.update_progress()
+    frappe.db.commit()
+
+    last_published = 0
+
+    for idx, bank_transaction in enumerate(pending):
+        if bank_transaction not in transaction_details:
+            # Deleted (or never existed) since the job was created
+            job.add_item(bank_transaction, "Failed", error=_("Bank Transaction {0} not found").format(bank_transaction))
+            continue
+
+        frappe.db.savepoint("mint_reconciliation_job")
+
+        try:
+            voucher_type, voucher, rule = process_transaction(bank_transaction,
+                                                              transaction_details=transaction_details.get(bank_transaction),
+                                                              report_types=report_types,
+                                                              **parameters)
+            job.add_item(bank_transaction, "Success", voucher_type=voucher_type, voucher=voucher, rule=rule)
+        except Exception as e:
+            frappe.db.rollback(save_point="mint_reconciliation_job")
+            job.add_item(bank_transaction, "Failed", error=str(e) or frappe.get_traceback())
+
+        # Validation messages of failed transactions should not pile up on the job
+        frappe.clear_messages()
+
+        if (idx + 1) % RECONCILIATION_JOB_BATCH_SIZE == 0:
+            job.update_progress()
+            frappe.db.commit()
+
+        if time.monotonic() - last_published >= RECONCILIATION_JOB_PROGRESS_INTERVAL:
+            publish_job_progress(job)
+            last_published = time.monotonic()
+
+    job.complete()
+    frappe.db.commit()
+
+    publish_job_progress(job)
+
+def get_reconciliation_job_context(bank_transactions: list[str | int], parameters: dict):
+    """
+    Prefetch the transaction details and the report types of the accounts that will be posted to
+    """
+    from mint.apis.bank_reconciliation import get_account_report_types, get_bank_transaction_details
+
+    transaction_details = {}
+    for idx in range(0, len(bank_transactions), RECONCILIATION_JOB_PREFETCH_SIZE):
+        transaction_details.update(get_bank_transaction_details(bank_transactions[idx:idx + RECONCILIATION_JOB_PREFETCH_SIZE], ignore_missing=True))
+
+    accounts = [parameters.get("account")]
+
+    rule_names = {details.matched_rule for details in transaction_details.values() if details.matched_rule}
+    if rule_names:
+        accounts.extend(frappe.get_all("Mint Bank Transaction Rule",
+                                       filters={"name": ["in", list(rule_names)]},
+                                       pluck="account"))
+        accounts.extend(frappe.get_all("Mint Transaction Rule Accounts",
+                                       filters={"parent": ["in", list(rule_names)], "parenttype": "Mint Bank Transaction Rule"},
+                                       pluck="account"))
+
+    return transaction_details, get_account_report_types(accounts)
+
+def publish_job_progress(job):
+    frappe.publish_realtime(RECONCILIATION_JOB_PROGRESS_EVENT, {
+        "job": job.name,
+        "action": job.action,
+        "status": job.status,
+        "total": job.total,
+        "successful": job.successful,
+        "failed": job.failed,
+    }, user=job.owner, after_commit=False)
+
+@frappe.whitelist(methods=["GET"])
+def get_reconciliation_job_result(job: str):
+    """
+    Get the status of a reconciliation job.
+
+    Once the job has finished, the result contains the updated transaction and the voucher created for every
+    successful transaction, and the error for every failed one.
+    """
+    job = frappe.get_doc("Mint Reconciliation Job", job)
+    job.check_permission("read")
+
+    result = {
+        "name": job.name,
+        "action": job.action,
+        "status": job.status,
+        "total": job.total,
+        "successful": job.successful,
+        "failed": job.failed,
+        "error": job.error,
+        "items": [],
+        "errors": [],
+    }
+
+    if job.status in ("Queued", "In Progress"):
+        return result
+
+    for item in job.items:
+        if item.status == "Success":
+            result["items"].append({
+                "transaction": frappe.get_doc("Bank Transaction", item.bank_transaction),
+                "voucher_type": item.voucher_type,
+                "voucher": frappe.get_doc(item.voucher_type, item.voucher) if item.voucher else None,
+            })
+        else:
+            result["errors"].append({
+                "bank_transaction": item.bank_transaction,
+                "error": item.error,
+            })
+
+    return result
+
+
+def process_bank_entry(bank_transaction: str | int, account: str, transaction_details: dict | None = None, report_types: dict | None = None):
+    from mint.apis.bank_reconciliation import create_bank_entry_for_transaction
+
+    result = create_bank_entry_for_transaction(bank_transaction, account, transaction_details=transaction_details, report_types=report_types)
+    return "Journal Entry", result["journal_entry"].name, None
+
+def process_payment_entry(bank_transaction: str | int, party_type: str, party: str | int, account: str, mode_of_payment: str | None = None,
+                          transaction_details: dict | None = None, report_types: dict | None = None):
+    from mint.apis.bank_reconciliation import create_payment_entry_for_transaction
+
+    result = create_payment_entry_for_transaction(bank_transaction, party_type, party, account, mode_of_payment,
+                                                  transaction_details=transaction_details)
+    return "Payment Entry", result["payment_entry"].name, None
+
+def process_internal_transfer(bank_transaction: str | int, account: str | None = None, mirror_transactions: dict | None = None,
+                              transaction_details: dict | None = None, report_types: dict | None = None):
+    """
+    Transfers to a fixed account, or - with `mirror_transactions` - to the account of the mirror transaction,
+    which is reconciled against the same payment entry.
+    `mirror_transactions` maps each transaction to its mirror transaction and that transaction's GL account.
+    """
+    from mint.apis.bank_reconciliation import create_internal_transfer_for_transaction
+
+    mirror_transaction = None
+    if mirror_transactions:
+        mirror_transaction, account = mirror_transactions[bank_transaction]
+
+    result = create_internal_transfer_for_transaction(bank_transaction, account,
+                                                      transaction_details=transaction_details,
+                                                      mirror_transaction_name=mirror_transaction)
+    return "Payment Entry", result["payment_entry"].name, None
+
+def process_apply_rule(bank_transaction: str | int, transaction_details: dict | None = None, report_types: dict | None = None):
+    from mint.apis.rule_actions import apply_rule_to_transaction
+
+    if transaction_details:
+        matched_rule = transaction_details.matched_rule
+    else:
+        matched_rule = frappe.db.get_value("Bank Transaction", bank_transaction, "matched_rule")
+    rule = frappe.get_cached_doc("Mint Bank Transaction Rule", matched_rule) if matched_rule else None
+
+    if not rule or not rule.auto_apply:
+        frappe.throw(_("Bank Transaction {0} is no longer matched to a rule that is applied automatically").format(bank_transaction))
+
+    voucher_type, voucher = apply_rule_to_transaction(bank_transaction, rule, transaction_details=transaction_details, report_types=report_types)
+    return voucher_type, voucher, rule.name
+
+def process_match_vouchers(bank_transaction: str | int, vouchers: dict, transaction_details: dict | None = None, report_types: dict | None = None):
+    from mint.apis.bank_reconciliation import reconcile_vouchers
+
+    matched_vouchers = vouchers[bank_transaction]
+
+    reconcile_vouchers(bank_transaction, json.dumps([{
+        "payment_doctype": voucher_type,
+        "payment_name": voucher,
+        "amount": amount,
+    } for voucher_type, voucher, amount in matched_vouchers]))
+
+    # The job item only has room for one voucher - record the first one
+    voucher_type, voucher, _amount = matched_vouchers[0]
+    return voucher_type, voucher, None
+
+def process_unreconcile(bank_transaction: str | int, transaction_details: dict | None = None, report_types: dict | None = None):
+    from mint.apis.bank_reconciliation import unreconcile_bank_transaction
+
+    removed_entries = unreconcile_bank_transaction(bank_transaction)
+
+    if not removed_entries:
+        frappe.throw(_("Bank Transaction {0} is not reconciled").format(bank_transaction))
+
+    # Record the first voucher that was created for the transaction, else the first one that was matched
+    voucher_type, voucher, _reconciliation_type = sorted(removed_entries, key=lambda entry: entry[2] != "Voucher Created")[0]
+    return voucher_type, voucher, transaction_details.matched_rule if transaction_details else None
+
+
+RECONCILIATION_JOB_ACTIONS = {
+    "Bank Entry": process_bank_entry,
+    "Payment Entry": process_payment_entry,
+    "Internal Transfer": process_internal_transfer,
+    "Apply Rules": process_apply_rule,
+    "Match Vouchers": process_match_vouchers,
+    "Unreconcile": process_unreconcile,
+}
@@ -0,0 +1,135 @@
+import frappe
+from frappe import _
+from frappe.utils import flt
+from mint.apis.bank_reconciliation import (
+    create_bank_entry_for_transaction,
+    create_internal_transfer_for_transaction,
+    create_payment_entry_for_transaction,
+)
+from mint.apis.reconciliation_jobs import create_reconciliation_job, run_reconciliation_job
+from mint.apis.rule_formula import evaluate_formula
+
+@frappe.whitelist(methods=["POST"])
+def run_auto_apply_rules(company: str):
+    """
+    Apply all rules marked as "Automatically Apply" to their matched transactions in the background
+    """
+    frappe.has_permission("Bank Transaction", "write", throw=True)
+
+    queue_auto_apply_rules(company)
+
+def queue_auto_apply_rules(company: str):
+    frappe.enqueue(method=_run_auto_apply_rules,
+                   queue="long",
+                   job_id=f"mint_auto_apply_rules::{company}",
+                   deduplicate=True,
+                   enqueue_after_commit=True,
+                   company=company)
+
+def _run_auto_apply_rules(company: str):
+    """
+    Create and reconcile vouchers for all unreconciled transactions matched to an auto apply rule.
+
+    The transactions are processed as a Mint Reconciliation Job, so failures are recorded per transaction.
+    """
+    from mint.apis.rules import get_rule_docs
+
+    rules = {rule.name: rule for rule in get_rule_docs(company) if rule.auto_apply}
+
+    if not rules:
+        return
+
+    transactions = frappe.get_all("Bank Transaction",
+                                  filters={
+                                      "company": company,
+                                      "docstatus": 1,
+                                      "status": "Unreconciled",
+                                      "matched_rule": ["in", list(rules.keys())],
+                                  },
+                                  pluck="name",
+                                  order_by="date asc, name asc")
+
+    if not transactions:
+        return
+
+    job = create_reconciliation_job("Apply Rules", transactions, company)
+    frappe.db.commit()
+
+    run_reconciliation_job(job.name)
+
+def apply_rule_to_transaction(bank_transaction_name: str, rule, transaction_details: dict | None = None, report_types: dict | None = None):
+    """
+    Create the voucher described by the rule for the transaction and reconcile it.
+
+    Returns the voucher type and name.
+    """
+    if rule.classify_as == "Bank Entry":
+        if rule.bank_entry_type == "Multiple Accounts":
+            result = create_bank_entry_for_transaction(bank_transaction_name,
+                                                       get_counter_entries=lambda transaction: get_rule_account_entries(rule, transaction),
+                                                       transaction_details=transaction_details,
+                                                       report_types=report_types)
+        else:
+            result = create_bank_entry_for_transaction(bank_transaction_name, rule.account,
+                                                       transaction_details=transaction_details,
+                                                       report_types=report_types)
+        return "Journal Entry", result["journal_entry"].name
+
+    if rule.classify_as == "Payment Entry":
+        result = create_payment_entry_for_transaction(bank_transaction_name, rule.party_type, rule.party, rule.account,
+                                                      transaction_details=transaction_details)
+        return "Payment Entry", result["payment_entry"].name
+
+    if rule.classify_as == "Transfer":
+        result = create_internal_transfer_for_transaction(bank_transaction_name, rule.account,
+                                                          transaction_details=transaction_details)
+        return "Payment Entry", result["payment_entry"].name
+
+    frappe.throw(_("Unsupported rule action {0}").format(rule.classify_as))
+
+def get_rule_account_entries(rule, transaction):
+    """
+    Compute the journal entry rows for a "Multiple Accounts" rule.
+
+    Debit and credit of each row can be formulas. The last row gets the difference so that the entry balances.
+    """
+    validate_rule_account_rows(rule)
+
+    amount = transaction.unallocated_amount
+    is_withdrawal = transaction.withdrawal > 0.0
+
+    total_debits = 0 if is_withdrawal else amount
+    total_credits = amount if is_withdrawal else 0
+
+    entries = []
+
+    for index, account in enumerate(rule.accounts):
+        if index == len(rule.accounts) - 1:
+            difference = flt(total_debits - total_credits, 2)
+            debit = 0 if difference > 0 else abs(difference)
+            credit = abs(difference) if difference > 0 else 0
+        else:
+            debit = flt(evaluate_formula(account.debit, amount, transaction.withdrawal, transaction.deposit), 2) if account.debit else 0
+            credit = flt(evaluate_formula(account.credit, amount, transaction.withdrawal, transaction.deposit), 2) if account.credit else 0
+
+            total_debits = flt(total_debits + debit, 2)
+            total_credits = flt(total_credits + credit, 2)
+
+        entries.append({
+            "account": account.account,
+            "debit": debit,
+            "credit": credit,
+            "party_type": account.party_type,
+            "party": account.party,
+            "user_remark": account.user_remark,
+        })
+
+    return entries
+
+def validate_rule_account_rows(rule):
+    """
+    Only the last row of a "Multiple Accounts" rule can be left without a debit and credit - it gets the difference.
+    """
+    for index, account in enumerate(rule.accounts[:-1]):
+        if not (account.debit or "").strip() and not (account.credit or "").strip():
+            frappe.throw(_("Row {0} of rule {1} has no debit or credit amount. Only the last row can be left empty.").format(index + 1, rule.name))
@@ -0,0 +1,105 @@
+import ast
+import math
+from functools import lru_cache
+
+import frappe
+from frappe import _
+
+# Variables that can be used in a formula
+FORMULA_VARIABLES = ("transaction_amount", "withdrawal", "deposit")
+
+FORMULA_FUNCTIONS = {
+    "abs": abs,
+    "min": min,
+    "max": max,
+    "round": round,
+    "floor": math.floor,
+    "ceil": math.ceil,
+}
+
+ALLOWED_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.UAdd, ast.USub)
+
+class FormulaMath:
+    """
+    Formulas were originally evaluated in the browser, so `Math.round(...)` style calls are supported as well
+    """
+    abs = staticmethod(abs)
+    min = staticmethod(min)
+    max = staticmethod(max)
+    round = staticmethod(round)
+    floor = staticmethod(math.floor)
+    ceil = staticmethod(math.ceil)
+
+def evaluate_formula(formula: str, transaction_amount: float, withdrawal: float = 0, deposit: float = 0):
+    """
+    Evaluate a debit/credit formula like "transaction_amount * 0.25" for a transaction
+    """
+    code = compile_formula(formula)
+
+    if not code:
+        return 0
+
+    try:
+        value = eval(code, {"__builtins__": {}}, {
+            **FORMULA_FUNCTIONS,
+            "Math": FormulaMath,
+            "transaction_amount": transaction_amount or 0,
+            "withdrawal": withdrawal or 0,
+            "deposit": deposit or 0,
+        })
+    except ZeroDivisionError:
+        frappe.throw(_("Formula {0} divides by zero.").format(formula))
+    except (TypeError, ValueError, OverflowError) as e:
+        frappe.throw(_("Formula {0} could not be evaluated: {1}").format(formula, e))
+
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        frappe.throw(_("Formula {0} does not evaluate to a number.").format(formula))
+
+    return value
+
+@lru_cache(maxsize=1024)
+def compile_formula(formula: str):
+    """
+    Parse and validate a formula and return the compiled code object.
+
+    Only numbers, arithmetic operators, the formula variables and a few math functions are allowed.
+    Compiled formulas are cached, so evaluating the same formula for thousands of transactions only parses it once.
+    """
+    formula = (formula or "").strip().rstrip(";").strip()
+
+    if not formula:
+        return None
+
+    try:
+        tree = ast.parse(formula, mode="eval")
+    except SyntaxError:
+        frappe.throw(_("Invalid formula: {0}").format(formula))
+
+    for node in ast.walk(tree):
+        validate_formula_node(node, formula)
+
+    return compile(tree, "<formula>", "eval")
+
+def validate_formula_node(node: ast.AST, formula: str):
+
+    if isinstance(node, (ast.Expression, ast.Load, ast.BinOp, ast.UnaryOp) + ALLOWED_OPERATORS):
+        return
+
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return
+
+    if isinstance(node, ast.Name) and (node.id in FORMULA_VARIABLES or node.id in FORMULA_FUNCTIONS or node.id == "Math"):
+        return
+
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "Math" and node.attr in FORMULA_FUNCTIONS:
+        return
+
+    if isinstance(node, ast.Call) and not node.keywords:
+        func = node.func
+        if isinstance(func, ast.Name) and func.id in FORMULA_FUNCTIONS:
+            return
+        if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) and func.value.id == "Math" and func.attr in FORMULA_FUNCTIONS:
+            return
+
+    frappe.throw(_("Formula {0} is not allowed. Only numbers, arithmetic operators, {1} and the functions {2} can be used.").format(
+        formula, ", ".join(FORMULA_VARIABLES), ", ".join(FORMULA_FUNCTIONS)))
@@ -0,0 +1,437 @@
+import re
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+
+
+# Maximum number of memoized descriptions per company
+MEMO_SIZE = 100000
+
+MISSING = object()
+
+
+class RuleMatcher:
+    """
+    Compiled form of a list of Mint Bank Transaction Rules.
+
+    Build it once per evaluation run and call `match` for every transaction.
+    Rules are bucketed by company. Inside a company, every rule gets a bit (ordered by priority) and each
+    stage of the evaluation (transaction type, amount, description) produces a bitmask of the rules that pass it.
+    The first matching rule is the lowest bit set in all masks - same as walking the rules in priority order.
+    """
+
+    def __init__(self, rule_docs: list, profile: bool = False):
+        self.rules_by_company = {}
+
+        rules_per_company = {}
+        for rule in rule_docs:
+            rules_per_company.setdefault(rule.company, []).append(rule)
+
+        for company, rules in rules_per_company.items():
+            self.rules_by_company[company] = CompanyRuleIndex(rules, profile=profile)
+
+    def match(self, transaction):
+        """
+        Return the first rule (by priority) that matches the transaction, or None
+        """
+        index = self.rules_by_company.get(transaction.company)
+        if not index:
+            return None
+
+        return index.match(transaction)
+
+    def get_memo(self, company: str):
+        index = self.rules_by_company.get(company)
+        return index.memo if index else {}
+
+    def set_memo(self, company: str, memo: dict):
+        """
+        Seed the memo of a company, for example with the results of a previous run against the same rules
+        """
+        index = self.rules_by_company.get(company)
+        if index:
+            index.memo = memo
+
+    def get_rule_stats(self):
+        """
+        Per rule statistics collected while matching. Only available if the matcher was built with profile=True.
+        """
+        rule_stats = []
+        for index in self.rules_by_company.values():
+            if index.stats:
+                rule_stats.extend(index.stats.get_rule_stats(index.rules))
+        return rule_stats
+
+
+class CompanyRuleIndex:
+    """
+    Rule index for a single company. Rules are expected to be sorted by priority.
+    """
+
+    def __init__(self, rules: list, profile: bool = False):
+        self.rules = rules
+        self.stats = RuleStats() if profile else None
+
+        # (candidate mask, lowercased description) -> index of the matched rule (or None)
+        self.memo = {}
+
+        # Transaction type masks
+        self.any_mask = 0
+        self.withdrawal_mask = 0
+        self.deposit_mask = 0
+
+        # Description checks that do not depend on the description (empty values)
+        self.always_mask = 0
+
+        contains = {}
+        starts_with = {}
+        ends_with = {}
+        self.regexes = []
+
+        for idx, rule in enumerate(rules):
+            bit = 1 << idx
+
+            if rule.transaction_type == "Withdrawal":
+                self.withdrawal_mask |= bit
+            elif rule.transaction_type == "Deposit":
+                self.deposit_mask |= bit
+            else:
+                self.any_mask |= bit
+
+            for rule_desc_rule in rule.description_rules:
+                value = (rule_desc_rule.value or "").lower()
+
+                if rule_desc_rule.check == "Regex":
+                    try:
+                        self.regexes.append((idx, re.compile(value)))
+                    except re.error:
+                        # Invalid patterns are rejected on save - skip anything that slipped through
+                        pass
+                    continue
+
+                if rule_desc_rule.check not in ("Contains", "Starts With", "Ends With"):
+                    continue
+
+                if not value:
+                    # An empty value matches any description for all three checks
+                    self.always_mask |= bit
+                elif rule_desc_rule.check == "Contains":
+                    contains[value] = contains.get(value, 0) | bit
+                elif rule_desc_rule.check == "Starts With":
+                    starts_with[value] = starts_with.get(value, 0) | bit
+                else:
+                    ends_with[value] = ends_with.get(value, 0) | bit
+
+        # Regex rules are evaluated lazily in priority order
+        self.regexes.sort(key=lambda r: r[0])
+        self.regex_mask = 0
+        for idx, _pattern in self.regexes:
+            self.regex_mask |= 1 << idx
+
+        self.contains_automaton = AhoCorasick(contains) if contains else None
+        self.prefix_trie = Trie(starts_with) if starts_with else None
+        self.suffix_trie = Trie({value[::-1]: mask for value, mask in ends_with.items()}) if ends_with else None
+
+        self.amount_intervals = AmountIntervals(rules)
+
+    def match(self, transaction):
+
+        stats = self.stats
+        if stats:
+            stats.transactions += 1
+
+        candidates = self.any_mask
+
+        # Type rule - same semantics as checking "withdrawal == 0.0" / "deposit == 0.0" on each rule
+        if transaction.withdrawal != 0.0:
+            candidates |= self.withdrawal_mask
+
+        if transaction.deposit != 0.0:
+            candidates |= self.deposit_mask
+
+        if stats:
+            stats.type_masks[candidates] += 1
+
+        if not candidates:
+            return None
+
+        amount = transaction.withdrawal or transaction.deposit or 0.0
+        candidates &= self.amount_intervals.get_mask(amount)
+
+        if stats:
+            stats.candidate_masks[candidates] += 1
+
+        if not candidates:
+            return None
+
+        desc = (transaction.description or "").lower()
+
+        # Transactions with the same description that pass the same rules' type and amount checks
+        # will always match the same rule, so the description checks only need to run once
+        memo_key = (candidates, desc)
+        best = self.memo.get(memo_key, MISSING)
+
+        if best is MISSING:
+            best = self.match_description(candidates, desc)
+
+            if len(self.memo) < MEMO_SIZE:
+                self.memo[memo_key] = best
+        elif stats:
+            stats.memo_hits += 1
+
+        if best is None:
+            return None
+
+        if stats:
+            stats.matches[best] += 1
+
+        return self.rules[best]
+
+
+    def match_description(self, candidates: int, desc: str):
+        """
+        Return the index of the first candidate rule whose description checks match, or None
+        """
+        stats = self.stats
+
+        if stats:
+            start = time.perf_counter()
+
+        matched = self.always_mask
+        if self.contains_automaton:
+            matched |= self.contains_automaton.search(desc)
+        if self.prefix_trie:
+            matched |= self.prefix_trie.walk(desc)
+        if self.suffix_trie:
+            matched |= self.suffix_trie.walk(desc[::-1])
+
+        matched &= candidates
+
+        if stats:
+            stats.description_time[candidates] += time.perf_counter() - start
+
+        # Only regexes of rules with a higher priority than the best plain match can change the result
+        best = lowest_bit_index(matched)
+
+        if candidates & self.regex_mask:
+            for idx, pattern in self.regexes:
+                if best is not None and idx >= best:
+                    break
+                if not (candidates >> idx) & 1:
+                    continue
+
+                if stats:
+                    start = time.perf_counter()
+                    found = pattern.search(desc)
+                    stats.regex_time[idx] += time.perf_counter() - start
+                    stats.regex_checks[idx] += 1
+                else:
+                    found = pattern.search(desc)
+
+                if found:
+                    return idx
+
+        return best
+
+
+class RuleStats:
+    """
+    Counters collected by a profiled CompanyRuleIndex.
+
+    To keep the overhead low, the type and amount stages only count how often each mask occurs.
+    The masks are expanded into per rule numbers once, when the stats are read.
+
+    The plain description checks of all candidates run in one pass, so their time is split evenly between the candidates.
+    Regexes are timed per rule.
+    """
+
+    def __init__(self):
+        self.transactions = 0
+        self.memo_hits = 0
+        self.type_masks = Counter()
+        self.candidate_masks = Counter()
+        self.matches = Counter()
+        self.regex_checks = Counter()
+        self.regex_time = Counter()
+        self.description_time = Counter()
+
+    def get_rule_stats(self, rules: list):
+        passed_type = Counter()
+        for mask, count in self.type_masks.items():
+            for idx in iterate_bits(mask):
+                passed_type[idx] += count
+
+        passed_amount = Counter()
+        for mask, count in self.candidate_masks.items():
+            for idx in iterate_bits(mask):
+                passed_amount[idx] += count
+
+        description_time = Counter()
+        for mask, elapsed in self.description_time.items():
+            candidates = list(iterate_bits(mask))
+            for idx in candidates:
+                description_time[idx] += elapsed / len(candidates)
+
+        rule_stats = []
+        for idx, rule in enumerate(rules):
+            rule_stats.append({
+                "rule": rule.name,
+                "considered": self.transactions,
+                "type_rejections": self.transactions - passed_type[idx],
+                "amount_rejections": passed_type[idx] - passed_amount[idx],
+                "description_checks": passed_amount[idx],
+                "regex_checks": self.regex_checks[idx],
+                "regex_time": self.regex_time[idx],
+                "time": description_time[idx] + self.regex_time[idx],
+                "matches": self.matches[idx],
+            })
+        return rule_stats
+
+
+class AmountIntervals:
+    """
+    Sorted interval structure over the min/max amount boundaries of a set of rules.
+
+    The boundaries split the number line into alternating open intervals and points.
+    For each of those segments we precompute the mask of rules whose [min, max] range covers it,
+    so an amount lookup is a single bisect.
+    """
+
+    def __init__(self, rules: list):
+        boundaries = set()
+        for rule in rules:
+            if rule.min_amount:
+                boundaries.add(rule.min_amount)
+            if rule.max_amount:
+                boundaries.add(rule.max_amount)
+
+        self.boundaries = sorted(boundaries)
+
+        # Segment 2 * i is the open interval (boundaries[i - 1], boundaries[i]), 2 * i + 1 is the point boundaries[i]
+        self.masks = []
+        for i in range(len(self.boundaries) + 1):
+            low = self.boundaries[i - 1] if i > 0 else None
+            high = self.boundaries[i] if i < len(self.boundaries) else None
+            self.masks.append(self._get_open_interval_mask(rules, low, high))
+            if high is not None:
+                self.masks.append(self._get_point_mask(rules, high))
+
+    def get_mask(self, amount: float):
+        i = bisect_left(self.boundaries, amount)
+        if i < len(self.boundaries) and self.boundaries[i] == amount:
+            return self.masks[2 * i + 1]
+        return self.masks[2 * i]
+
+    @staticmethod
+    def _get_point_mask(rules: list, amount: float):
+        mask = 0
+        for idx, rule in enumerate(rules):
+            if rule.min_amount and amount < rule.min_amount:
+                continue
+            if rule.max_amount and amount > rule.max_amount:
+                continue
+            mask |= 1 << idx
+        return mask
+
+    @staticmethod
+    def _get_open_interval_mask(rules: list, low: float | None, high: float | None):
+        # Every boundary is either <= low or >= high, so comparing against the interval ends is enough
+        mask = 0
+        for idx, rule in enumerate(rules):
+            if rule.min_amount and (low is None or rule.min_amount > low):
+                continue
+            if rule.max_amount and (high is None or rule.max_amount < high):
+                continue
+            mask |= 1 << idx
+        return mask
+
+
+class Trie:
+    """
+    Character trie where every node stores the mask of rules whose value ends at that node.
+    `walk` returns the masks of all values that are a prefix of the given text.
+    """
+
+    def __init__(self, values: dict[str, int]):
+        self.root = {}
+        for value, mask in values.items():
+            node = self.root
+            for char in value:
+                node = node.setdefault(char, {})
+            node[None] = node.get(None, 0) | mask
+
+    def walk(self, text: str):
+        matched = 0
+        node = self.root
+        for char in text:
+            node = node.get(char)
+            if node is None:
+                break
+            matched |= node.get(None, 0)
+        return matched
+
+
+class AhoCorasick:
+    """
+    Multi-pattern substring matcher. `search` returns the OR of the masks of every value found in the text.
+    """
+
+    def __init__(self, values: dict[str, int]):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [0]
+
+        for value, mask in values.items():
+            state = 0
+            for char in value:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(0)
+                state = next_state
+            self.output[state] |= mask
+
+        # Breadth first pass to compute failure links - outputs are merged along the failure chain
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.output[next_state] |= self.output[self.fail[next_state]]
+
+    def search(self, text: str):
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+
+        matched = 0
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            matched |= output[state]
+        return matched
+
+
+def iterate_bits(mask: int):
+    idx = 0
+    while mask:
+        if mask & 1:
+            yield idx
+        mask >>= 1
+        idx += 1
+
+
+def lowest_bit_index(mask: int):
+    if not mask:
+        return None
+    return (mask & -mask).bit_length() - 1
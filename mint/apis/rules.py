@@ -1,8 +1,43 @@
 import frappe
+import hashlib
+import json
+import pickle
 import re
+import redis
+import time
+from frappe import _
+from frappe.utils import add_days, cint, getdate
+from frappe.query_builder.functions import Count, Sum
+from mint.apis.rule_matcher import RuleMatcher
+
+# Number of transactions written back (and committed) at once
+RULE_EVALUATION_BATCH_SIZE = 1000
+
+# Seconds without new transactions before queued transactions are evaluated, and the longest a job waits for that
+RULE_EVALUATION_DEBOUNCE = 2
+RULE_EVALUATION_DEBOUNCE_MAX_WAIT = 10
+
+# Seconds after which the marker of a scheduled queue evaluation expires, in case its job was killed
+RULE_EVALUATION_QUEUE_MARKER_EXPIRY = 10 * 60
+
+# Seconds a shard job may run before it hands over to a fresh job
+RULE_EVALUATION_SHARD_TIME_BUDGET = 600
+
+# Rules are simulated against larger chunks since nothing is written back
+RULE_SIMULATION_CHUNK_SIZE = 5000
+
+# Seconds the description results of a run are kept in Redis (if enabled in Mint Settings)
+RULE_EVALUATION_MEMO_EXPIRY = 7 * 24 * 60 * 60
+
+RULE_EVALUATION_CHECKPOINT_KEY = "mint:rule_evaluation_checkpoint"
+
+TRANSACTION_FIELDS = ["name", "bank_account", "company", "date", "withdrawal", "deposit", "description", "reference_number"]
 
 def scheduler_run_rule_evaluation():
 
+    # Pick up any runs that were interrupted before they could finish
+    resume_rule_evaluation()
+
     automatically_run_rules_on_unreconciled_transactions = frappe.db.get_single_value("Mint Settings", "automatically_run_rules_on_unreconciled_transactions")
 
     if automatically_run_rules_on_unreconciled_transactions:
@@ -17,94 +52,698 @@ def _run_rule_evaluation(force_evaluate=False):
     Run the rule evaluation for all bank transactions
 
     If force evaluate is set to True, then transactions that were previously evaluated will be evaluated again.
+
+    The work is split by company and bank account and each shard is evaluated in its own background job,
+    so multiple workers can share the load.
     """
-    rules = frappe.get_all("Mint Bank Transaction Rule", fields=["name"], order_by="priority asc")
+    companies = frappe.get_all("Mint Bank Transaction Rule", pluck="company", distinct=True)
 
-    if not rules:
+    if not companies:
         return
 
+    BankTransaction = frappe.qb.DocType("Bank Transaction")
+
+    query = (
+        frappe.qb.from_(BankTransaction)
+        .select(BankTransaction.company, BankTransaction.bank_account, Count(BankTransaction.name).as_("count"))
+        .where(BankTransaction.status == "Unreconciled")
+        .where(BankTransaction.docstatus == 1)
+        .where(BankTransaction.company.isin(companies))
+        .groupby(BankTransaction.company, BankTransaction.bank_account)
+    )
+
+    if not force_evaluate:
+        query = query.where(BankTransaction.is_rule_evaluated == 0)
+
+    shards = query.run(as_dict=True)
+
+    runner = frappe.generate_hash(length=10)
+
+    for shard in shards:
+        # Start a fresh checkpoint for the shard - any older run for the same account is superseded
+        set_rule_evaluation_checkpoint(shard.bank_account, {
+            "company": shard.company,
+            "force_evaluate": bool(force_evaluate),
+            "last_name": None,
+            "evaluated": 0,
+            "total": shard.count,
+            "runner": runner,
+        })
+        enqueue_rule_evaluation_shard(shard.bank_account, runner)
+
+def resume_rule_evaluation():
+    """
+    Re-enqueue every shard that still has a checkpoint (i.e. was not completed).
+    Shards whose runner is still queued or running are skipped by the job deduplication.
+    """
+    checkpoints = frappe.cache.hgetall(RULE_EVALUATION_CHECKPOINT_KEY) or {}
+
+    for bank_account, checkpoint in checkpoints.items():
+        enqueue_rule_evaluation_shard(frappe.safe_decode(bank_account), checkpoint.get("runner"))
+
+def enqueue_rule_evaluation_shard(bank_account: str, runner: str, enqueue_after_commit: bool = False):
+    """
+    Every runner of a shard has its own job id - a job that hands over to a new runner is still running
+    when it enqueues it, so the same job id would be deduplicated against itself
+    """
+    frappe.enqueue(method=_run_rule_evaluation_shard,
+                   queue="long",
+                   job_id=f"mint_rule_evaluation_shard::{bank_account}::{runner}",
+                   deduplicate=True,
+                   enqueue_after_commit=enqueue_after_commit,
+                   bank_account=bank_account,
+                   runner=runner)
+
+def _run_rule_evaluation_shard(bank_account: str, runner: str | None = None):
+    """
+    Evaluate the transactions of a single bank account in keyset-paged chunks.
+
+    After every chunk the results are committed and the checkpoint is updated, so a killed job can continue
+    from the last chunk. If the job runs longer than the time budget, it hands the checkpoint over to a new runner
+    and exits to stay clear of the queue timeout.
+
+    Only the runner named in the checkpoint works on the shard - a job whose runner was replaced (by the hand over
+    or by a new evaluation run) stops.
+    """
+    checkpoint = get_rule_evaluation_checkpoint(bank_account)
+
+    if not checkpoint or checkpoint.get("runner") != runner:
+        return
+
+    rule_docs = get_rule_docs(checkpoint["company"])
+
+    if not rule_docs:
+        delete_rule_evaluation_checkpoint(bank_account)
+        return
+
+    matcher = RuleMatcher(rule_docs, profile=True)
+    load_rule_evaluation_memo(checkpoint["company"], matcher, rule_docs)
+
     filters = {
+        "bank_account": bank_account,
         "status": "Unreconciled",
-        "docstatus": 1
+        "docstatus": 1,
     }
 
-    if not force_evaluate:
+    if not checkpoint["force_evaluate"]:
         filters["is_rule_evaluated"] = 0
 
-    unreconciled_transactions = frappe.get_all("Bank Transaction", 
-                                               filters=filters, 
-                                               fields=["name", "bank_account","company", "date", "withdrawal", "deposit", "description", "reference_number"])
-    
-    if not unreconciled_transactions:
+    started_on = frappe.utils.now_datetime()
+    started_at = time.monotonic()
+    evaluated = 0
+
+    for chunk in iterate_transactions(filters, after=checkpoint["last_name"]):
+
+        if (get_rule_evaluation_checkpoint(bank_account) or {}).get("runner") != runner:
+            return
+
+        evaluate_transactions(chunk, matcher)
+        evaluated += len(chunk)
+
+        checkpoint["last_name"] = chunk[-1].name
+        checkpoint["evaluated"] += len(chunk)
+        set_rule_evaluation_checkpoint(bank_account, checkpoint)
+
+        frappe.publish_realtime("mint-rule-evaluation-progress", {
+            "bank_account": bank_account,
+            "evaluated": checkpoint["evaluated"],
+            "total": checkpoint["total"],
+        }, user=frappe.session.user)
+
+        if time.monotonic() - started_at > RULE_EVALUATION_SHARD_TIME_BUDGET:
+            save_rule_evaluation_memo(checkpoint["company"], matcher, rule_docs)
+            save_rule_evaluation_log("Bank Account", checkpoint["company"], matcher, evaluated, started_on,
+                                     time.monotonic() - started_at, bank_account=bank_account)
+            checkpoint["runner"] = frappe.generate_hash(length=10)
+            set_rule_evaluation_checkpoint(bank_account, checkpoint)
+            enqueue_rule_evaluation_shard(bank_account, checkpoint["runner"], enqueue_after_commit=True)
+            return
+
+    save_rule_evaluation_memo(checkpoint["company"], matcher, rule_docs)
+    save_rule_evaluation_log("Bank Account", checkpoint["company"], matcher, evaluated, started_on,
+                             time.monotonic() - started_at, bank_account=bank_account)
+
+    if (get_rule_evaluation_checkpoint(bank_account) or {}).get("runner") == runner:
+        delete_rule_evaluation_checkpoint(bank_account)
+
+    queue_auto_apply_if_enabled(checkpoint["company"], rule_docs)
+
+def save_rule_evaluation_log(evaluation_type: str, company: str, matcher: RuleMatcher, evaluated: int,
+                             started_on, duration: float, bank_account: str | None = None):
+    """
+    Store the per rule statistics collected by a profiled matcher
+    """
+    if not evaluated:
         return
-    
-    rule_docs = []
 
-    for rule in rules:
-        rule_doc = frappe.get_doc("Mint Bank Transaction Rule", rule.name)
-        rule_docs.append(rule_doc)
-    
-    # Run evaluation for each transaction
-    for transaction in unreconciled_transactions:
-        evaluate_transaction(transaction, rule_docs)
+    rule_stats = matcher.get_rule_stats()
 
-def evaluate_transaction(transaction, rule_docs):
+    log = frappe.new_doc("Mint Rule Evaluation Log")
+    log.evaluation_type = evaluation_type
+    log.company = company
+    log.bank_account = bank_account
+    log.started_on = started_on
+    log.duration = duration
+    log.transactions_evaluated = evaluated
+    log.transactions_matched = sum(rule["matches"] for rule in rule_stats)
 
-    matched_rule = None
+    for rule in rule_stats:
+        log.append("rules", rule)
 
-    for rule in rule_docs:
+    log.insert(ignore_permissions=True)
+    frappe.db.commit()
 
-        if rule.company != transaction.company:
-            continue
+@frappe.whitelist(methods=["GET"])
+def get_rule_statistics(company: str, from_date: str | None = None, to_date: str | None = None):
+    """
+    Get the evaluation statistics of each rule, summed over all runs in the given period.
+
+    Useful to find rules that never match, or rules (like slow regexes) that take up most of the evaluation time.
+    """
+    frappe.has_permission("Mint Rule Evaluation Log", "read", throw=True)
+
+    Log = frappe.qb.DocType("Mint Rule Evaluation Log")
+    LogRule = frappe.qb.DocType("Mint Rule Evaluation Log Rules")
+
+    query = (
+        frappe.qb.from_(LogRule)
+        .join(Log).on(Log.name == LogRule.parent)
+        .select(
+            LogRule.rule,
+            Count(Log.name).as_("runs"),
+            Sum(LogRule.considered).as_("considered"),
+            Sum(LogRule.type_rejections).as_("type_rejections"),
+            Sum(LogRule.amount_rejections).as_("amount_rejections"),
+            Sum(LogRule.description_checks).as_("description_checks"),
+            Sum(LogRule.regex_checks).as_("regex_checks"),
+            Sum(LogRule.regex_time).as_("regex_time"),
+            Sum(LogRule.time).as_("time"),
+            Sum(LogRule.matches).as_("matches"),
+        )
+        .where(Log.company == company)
+        .where(LogRule.parenttype == "Mint Rule Evaluation Log")
+        .groupby(LogRule.rule)
+        .orderby(Sum(LogRule.time), order=frappe.qb.desc)
+    )
+
+    if from_date:
+        query = query.where(Log.started_on >= getdate(from_date))
 
-        # Run the rules
+    if to_date:
+        query = query.where(Log.started_on < add_days(getdate(to_date), 1))
 
-        # Type rule - we continue searching for a rule if the transaction type does not match
-        if rule.transaction_type == "Withdrawal":
-            if transaction.withdrawal == 0.0:
+    statistics = query.run(as_dict=True)
+
+    rules = {rule.name: rule for rule in frappe.get_all("Mint Bank Transaction Rule",
+                                                           filters={"company": company},
+                                                           fields=["name", "rule_name", "priority"])}
+
+    for rule_statistics in statistics:
+        rule = rules.get(rule_statistics.rule)
+        rule_statistics.rule_name = rule.rule_name if rule else None
+        rule_statistics.priority = rule.priority if rule else None
+        # Rules that have since been deleted are still reported so that the history is complete
+        rule_statistics.is_deleted = not rule
+        rule_statistics.average_regex_time = (rule_statistics.regex_time / rule_statistics.regex_checks) if rule_statistics.regex_checks else 0
+
+    return statistics
+
+def iterate_transactions(filters: dict, or_filters: list | None = None, after: str | None = None, chunk_size: int = RULE_EVALUATION_BATCH_SIZE, fields: list | None = None):
+    """
+    Yield chunks of transactions ordered by name, using the last name of each chunk as the cursor for the next one.
+
+    Unlike offset based paging, this stays correct while the rows being iterated are updated.
+    """
+    while True:
+        chunk_filters = {**filters}
+        if after:
+            chunk_filters["name"] = [">", after]
+
+        chunk = frappe.get_all("Bank Transaction",
+                               filters=chunk_filters,
+                               or_filters=or_filters,
+                               fields=fields or TRANSACTION_FIELDS,
+                               order_by="name asc",
+                               limit=chunk_size)
+
+        if not chunk:
+            return
+
+        yield chunk
+
+        if len(chunk) < chunk_size:
+            return
+
+        after = chunk[-1].name
+
+def get_rule_evaluation_checkpoint(bank_account: str):
+    """
+    Read from Redis directly - `hget` would keep returning the checkpoint the job read first from the local cache,
+    and miss a newer run replacing it
+    """
+    value = frappe.cache.execute_command("HGET", frappe.cache.make_key(RULE_EVALUATION_CHECKPOINT_KEY), bank_account)
+
+    return pickle.loads(value) if value else None
+
+def set_rule_evaluation_checkpoint(bank_account: str, checkpoint: dict):
+    frappe.cache.hset(RULE_EVALUATION_CHECKPOINT_KEY, bank_account, checkpoint)
+
+def delete_rule_evaluation_checkpoint(bank_account: str):
+    frappe.cache.hdel(RULE_EVALUATION_CHECKPOINT_KEY, bank_account)
+
+@frappe.whitelist(methods=["POST"])
+def simulate_rule(rule: dict | str, from_date: str, to_date: str, sample_size: int = 20):
+    """
+    Dry run a draft rule (does not need to be saved) against the bank transactions in a date range.
+
+    Returns the number of transactions the rule matches on its own, how many of those would actually be assigned to it
+    and which existing rules would shadow it (because they have a higher priority) or lose transactions to it.
+    Nothing is written to the transactions.
+    """
+    frappe.has_permission("Mint Bank Transaction Rule", "read", throw=True)
+
+    if isinstance(rule, str):
+        rule = json.loads(rule)
+
+    draft = frappe.get_doc({**rule, "doctype": "Mint Bank Transaction Rule"})
+
+    if not draft.company:
+        frappe.throw(_("Please select a company for the rule."))
+
+    for description_rule in draft.description_rules:
+        if description_rule.check == "Regex":
+            try:
+                re.compile(description_rule.value or "")
+            except re.error:
+                frappe.throw(_("Invalid regex pattern."))
+
+    # If the draft is an edit of an existing rule, it replaces that rule
+    existing_rules = [r for r in get_rule_docs(draft.company) if r.name != draft.name]
+
+    if not draft.priority:
+        draft.priority = (existing_rules[-1].priority if existing_rules else 0) + 1
+
+    draft_matcher = RuleMatcher([draft])
+    existing_matcher = RuleMatcher(existing_rules)
+
+    sample_size = cint(sample_size)
+
+    total = 0
+    matches = 0
+    effective_matches = 0
+    shadowed_by = {}
+    taken_over_from = {}
+    sample = []
+
+    for chunk in iterate_transactions({
+        "company": draft.company,
+        "docstatus": 1,
+        "date": ["between", [from_date, to_date]],
+    }, chunk_size=RULE_SIMULATION_CHUNK_SIZE, fields=TRANSACTION_FIELDS + ["status", "matched_rule"]):
+
+        total += len(chunk)
+
+        for transaction in chunk:
+            if not draft_matcher.match(transaction):
                 continue
-        
-        if rule.transaction_type == "Deposit":
-            if transaction.deposit == 0.0:
+
+            matches += 1
+
+            existing_rule = existing_matcher.match(transaction)
+
+            if existing_rule and existing_rule.priority < draft.priority:
+                shadowed_by[existing_rule.name] = shadowed_by.get(existing_rule.name, 0) + 1
                 continue
-        
-        amount = transaction.withdrawal or transaction.deposit
-        if rule.min_amount and amount < rule.min_amount:
-            continue
-        
-        if rule.max_amount and amount > rule.max_amount:
-            continue
-        
-        # Description rule
-        for rule_desc_rule in rule.description_rules:
-            desc = (transaction.description or "").lower()
-            value = (rule_desc_rule.value or "").lower()
-            # If we find a match - we can assign the rule to the transaction because type and amount matches
-            if rule_desc_rule.check == "Contains":
-                if value in desc:
-                    matched_rule = rule
-                    break
-            
-            if rule_desc_rule.check == "Starts With":
-                if desc.startswith(value):
-                    matched_rule = rule
-                    break
-            
-            if rule_desc_rule.check == "Ends With":
-                if desc.endswith(value):
-                    matched_rule = rule
-                    break
-            
-            if rule_desc_rule.check == "Regex":
-                if re.search(value, desc):
-                    matched_rule = rule
+
+            effective_matches += 1
+
+            if existing_rule:
+                taken_over_from[existing_rule.name] = taken_over_from.get(existing_rule.name, 0) + 1
+
+            if len(sample) < sample_size:
+                sample.append({
+                    "name": transaction.name,
+                    "date": transaction.date,
+                    "bank_account": transaction.bank_account,
+                    "withdrawal": transaction.withdrawal,
+                    "deposit": transaction.deposit,
+                    "description": transaction.description,
+                    "reference_number": transaction.reference_number,
+                    "status": transaction.status,
+                    "matched_rule": transaction.matched_rule,
+                })
+
+    def get_rule_counts(counts: dict):
+        return sorted(({"rule": name, "count": count} for name, count in counts.items()), key=lambda r: -r["count"])
+
+    return {
+        "total_transactions": total,
+        "matches": matches,
+        "effective_matches": effective_matches,
+        "shadowed": matches - effective_matches,
+        "shadowed_by": get_rule_counts(shadowed_by),
+        "taken_over_from": get_rule_counts(taken_over_from),
+        "sample": sample,
+    }
+
+def get_rule_docs(company: str | None = None):
+    """
+    Get all rules (optionally for a company) ordered by priority
+    """
+    filters = {"company": company} if company else {}
+
+    rules = frappe.get_all("Mint Bank Transaction Rule", filters=filters, fields=["name"], order_by="priority asc")
+
+    return [frappe.get_doc("Mint Bank Transaction Rule", rule.name) for rule in rules]
+
+def queue_transactions_for_rule_evaluation(company: str, transaction_names: list[str]):
+    """
+    Add transactions to the company's evaluation queue (once the transaction is committed) and schedule a job to evaluate them.
+
+    There is at most one job per company, so a burst of submissions (like a statement import) is evaluated by a single job.
+    """
+    if not transaction_names:
+        return
+
+    transaction_names = list(transaction_names)
+
+    frappe.db.after_commit.add(lambda: push_transactions_for_rule_evaluation(company, transaction_names))
+
+def push_transactions_for_rule_evaluation(company: str, transaction_names: list[str]):
+    key = get_rule_evaluation_queue_key(company)
+    for transaction_name in transaction_names:
+        frappe.cache.rpush(key, transaction_name)
+
+    # The marker is only removed by the job once it finds the queue empty - if it is still set, the job
+    # that set it will pick up these transactions as well. It expires in case that job was killed.
+    if frappe.cache.set(frappe.cache.make_key(get_rule_evaluation_marker_key(company)), 1,
+                        nx=True, ex=RULE_EVALUATION_QUEUE_MARKER_EXPIRY):
+        frappe.enqueue(method=_run_queued_rule_evaluation,
+                       queue="short",
+                       company=company)
+
+def _run_queued_rule_evaluation(company: str):
+    """
+    Evaluate the transactions queued for a company.
+
+    Waits until no new transactions have been queued for a moment, then keeps draining the queue until it is empty,
+    so transactions queued while the job is running are picked up as well.
+    """
+    key = get_rule_evaluation_queue_key(company)
+
+    rule_docs = None
+    matcher = None
+
+    evaluated = 0
+
+    try:
+        wait_for_rule_evaluation_queue(key)
+
+        started_on = frappe.utils.now_datetime()
+        started_at = time.monotonic()
+
+        while True:
+            transaction_names = frappe.cache.lrange(key, 0, RULE_EVALUATION_BATCH_SIZE - 1)
+
+            if not transaction_names:
+                if release_rule_evaluation_queue(company):
                     break
-        
-        if matched_rule:
-            break
-        
-    frappe.db.set_value("Bank Transaction", transaction.name, {
-        "is_rule_evaluated": 1,
-        "matched_rule": matched_rule.name if matched_rule else None
-    })
-        
+                continue
+
+            frappe.cache.ltrim(key, len(transaction_names), -1)
+            frappe.cache.expire(frappe.cache.make_key(get_rule_evaluation_marker_key(company)), RULE_EVALUATION_QUEUE_MARKER_EXPIRY)
+
+            if matcher is None:
+                rule_docs = get_rule_docs(company)
+                if not rule_docs:
+                    frappe.cache.delete_value(key)
+                    continue
+                matcher = RuleMatcher(rule_docs, profile=True)
+                load_rule_evaluation_memo(company, matcher, rule_docs)
+
+            transaction_names = list({frappe.safe_decode(name) for name in transaction_names})
+
+            transactions = frappe.get_all("Bank Transaction",
+                                          filters={
+                                              "name": ["in", transaction_names],
+                                              "status": "Unreconciled",
+                                              "docstatus": 1,
+                                          },
+                                          fields=TRANSACTION_FIELDS)
+
+            evaluate_transactions(transactions, matcher)
+            evaluated += len(transactions)
+    except Exception:
+        # Let the next submission schedule a new job for whatever is left in the queue
+        frappe.cache.delete_value(get_rule_evaluation_marker_key(company))
+        raise
+
+    if rule_docs:
+        save_rule_evaluation_memo(company, matcher, rule_docs)
+        save_rule_evaluation_log("New Transactions", company, matcher, evaluated, started_on, time.monotonic() - started_at)
+        queue_auto_apply_if_enabled(company, rule_docs)
+
+def wait_for_rule_evaluation_queue(key: str):
+    """
+    Debounce - wait until no transactions were added to the queue for `RULE_EVALUATION_DEBOUNCE` seconds
+    (at most `RULE_EVALUATION_DEBOUNCE_MAX_WAIT` seconds), so that a burst of submissions is evaluated at once
+    """
+    deadline = time.monotonic() + RULE_EVALUATION_DEBOUNCE_MAX_WAIT
+    length = frappe.cache.llen(key)
+
+    while time.monotonic() < deadline:
+        time.sleep(RULE_EVALUATION_DEBOUNCE)
+
+        new_length = frappe.cache.llen(key)
+        if new_length == length:
+            return
+        length = new_length
+
+def release_rule_evaluation_queue(company: str):
+    """
+    Remove the scheduled marker if the queue is (still) empty. Returns False if transactions were queued in the meantime -
+    the check and the delete are one transaction, so nothing can be queued without a job to evaluate it.
+    """
+    queue_key = frappe.cache.make_key(get_rule_evaluation_queue_key(company))
+
+    with frappe.cache.pipeline() as pipe:
+        try:
+            pipe.watch(queue_key)
+
+            if pipe.llen(queue_key):
+                return False
+
+            pipe.multi()
+            pipe.delete(frappe.cache.make_key(get_rule_evaluation_marker_key(company)))
+            pipe.execute()
+        except redis.WatchError:
+            return False
+
+    return True
+
+def queue_auto_apply_if_enabled(company: str, rule_docs: list):
+    """
+    If any of the rules should be applied automatically, queue a job to apply them
+    """
+    if any(rule.auto_apply for rule in rule_docs):
+        from mint.apis.rule_actions import queue_auto_apply_rules
+        queue_auto_apply_rules(company)
+
+def queue_rule_change_evaluation(company: str, priority: int):
+    """
+    Re-evaluate the transactions that could be affected by a change to a rule with the given priority.
+
+    Only transactions matched to rules at or after this priority (and unmatched transactions) can change,
+    since rules with a higher priority are evaluated first and would still match.
+    Changes to multiple rules (like a reorder) are coalesced into a single job using the lowest priority.
+    """
+    # Results remembered for the old rules are no longer valid
+    frappe.cache.delete_value(get_rule_evaluation_memo_key(company))
+
+    key = get_rule_change_priority_key(company)
+
+    pending = get_pending_rule_change(key)
+    if pending is not None:
+        priority = min(priority, pending["priority"])
+
+    # Every change gets a new version, so that a job that is already running knows it has to run again
+    frappe.cache.set(frappe.cache.make_key(key), pickle.dumps({
+        "priority": priority,
+        "version": frappe.generate_hash(length=10),
+    }))
+
+    frappe.enqueue(method=_run_rule_change_evaluation,
+                   queue="default",
+                   job_id=f"mint_rule_change_evaluation::{company}",
+                   deduplicate=True,
+                   enqueue_after_commit=True,
+                   company=company)
+
+def _run_rule_change_evaluation(company: str):
+    """
+    Evaluate the pending rule change of the company until there is none left.
+
+    The pending change is only cleared once it has been evaluated. Rules changed while the job is running
+    can't enqueue another job (it is deduplicated), so they are picked up by running again here.
+    """
+    key = get_rule_change_priority_key(company)
+
+    while (pending := get_pending_rule_change(key)) is not None:
+        evaluate_rule_change(company, pending["priority"])
+
+        if clear_pending_rule_change(key, pending["version"]):
+            return
+
+def evaluate_rule_change(company: str, priority: int):
+
+    rule_docs = get_rule_docs(company)
+
+    affected_rules = [rule.name for rule in rule_docs if rule.priority >= priority]
+
+    or_filters = [["matched_rule", "is", "not set"]]
+    if affected_rules:
+        or_filters.append(["matched_rule", "in", affected_rules])
+
+    matcher = RuleMatcher(rule_docs, profile=True)
+
+    started_on = frappe.utils.now_datetime()
+    started_at = time.monotonic()
+    evaluated = 0
+
+    for chunk in iterate_transactions({
+        "company": company,
+        "status": "Unreconciled",
+        "docstatus": 1,
+    }, or_filters=or_filters):
+        evaluate_transactions(chunk, matcher)
+        evaluated += len(chunk)
+
+    save_rule_evaluation_memo(company, matcher, rule_docs)
+    save_rule_evaluation_log("Rule Change", company, matcher, evaluated, started_on, time.monotonic() - started_at)
+
+    queue_auto_apply_if_enabled(company, rule_docs)
+
+def get_pending_rule_change(key: str):
+    """
+    The pending rule change ({"priority", "version"}) - read from Redis directly, since the local cache of a job
+    would keep returning the value it read first
+    """
+    value = frappe.cache.get(frappe.cache.make_key(key))
+
+    return pickle.loads(value) if value else None
+
+def clear_pending_rule_change(key: str, version: str):
+    """
+    Delete the pending rule change if it is still the evaluated version. Returns False if a rule was changed
+    in the meantime - the check and the delete are one transaction, so a change can't be deleted unevaluated.
+    """
+    redis_key = frappe.cache.make_key(key)
+
+    with frappe.cache.pipeline() as pipe:
+        try:
+            pipe.watch(redis_key)
+
+            value = pipe.get(redis_key)
+            if value and pickle.loads(value)["version"] != version:
+                return False
+
+            pipe.multi()
+            pipe.delete(redis_key)
+            pipe.execute()
+        except redis.WatchError:
+            return False
+
+    return True
+
+def load_rule_evaluation_memo(company: str, matcher: RuleMatcher, rule_docs: list):
+    """
+    Seed the matcher with the description results of earlier runs, if caching is enabled and the rules have not changed since
+    """
+    if not frappe.db.get_single_value("Mint Settings", "cache_rule_evaluation_results"):
+        return
+
+    cached = frappe.cache.get_value(get_rule_evaluation_memo_key(company))
+
+    if cached and cached.get("version") == get_rules_version(rule_docs):
+        matcher.set_memo(company, cached["memo"])
+
+def save_rule_evaluation_memo(company: str, matcher: RuleMatcher, rule_docs: list):
+
+    if not frappe.db.get_single_value("Mint Settings", "cache_rule_evaluation_results"):
+        return
+
+    frappe.cache.set_value(get_rule_evaluation_memo_key(company), {
+        "version": get_rules_version(rule_docs),
+        "memo": matcher.get_memo(company),
+    }, expires_in_sec=RULE_EVALUATION_MEMO_EXPIRY)
+
+def get_rules_version(rule_docs: list):
+    """
+    Fingerprint of the rules - changes if any rule is added, removed, reordered or edited
+    """
+    return hashlib.sha1("|".join(f"{rule.name}:{rule.priority}:{rule.modified}" for rule in rule_docs).encode()).hexdigest()
+
+def get_rule_evaluation_memo_key(company: str):
+    return f"mint:rule_evaluation_memo:{company}"
+
+def get_rule_change_priority_key(company: str):
+    return f"mint:rule_change_evaluation:{company}"
+
+def get_rule_evaluation_queue_key(company: str):
+    return f"mint:rule_evaluation_queue:{company}"
+
+def get_rule_evaluation_marker_key(company: str):
+    return f"mint:rule_evaluation_scheduled:{company}"
+
+def evaluate_transactions(transactions: list, matcher: RuleMatcher, batch_size: int = RULE_EVALUATION_BATCH_SIZE):
+    """
+    Evaluate the transactions and write the results back in batches.
+
+    Results are grouped by matched rule so that each batch only needs one UPDATE per rule (and one for transactions without a match).
+    Every batch is committed so that a long run does not hold locks on the whole table.
+    """
+    results = {}
+    pending = 0
+
+    for transaction in transactions:
+        matched_rule = evaluate_transaction(transaction, matcher)
+
+        results.setdefault(matched_rule.name if matched_rule else None, []).append(transaction.name)
+        pending += 1
+
+        if pending >= batch_size:
+            write_rule_evaluation_results(results)
+            frappe.db.commit()
+            results = {}
+            pending = 0
+
+    if pending:
+        write_rule_evaluation_results(results)
+        frappe.db.commit()
+
+def evaluate_transaction(transaction, matcher: RuleMatcher):
+    """
+    Find the first rule (by priority) that matches the transaction
+    """
+    return matcher.match(transaction)
+
+def write_rule_evaluation_results(results: dict[str | None, list[str]]):
+    """
+    Given a map of rule name (or None) to transaction names, mark the transactions as evaluated with the matched rule
+    """
+    BankTransaction = frappe.qb.DocType("Bank Transaction")
+
+    modified = frappe.utils.now()
+
+    for matched_rule, transaction_names in results.items():
+        if not transaction_names:
+            continue
+
+        (
+            frappe.qb.update(BankTransaction)
+            .set(BankTransaction.is_rule_evaluated, 1)
+            .set(BankTransaction.matched_rule, matched_rule)
+            .set(BankTransaction.modified, modified)
+            .set(BankTransaction.modified_by, frappe.session.user)
+            .where(BankTransaction.name.isin(transaction_names))
+        ).run()
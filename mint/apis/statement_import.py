@@ -1,19 +1,60 @@
 import frappe
+import hashlib
 import re
-from frappe.utils.csvutils import read_csv_content
-from frappe.utils.xlsxutils import (
-	read_xls_file_from_attached_file,
-	read_xlsx_file_from_attached_file,
-)
+import time
+from collections import deque
+from itertools import islice
 from frappe import _
 from frappe.utils import getdate
+from frappe.utils.background_jobs import is_job_enqueued
 
 from datetime import datetime
 
 from mint.apis.bank_account import set_closing_balance_as_per_statement
+from mint.apis.rules import queue_transactions_for_rule_evaluation
+from mint.apis.statement_reader import get_file_content_hash, get_file_encoding, get_row_reader, iter_file_rows
+
+# Number of bank transactions created between commits of an import
+STATEMENT_IMPORT_CHUNK_SIZE = 200
+
+# Minimum number of seconds between two realtime progress events of an import
+STATEMENT_IMPORT_PROGRESS_INTERVAL = 0.5
+
+STATEMENT_IMPORT_PROGRESS_EVENT = "mint-statement-import-progress"
+
+# Background job timeout for a single import (an annual statement can have tens of thousands of rows)
+STATEMENT_IMPORT_TIMEOUT = 60 * 60
+
+# Parsed statements are cached for the time it takes to review and import a file
+STATEMENT_CACHE_EXPIRY = 60 * 60
+
+# Number of parsed statements kept in the cache, and the largest file (in rows) whose rows are cached for the pages
+STATEMENT_CACHE_MAX_ENTRIES = 20
+STATEMENT_CACHE_MAX_ROWS = 100000
+
+STATEMENT_CACHE_INDEX_KEY = "mint:statement_parse_index"
+
+# The header row is searched for in the first rows of the file only, so that it can be found without reading the whole file
+STATEMENT_HEADER_SEARCH_ROWS = 200
+
+# Amount formats detected by `get_file_properties` and their options on the Mint Bank Statement Import Template
+STATEMENT_TEMPLATE_AMOUNT_FORMATS = {
+    "dr_cr_in_amount": "Contains Cr/Dr",
+    "positive_negative_in_amount": "Positive/Negative Value",
+    "cr_dr_in_transaction_type": "Transaction Type containing Cr/Dr",
+    "deposit_withdrawal_in_transaction_type": "Transaction Type containing Deposit/Withdrawal",
+    "separate_columns_for_withdrawal_and_deposit": "Separate Withdrawal/Deposit Columns",
+}
+
+# Number of rows at the start and at the end of the file (and of the transactions) sent with the preview
+STATEMENT_PREVIEW_ROWS = 50
+
+# Default and maximum number of rows in a page of a parse session - rows are cached in chunks of the default page length
+STATEMENT_PAGE_LENGTH = 200
+STATEMENT_PAGE_MAX_LENGTH = 1000
 
 @frappe.whitelist(methods=["GET"])
-def get_statement_details(file_url: str, bank_account: str):
+def get_statement_details(file_url: str, bank_account: str, preview: bool = False):
     """
     Given a file path, try to get bank statement details.
 
@@ -22,22 +63,520 @@ def get_statement_details(file_url: str, bank_account: str):
     2. Column mapping to standard variables?
     3. Row indices of all rows after the header row that are relevant - hence look like transactions
     4. Opening and Closing dates of the statement and balance
+
+    With `preview`, only the detected details, the counts and the first and last rows are returned along with a
+    parse session - the rest is fetched page by page with `get_statement_rows`, `get_statement_transactions`
+    and `get_statement_conflicts`.
+    """
+
+    details = parse_statement(file_url, bank_account)
+
+    account = frappe.get_cached_value("Bank Account", bank_account, "account")
+    account_currency = frappe.get_cached_value("Account", account, "account_currency")
+
+    if frappe.utils.cint(preview):
+        return get_statement_preview(details, file_url, bank_account, account_currency)
+
+    # The full statement is read from the file again - this response grows with the size of the file
+    read_rows = get_statement_reader(details)
+
+    # Conflicts depend on the transactions in the system, so they are never cached
+    conflicting_transactions = check_for_conflicts(bank_account, details["statement_start_date"], details["statement_end_date"])
+
+    return {
+        **details,
+        "data": list(read_rows()),
+        "transaction_rows": [transaction_row for _row_index, transaction_row in iter_statement_transaction_rows(read_rows, details)],
+        "final_transactions": list(iter_statement_transactions(read_rows, details)),
+        "conflicting_transactions": conflicting_transactions,
+        "currency": account_currency,
+    }
+
+def get_statement_preview(details: dict, file_url: str, bank_account: str, currency: str):
+    """
+    Everything the preview shows at first - its size does not depend on the size of the file
+    """
+    return {
+        "session_id": create_statement_session(file_url, bank_account, details),
+        "file_name": details["file_name"],
+        "file_path": details["file_path"],
+        "header_index": details["header_index"],
+        "header_row": details["header_row"],
+        "columns": details["columns"],
+        "column_mapping": details["column_mapping"],
+        "transaction_starting_index": details["transaction_starting_index"],
+        "transaction_ending_index": details["transaction_ending_index"],
+        "date_format": details["date_format"],
+        "amount_format": details["amount_format"],
+        "from_template": details["from_template"],
+        "statement_start_date": details["statement_start_date"],
+        "statement_end_date": details["statement_end_date"],
+        "closing_balance": details["closing_balance"],
+        "currency": currency,
+        "total_rows": details["total_rows"],
+        "first_rows": details["first_rows"],
+        "last_rows_start": details["last_rows_start"],
+        "last_rows": details["last_rows"],
+        "number_of_transactions": details["number_of_transactions"],
+        "first_transactions": details["first_transactions"],
+        "last_transactions_start": details["last_transactions_start"],
+        "last_transactions": details["last_transactions"],
+        "number_of_conflicts": count_conflicts(bank_account, details["statement_start_date"], details["statement_end_date"]),
+        "conflicting_transactions": check_for_conflicts(bank_account, details["statement_start_date"], details["statement_end_date"],
+                                                        page_length=STATEMENT_PREVIEW_ROWS),
+    }
+
+@frappe.whitelist(methods=["GET"])
+def get_statement_rows(session_id: str, start: int = 0, page_length: int = STATEMENT_PAGE_LENGTH):
+    """
+    A page of the raw rows of the file in a parse session
+    """
+    session = get_statement_session(session_id)
+    start, page_length = get_page_limits(start, page_length)
+
+    rows = get_cached_page(get_statement_rows_key(session["cache_key"]), start, page_length, session["total_rows"])
+
+    if rows is None:
+        # Not cached (a large file, or evicted) - the file is only read up to the end of the page
+        read_rows = get_statement_reader(get_statement_session_details(session))
+        rows = list(islice(read_rows(), start, start + page_length))
+
+    return {
+        "items": rows,
+        "start": start,
+        "total": session["total_rows"],
+    }
+
+@frappe.whitelist(methods=["GET"])
+def get_statement_transactions(session_id: str, start: int = 0, page_length: int = STATEMENT_PAGE_LENGTH):
+    """
+    A page of the transactions that will be imported from the file in a parse session
+    """
+    session = get_statement_session(session_id)
+    start, page_length = get_page_limits(start, page_length)
+
+    transaction_rows = get_cached_page(get_statement_transactions_key(session["cache_key"]), start, page_length, session["number_of_transactions"])
+
+    if transaction_rows is None:
+        details = get_statement_session_details(session)
+        transaction_rows = list(islice((transaction_row for _row_index, transaction_row in iter_statement_transaction_rows(get_statement_reader(details), details)),
+                                       start, start + page_length))
+
+    return {
+        "items": get_final_transactions(transaction_rows, session["python_date_format"], session["amount_format"]),
+        "start": start,
+        "total": session["number_of_transactions"],
+    }
+
+@frappe.whitelist(methods=["GET"])
+def get_statement_conflicts(session_id: str, start: int = 0, page_length: int = STATEMENT_PAGE_LENGTH):
+    """
+    A page of the existing transactions in the date range of the file in a parse session
+    """
+    session = get_statement_session(session_id)
+    start, page_length = get_page_limits(start, page_length)
+
+    return {
+        "items": check_for_conflicts(session["bank_account"], session["statement_start_date"], session["statement_end_date"],
+                                     start=start, page_length=page_length),
+        "start": start,
+        "total": count_conflicts(session["bank_account"], session["statement_start_date"], session["statement_end_date"]),
+    }
+
+def get_cached_page(key: str, start: int, page_length: int, total: int):
+    """
+    A page of the items cached in chunks of `STATEMENT_PAGE_LENGTH` (see `StatementPages`) - only the chunks of the
+    page are read. Returns None if any of them is not cached.
+    """
+    end = min(start + page_length, total)
+
+    if start >= end:
+        return []
+
+    first_chunk = start // STATEMENT_PAGE_LENGTH
+    last_chunk = (end - 1) // STATEMENT_PAGE_LENGTH
+
+    items = []
+    for chunk in range(first_chunk, last_chunk + 1):
+        cached = frappe.cache.hget(key, str(chunk))
+        if cached is None:
+            return None
+        items.extend(cached)
+
+    offset = start - first_chunk * STATEMENT_PAGE_LENGTH
+    return items[offset:offset + end - start]
+
+class StatementPages:
+    """
+    Writes the rows (or transaction rows) of a statement to a Redis hash while it is scanned, one field per chunk
+    of `STATEMENT_PAGE_LENGTH` rows, so that a page is served from its own chunks.
+    Files with more than `STATEMENT_CACHE_MAX_ROWS` rows are not cached - their pages are read from the file.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.chunk = []
+        self.chunk_index = 0
+        self.count = 0
+        self.enabled = True
+
+        frappe.cache.delete_value(key)
+
+    def add(self, item):
+        if not self.enabled:
+            return
+
+        self.count += 1
+
+        if self.count > STATEMENT_CACHE_MAX_ROWS:
+            self.enabled = False
+            self.chunk = []
+            frappe.cache.delete_value(self.key)
+            return
+
+        self.chunk.append(item)
+
+        if len(self.chunk) == STATEMENT_PAGE_LENGTH:
+            self.flush()
+
+    def flush(self):
+        if self.chunk:
+            frappe.cache.hset(self.key, str(self.chunk_index), self.chunk)
+            self.chunk_index += 1
+            self.chunk = []
+
+    def close(self):
+        if not self.enabled:
+            return
+
+        self.flush()
+        frappe.cache.expire(frappe.cache.make_key(self.key), STATEMENT_CACHE_EXPIRY)
+
+def get_page_limits(start: int, page_length: int):
+    start = max(frappe.utils.cint(start), 0)
+    page_length = min(max(frappe.utils.cint(page_length), 1), STATEMENT_PAGE_MAX_LENGTH)
+    return start, page_length
+
+def create_statement_session(file_url: str, bank_account: str, details: dict):
+    """
+    A parse session remembers the file and bank account of a preview, so that the pages can be served
+    without the client sending the file again. Everything a page needs is kept in the session, so that
+    a page only reads its cached chunks.
+    """
+    session_id = frappe.generate_hash(length=16)
+
+    frappe.cache.set_value(get_statement_session_key(session_id), {
+        "file_url": file_url,
+        "bank_account": bank_account,
+        "user": frappe.session.user,
+        "cache_key": details["cache_key"],
+        "statement_start_date": details["statement_start_date"],
+        "statement_end_date": details["statement_end_date"],
+        "total_rows": details["total_rows"],
+        "number_of_transactions": details["number_of_transactions"],
+        "python_date_format": details["python_date_format"],
+        "amount_format": details["amount_format"],
+    }, expires_in_sec=STATEMENT_CACHE_EXPIRY)
+
+    return session_id
+
+def get_statement_session(session_id: str):
+    session = frappe.cache.get_value(get_statement_session_key(session_id))
+
+    if not session or session["user"] != frappe.session.user:
+        frappe.throw(_("The statement preview has expired. Please upload the file again."), title=_("Preview Expired"))
+
+    return session
+
+def get_statement_session_details(session: dict):
+    return parse_statement(session["file_url"], session["bank_account"])
+
+def get_statement_session_key(session_id: str):
+    return f"mint:statement_session:{session_id}"
+
+def parse_statement(file_url: str, bank_account: str):
+    """
+    Run the parse pipeline on the statement file.
+
+    Only what the preview and the import need is kept (see `scan_statement`) - the rows and transactions
+    themselves are read from the file again when they are needed. The result is cached under the content hash
+    of the file and the bank account, so the preview, its pages and the import of the same file only parse it once.
+    """
+    file_doc = frappe.get_doc("File", {"file_url": file_url})
+
+    cache_key = get_statement_cache_key(bank_account, get_file_content_hash(file_doc))
+
+    details = get_cached_statement(cache_key)
+
+    if not details:
+        details = scan_statement(file_doc, bank_account, cache_key)
+        set_cached_statement(cache_key, details)
+
+    # The same content can be uploaded as another file
+    return {**details, "cache_key": cache_key, "file_name": file_url.split("/")[-1], "file_path": file_url}
+
+def get_statement_cache_key(bank_account: str, content_hash: str):
+    return f"mint:statement_scan:{bank_account}:{content_hash}"
+
+def get_statement_rows_key(cache_key: str):
+    return f"{cache_key}:rows"
+
+def get_statement_transactions_key(cache_key: str):
+    return f"{cache_key}:transactions"
+
+def get_cached_statement(cache_key: str):
+    details = frappe.cache.get_value(cache_key)
+
+    if details:
+        # Most recently used entries are kept at the head of the index
+        frappe.cache.lrem(STATEMENT_CACHE_INDEX_KEY, cache_key)
+        frappe.cache.lpush(STATEMENT_CACHE_INDEX_KEY, cache_key)
+
+    return details
+
+def set_cached_statement(cache_key: str, details: dict):
+    """
+    Cache a parsed statement. Only the most recently used `STATEMENT_CACHE_MAX_ENTRIES` statements are kept -
+    older entries (with their cached pages) are evicted, independent of their expiry.
+    """
+    frappe.cache.set_value(cache_key, details, expires_in_sec=STATEMENT_CACHE_EXPIRY)
+
+    frappe.cache.lrem(STATEMENT_CACHE_INDEX_KEY, cache_key)
+    frappe.cache.lpush(STATEMENT_CACHE_INDEX_KEY, cache_key)
+
+    for evicted in frappe.cache.lrange(STATEMENT_CACHE_INDEX_KEY, STATEMENT_CACHE_MAX_ENTRIES, -1):
+        evicted = frappe.safe_decode(evicted)
+        frappe.cache.delete_value([evicted, get_statement_rows_key(evicted), get_statement_transactions_key(evicted)])
+
+    frappe.cache.ltrim(STATEMENT_CACHE_INDEX_KEY, 0, STATEMENT_CACHE_MAX_ENTRIES - 1)
+
+def get_statement_for_import(file_url: str, bank_account: str):
+    """
+    Details and transactions of a statement for the import job.
+
+    The transactions are streamed from the file, so that files of any size are imported with memory
+    proportional to a chunk.
+
+    Returns the details and a function that returns a new iterator over the final transactions.
+    """
+    details = parse_statement(file_url, bank_account)
+    read_rows = get_statement_reader(details)
+
+    return details, lambda: iter_statement_transactions(read_rows, details)
+
+def get_statement_reader(details: dict):
+    """
+    Function that returns a new iterator over the rows of a parsed statement's file
+    """
+    file_doc = frappe.get_doc("File", {"file_url": details["file_path"]})
+    return get_row_reader(file_doc, details["encoding"])
+
+def iter_statement_transaction_rows(read_rows, details: dict):
+    # The date format of the file is known, so the format of every row does not have to be guessed again
+    return iter_transaction_rows(read_rows(), details["header_index"], details["column_mapping"], details["python_date_format"])
+
+def iter_statement_transactions(read_rows, details: dict):
+    """
+    Final transactions of a parsed statement, read from its file
+    """
+    return iter_final_transactions((transaction_row for _row_index, transaction_row in iter_statement_transaction_rows(read_rows, details)),
+                                   details["python_date_format"], details["amount_format"])
+
+def scan_statement(file_doc, bank_account: str, cache_key: str | None = None):
+    """
+    Parse a statement while streaming its rows - only the first and last rows of the file are kept in memory.
+
+    1. The header row is found in the first rows of the file (or taken from the template of the bank account)
+    2. The formats are guessed from the transactions in the first rows
+    3. One pass over the file detects the formats of all transaction rows and, with the guessed date format,
+       reads the statement dates and closing balance, counts the rows and keeps the first and last ones
+
+    If the whole file turns out to have another date format than its first rows, the pass is repeated with it.
+    With a `cache_key`, the rows and transaction rows are cached in chunks for the pages of the preview while they are read.
+    """
+    encoding = get_file_encoding(file_doc)
+    read_rows = get_row_reader(file_doc, encoding)
+
+    head = list(islice(read_rows(), STATEMENT_HEADER_SEARCH_ROWS))
+
+    if not head:
+        frappe.throw(_("The statement file is empty"))
+
+    # Statements of a bank account that was imported before are read with its saved template instead of being analysed
+    template = get_statement_template(bank_account, head)
+
+    if template:
+        header_index, columns, column_mapping = template["header_index"], template["columns"], template["column_mapping"]
+    else:
+        header_index = get_header_row_index(head)
+        columns, column_mapping = get_column_mapping(head[header_index])
+
+    # With a template, dates are only checked against its format instead of guessing the format of every row
+    template_date_format = template["date_format"] if template else None
+
+    head_properties = FileProperties()
+    for _row_index, transaction_row in iter_transaction_rows(head, header_index, column_mapping, template_date_format):
+        head_properties.add(transaction_row)
+
+    date_format, _amount_format = head_properties.get_formats(template)
+
+    while True:
+        scan = StatementScan(date_format, cache_key)
+
+        for row_index, transaction_row in iter_transaction_rows(scan.read(read_rows()), header_index, column_mapping, template_date_format):
+            scan.add(row_index, transaction_row)
+
+        scan.close()
+
+        detected_date_format, amount_format = scan.properties.get_formats(template)
+
+        if detected_date_format == date_format:
+            break
+
+        date_format = detected_date_format
+
+    statement_start_date, statement_end_date, closing_balance = scan.get_closing_balance()
+
+    last_rows_start, last_rows = get_last_items(scan.last_rows, scan.total_rows)
+    last_transactions_start, last_transactions = get_last_items(scan.last_transactions, scan.number_of_transactions)
+
+    header_row = head[header_index]
+
+    return {
+        "encoding": encoding,
+        "header_index": header_index,
+        "header_row": header_row,
+        "columns": columns,
+        "column_mapping": column_mapping,
+        "transaction_starting_index": scan.transaction_starting_index,
+        "transaction_ending_index": scan.transaction_ending_index,
+        "date_format": get_formatted_date_format(date_format),
+        "python_date_format": date_format,
+        "amount_format": amount_format,
+        "from_template": bool(template) and scan.properties.matches_template(template),
+        "statement_start_date": statement_start_date,
+        "statement_end_date": statement_end_date,
+        "closing_balance": closing_balance,
+        "total_rows": scan.total_rows,
+        "first_rows": scan.first_rows,
+        "last_rows_start": last_rows_start,
+        "last_rows": last_rows,
+        "number_of_transactions": scan.number_of_transactions,
+        "first_transactions": get_final_transactions(scan.first_transactions, date_format, amount_format),
+        "last_transactions_start": last_transactions_start,
+        "last_transactions": get_final_transactions(last_transactions, date_format, amount_format),
+        "template": get_template_details(header_index, header_row, columns, date_format, amount_format),
+    }
+
+class StatementScan:
+    """
+    Everything the preview and the import need from a statement, collected while its rows are read once:
+    the formats of the transaction rows, the statement dates and closing balance (read with `date_format`),
+    the counts, and the first and last rows and transaction rows.
     """
 
-    data = get_data(file_url)
+    def __init__(self, date_format: str, cache_key: str | None = None):
+        self.date_format = date_format
+        self.properties = FileProperties()
+
+        self.row_pages = StatementPages(get_statement_rows_key(cache_key)) if cache_key else None
+        self.transaction_pages = StatementPages(get_statement_transactions_key(cache_key)) if cache_key else None
+
+        self.total_rows = 0
+        self.first_rows = []
+        self.last_rows = deque(maxlen=STATEMENT_PREVIEW_ROWS)
+
+        self.number_of_transactions = 0
+        self.transaction_starting_index = None
+        self.transaction_ending_index = None
+        self.first_transactions = []
+        self.last_transactions = deque(maxlen=STATEMENT_PREVIEW_ROWS)
+
+        self.statement_start_date = None
+        self.statement_end_date = None
+        self.closing_balance = None
+        self.invalid_date = None
+
+    def read(self, rows):
+        """
+        Pass the rows through, keeping the first and last ones
+        """
+        for row in rows:
+            if self.total_rows < STATEMENT_PREVIEW_ROWS:
+                self.first_rows.append(row)
+
+            self.last_rows.append(row)
+            self.total_rows += 1
+
+            if self.row_pages:
+                self.row_pages.add(row)
+
+            yield row
+
+    def add(self, row_index: int, transaction_row: dict):
+        self.properties.add(transaction_row)
+
+        if self.transaction_starting_index is None:
+            self.transaction_starting_index = row_index
 
-    file_name = file_url.split("/")[-1]
+        self.transaction_ending_index = row_index
 
-    header_index = get_header_row_index(data)
+        if self.number_of_transactions < STATEMENT_PREVIEW_ROWS:
+            self.first_transactions.append(transaction_row)
 
-    header_row = data[header_index]
+        self.last_transactions.append(transaction_row)
+        self.number_of_transactions += 1
 
-    columns, column_mapping = get_column_mapping(header_row)
+        if self.transaction_pages:
+            self.transaction_pages.add(transaction_row)
 
-    transaction_rows, transaction_starting_index, transaction_ending_index = get_transaction_rows(data, header_index, column_mapping)
+        self.add_date(transaction_row)
 
-    date_format, amount_format = get_file_properties(transaction_rows)
+    def close(self):
+        if self.row_pages:
+            self.row_pages.close()
+            self.transaction_pages.close()
 
+    def add_date(self, transaction: dict):
+        date = transaction.get("date")
+        if not date:
+            return
+
+        if isinstance(date, datetime):
+            tx_date = date
+        else:
+            try:
+                tx_date = datetime.strptime(date, self.date_format)
+            except ValueError:
+                # Only an error if this turns out to be the date format of the file
+                self.invalid_date = self.invalid_date or date
+                return
+
+        if self.statement_start_date is None or tx_date < self.statement_start_date:
+            self.statement_start_date = tx_date
+
+        if self.statement_end_date is None or tx_date >= self.statement_end_date:
+            self.statement_end_date = tx_date
+
+            self.closing_balance = transaction.get("balance")
+
+    def get_closing_balance(self):
+        if self.invalid_date:
+            frappe.throw(_("The date {0} is not in the date format {1} of the statement").format(
+                self.invalid_date, get_formatted_date_format(self.date_format)), title=_("Invalid Date"))
+
+        return getdate(self.statement_start_date), getdate(self.statement_end_date), get_float_amount(self.closing_balance)
+
+def get_last_items(last_items: deque, total: int):
+    """
+    Index of the first of the last items sent with the preview, and those items - they never overlap the first items
+    """
+    start = max(STATEMENT_PREVIEW_ROWS, total - STATEMENT_PREVIEW_ROWS)
+    count = total - start
+
+    return start, list(last_items)[len(last_items) - count:] if count > 0 else []
+
+def get_formatted_date_format(date_format: str):
     char_map = {
         "%d": "DD",
         "%m": "MM",
@@ -51,40 +590,108 @@ def get_statement_details(file_url: str, bank_account: str):
     for char, replacement in char_map.items():
         formatted_date_format = formatted_date_format.replace(char, replacement)
 
-    statement_start_date, statement_end_date, closing_balance = get_closing_balance(transaction_rows, date_format)
+    return formatted_date_format
+
+def get_statement_template(bank_account: str, rows: list[list[str]]):
+    """
+    The saved format of the bank account's statements, if its header row is in the rows - else None.
+
+    The header row of the file is matched against the fingerprint of the header row of the template
+    (or of its column mapping, for templates that were created by hand).
+    """
+    if not frappe.db.exists("Mint Bank Statement Import Template", bank_account):
+        return None
 
-    conflicting_transactions = check_for_conflicts(bank_account, statement_start_date, statement_end_date)
+    template = frappe.get_cached_doc("Mint Bank Statement Import Template", bank_account)
 
-    final_transactions = get_final_transactions(transaction_rows, date_format, amount_format)
+    amount_format = next((key for key, label in STATEMENT_TEMPLATE_AMOUNT_FORMATS.items() if label == template.amount_expressed_as), None)
 
-    account = frappe.get_cached_value("Bank Account", bank_account, "account")
-    account_currency = frappe.get_cached_value("Account", account, "account_currency")
+    if not template.column_mapping or not template.date_format or not amount_format:
+        return None
+
+    if template.header_index >= len(rows):
+        return None
+
+    header_cells = get_header_cells(rows[template.header_index])
+
+    fingerprint = template.header_fingerprint or get_header_fingerprint([column.header_text for column in template.column_mapping])
+
+    if get_header_fingerprint([cell for _idx, cell in header_cells]) != fingerprint:
+        return None
+
+    columns = []
+    column_mapping = {}
+
+    for (idx, cell), column in zip(header_cells, template.column_mapping):
+        columns.append({
+            "index": idx,
+            "header_text": cell,
+            "variable": column.variable,
+            "maps_to": column.maps_to,
+        })
+
+        if column.maps_to != "Do not import" and column.maps_to not in column_mapping:
+            column_mapping[column.maps_to] = idx
 
     return {
-        "file_name": file_name,
-        "file_path": file_url,
-        "data": data,
-        "header_index": header_index,
-        "header_row": header_row,
+        "header_index": template.header_index,
         "columns": columns,
         "column_mapping": column_mapping,
-        "transaction_starting_index": transaction_starting_index,
-        "transaction_ending_index": transaction_ending_index,
-        "transaction_rows": transaction_rows,
-        "date_format": formatted_date_format,
+        "date_format": template.date_format,
+        "amount_format": amount_format,
+    }
+
+def get_template_details(header_index: int, header_row: list[str], columns: list[dict], date_format: str, amount_format: str):
+    """
+    Everything the Mint Bank Statement Import Template of the bank account is created with after the import
+    """
+    return {
+        "header_index": header_index,
+        "header_fingerprint": get_header_fingerprint([cell for _idx, cell in get_header_cells(header_row)]),
+        "columns": [{
+            "header_text": column["header_text"],
+            "variable": column["variable"],
+            "maps_to": column["maps_to"],
+        } for column in columns],
+        "date_format": date_format,
         "amount_format": amount_format,
-        "statement_start_date": statement_start_date,
-        "statement_end_date": statement_end_date,
-        "closing_balance": closing_balance,
-        "conflicting_transactions": conflicting_transactions,
-        "final_transactions": final_transactions,
-        "currency": account_currency,
     }
 
+def save_statement_template(bank_account: str, details: dict | None):
+    """
+    Create the Mint Bank Statement Import Template of the bank account from the first successful import.
+    Existing templates are never overwritten - they may have been corrected by hand.
+    """
+    if not details or frappe.db.exists("Mint Bank Statement Import Template", bank_account):
+        return
+
+    frappe.get_doc({
+        "doctype": "Mint Bank Statement Import Template",
+        "bank_account": bank_account,
+        "statement_type": "Excel/CSV",
+        "header_index": details["header_index"],
+        "header_fingerprint": details["header_fingerprint"],
+        "date_format": details["date_format"],
+        "amount_expressed_as": STATEMENT_TEMPLATE_AMOUNT_FORMATS.get(details["amount_format"]),
+        "column_mapping": details["columns"],
+    }).insert(ignore_permissions=True)
+
+def get_header_cells(header_row: list[str]):
+    """
+    Index and text of the cells of the header row that can be columns (same as in `get_column_mapping`)
+    """
+    return [(idx, cell) for idx, cell in enumerate(header_row) if cell and isinstance(cell, str)]
+
+def get_header_fingerprint(header_cells: list[str]):
+    return hashlib.sha256("\x1f".join(cell.strip().lower() for cell in header_cells).encode()).hexdigest()
+
 @frappe.whitelist(methods=["POST"])
 def import_statement(file_url: str, bank_account: str):
     """
-    Given a file path and bank account, try to import the statement
+    Given a file path and bank account, import the statement in the background.
+
+    Returns the ID of the import (a Mint Bank Statement Import Log) - progress is published
+    as the "mint-statement-import-progress" realtime event
     """
 
     if not frappe.has_permission("Bank Transaction", "write"):
@@ -96,8 +703,72 @@ def import_statement(file_url: str, bank_account: str):
     if not frappe.has_permission("Bank Transaction", "submit"):
         frappe.throw(_("You do not have permission to import and submit bank transactions"), title="Permission Denied")
 
-    
+    get_statement_import_context(bank_account)
+
+    log = frappe.new_doc("Mint Bank Statement Import Log")
+    log.bank_account = bank_account
+    log.file = file_url
+    log.status = "Queued"
+    log.insert(ignore_permissions=True)
+
+    enqueue_statement_import(log.name)
+
+    return {
+        "import_id": log.name,
+    }
+
+@frappe.whitelist(methods=["POST"])
+def resume_statement_import(import_id: str):
+    """
+    Run a failed import again - rows that were already imported are skipped.
+
+    Imports that are still "Queued" or "In Progress" without a background job (for example because the worker
+    was killed) can be resumed as well.
+    """
+    log = frappe.get_doc("Mint Bank Statement Import Log", import_id)
+    log.check_permission("write")
+
+    if log.status == "Completed":
+        frappe.throw(_("The import has already been completed"))
+
+    if log.status != "Failed" and is_job_enqueued(get_statement_import_job_id(log.name)):
+        frappe.throw(_("The import is still running"))
+
+    log.db_set({"status": "Queued", "error": None})
+
+    enqueue_statement_import(log.name)
+
+    return {
+        "import_id": log.name,
+    }
+
+@frappe.whitelist(methods=["GET"])
+def get_statement_import_status(import_id: str):
+    """
+    Progress of an import - same as the "mint-statement-import-progress" realtime event,
+    for clients that missed the event
+    """
+    log = frappe.get_doc("Mint Bank Statement Import Log", import_id)
+    log.check_permission("read")
+
+    return get_statement_import_progress(log)
+
+def get_statement_import_job_id(import_id: str):
+    return f"mint_statement_import::{import_id}"
+
+def enqueue_statement_import(import_id: str):
+    frappe.enqueue(method=run_statement_import,
+                   queue="long",
+                   timeout=STATEMENT_IMPORT_TIMEOUT,
+                   job_id=get_statement_import_job_id(import_id),
+                   deduplicate=True,
+                   enqueue_after_commit=True,
+                   import_id=import_id)
 
+def get_statement_import_context(bank_account: str):
+    """
+    Validate the bank account and resolve everything that is the same for all transactions of the statement
+    """
     company, account, is_company_account, disabled = frappe.get_value("Bank Account", bank_account, ["company", "account", "is_company_account", "disabled"])
     if not is_company_account:
         frappe.throw(_("The bank account is not a company account. Please select a company account"), title="Invalid Bank Account")
@@ -106,80 +777,132 @@ def import_statement(file_url: str, bank_account: str):
         frappe.throw(_("The bank account is disabled. Please enable it"), title="Disabled Bank Account")
     
     currency = frappe.get_value("Account", account, "account_currency")
-    # Create the bank transactions, submit them and then store the closing balance if any
 
-    data = get_statement_details(file_url, bank_account)
+    return {
+        "bank_account": bank_account,
+        "company": company,
+        "currency": currency,
+        "evaluate_rules": bool(frappe.db.exists("Mint Bank Transaction Rule", {"company": company})),
+    }
+
+def run_statement_import(import_id: str):
+    """
+    Create the bank transactions of a statement in chunks.
+
+    Every chunk is committed along with the number of imported rows on the import log,
+    so an import that fails part-way through can be resumed after the last committed chunk.
+    """
+    log = frappe.get_doc("Mint Bank Statement Import Log", import_id)
+
+    if log.status not in ("Queued", "In Progress"):
+        return
+
+    try:
+        context = get_statement_import_context(log.bank_account)
+
+        data, get_transactions = get_statement_for_import(log.file, log.bank_account)
+
+        log.db_set({
+            "status": "In Progress",
+            "number_of_transactions": data.get("number_of_transactions"),
+            "start_date": data.get("statement_start_date"),
+            "end_date": data.get("statement_end_date"),
+            "closing_balance": data.get("closing_balance"),
+        })
+        frappe.db.commit()
+
+        last_published = 0
+
+        # Skip the rows that were imported by an earlier run
+        transactions = islice(get_transactions(), log.imported_transactions, None)
+
+        while chunk := list(islice(transactions, STATEMENT_IMPORT_CHUNK_SIZE)):
+            insert_bank_transactions(chunk, context)
+
+            log.db_set("imported_transactions", log.imported_transactions + len(chunk))
+            frappe.db.commit()
 
-    progress = 0
+            if time.monotonic() - last_published >= STATEMENT_IMPORT_PROGRESS_INTERVAL:
+                publish_statement_import_progress(log)
+                last_published = time.monotonic()
 
-    for transaction in data.get("final_transactions"):
+        if data.get("closing_balance") and data.get("closing_balance") > 0 and data.get("statement_end_date"):
+            set_closing_balance_as_per_statement(log.bank_account, frappe.utils.getdate(data.get("statement_end_date")), data.get("closing_balance"))
+
+        log.db_set("status", "Completed")
+        frappe.db.commit()
+
+        try:
+            save_statement_template(log.bank_account, data.get("template"))
+            frappe.db.commit()
+        except Exception:
+            # The import itself succeeded - the next import detects the format again
+            frappe.db.rollback()
+            frappe.log_error(title=_("Could not save the statement import template of {0}").format(log.bank_account))
+
+    except Exception:
+        frappe.db.rollback()
+        log.db_set({
+            "status": "Failed",
+            "error": frappe.get_traceback(),
+        })
+        frappe.db.commit()
+
+    publish_statement_import_progress(log)
+
+def insert_bank_transactions(transactions: list, context: dict):
+    """
+    Create and submit the bank transactions of a chunk.
+
+    Each transaction is inserted directly as submitted (one write instead of insert + submit), and rule evaluation
+    is queued once for the whole chunk instead of from every transaction's submit hook.
+    """
+    names = []
+
+    for transaction in transactions:
         bank_tx = frappe.get_doc({
             "doctype": "Bank Transaction",
             "date": transaction.get("date"),
             "status": "Unreconciled",
-            "bank_account": bank_account,
+            "bank_account": context["bank_account"],
             "withdrawal": transaction.get("withdrawal"),
             "deposit": transaction.get("deposit"),
             "description": transaction.get("description"),
             "reference_number": transaction.get("reference"),
             "transaction_type": transaction.get("transaction_type"),
-            "currency": currency,
-            "company": company,
+            "currency": context["currency"],
+            "company": context["company"],
+            "docstatus": 1,
         })
+        bank_tx.flags.skip_rule_evaluation = True
         bank_tx.insert()
-        bank_tx.submit()
-        progress += 1
+        names.append(bank_tx.name)
 
-        frappe.publish_realtime("mint-statement-import-progress", {
-            "progress": round((progress / len(data.get("final_transactions"))) * 100),
-        }, user=frappe.session.user)
-    
-    frappe.publish_realtime("mint-statement-import-progress", {
-        "progress": 100,
-        "total": len(data.get("final_transactions")),
-    }, user=frappe.session.user)
-    
-    log = frappe.new_doc("Mint Bank Statement Import Log")
-    log.bank_account = bank_account
-    log.file = file_url
-    log.number_of_transactions = len(data.get("final_transactions"))
-    log.start_date = data.get("statement_start_date")
-    log.end_date = data.get("statement_end_date")
-    log.closing_balance = data.get("closing_balance")
-    log.insert(ignore_permissions=True)
+    if context["evaluate_rules"]:
+        queue_transactions_for_rule_evaluation(context["company"], names)
 
-    if data.get("closing_balance") and data.get("closing_balance") > 0 and data.get("statement_end_date"):
-        set_closing_balance_as_per_statement(bank_account, frappe.utils.getdate(data.get("statement_end_date")), data.get("closing_balance"))
-    
-    from mint.apis.rules import run_rule_evaluation
-    run_rule_evaluation()
+def publish_statement_import_progress(log):
+    frappe.publish_realtime(STATEMENT_IMPORT_PROGRESS_EVENT, get_statement_import_progress(log), user=log.owner, after_commit=False)
+
+def get_statement_import_progress(log):
+    total = log.number_of_transactions or 0
 
     return {
-        "success": True,
-        "message": _("Bank statement imported successfully."),
-        "start_date": data.get("statement_start_date"),
-        "end_date": data.get("statement_end_date"),
+        "import_id": log.name,
+        "status": log.status,
+        "progress": round((log.imported_transactions / total) * 100) if total else (100 if log.status == "Completed" else 0),
+        "imported": log.imported_transactions,
+        "total": total,
+        "start_date": log.start_date,
+        "end_date": log.end_date,
+        "error": log.error,
     }
 
 def get_data(file_path: str):
 
     file_doc = frappe.get_doc("File", {"file_url": file_path})
 
-    parts = file_doc.get_extension()
-    extension = parts[1]
-    content = file_doc.get_content()
-
-    if extension.lower() not in (".csv", ".xlsx", ".xls"):
-        frappe.throw(_("Import template should be of type .csv, .xlsx or .xls"), title="Invalid File Type")
-
-    if extension.lower() == ".csv":
-        data = read_csv_content(content)
-    elif extension.lower() == ".xlsx":
-        data = read_xlsx_file_from_attached_file(fcontent=content)
-    elif extension.lower() == ".xls":
-        data = read_xls_file_from_attached_file(content)
-    
-    return data
+    return list(iter_file_rows(file_doc))
 
 def get_header_row_index(data: list[list[str]]):
     """
@@ -268,13 +991,11 @@ def get_column_mapping(header_row: list[str]):
     return columns, column_mapping
 
 
-def get_transaction_rows(data: list[list[str]], header_index: int, column_mapping: dict[str, int]):
+def get_transaction_rows(data: list[list[str]], header_index: int, column_mapping: dict[str, int], date_format: str | None = None):
     """
     Given the data, header index and column mapping, try to get the transaction rows
 
-    For each row after the header row, check if the data makes sense - date column should have a date, 
-    amount column should be a number after removing any special charatcers, spaces and "CR/DR" text.
-    Balance column should be a number after removing any special charatcers, spaces and "CR/DR" text.
+    Returns the transaction rows with the indexes of the first and last transaction rows in the data
     """
 
     transaction_rows = []
@@ -282,22 +1003,47 @@ def get_transaction_rows(data: list[list[str]], header_index: int, column_mappin
     transaction_starting_index = None
     transaction_ending_index = None
 
-    valid_rows = data[header_index + 1:]
+    for row_index, transaction_row in iter_transaction_rows(data, header_index, column_mapping, date_format):
+
+        if transaction_starting_index is None:
+            transaction_starting_index = row_index
+
+        transaction_ending_index = row_index
+
+        transaction_rows.append(transaction_row)
+
+    return transaction_rows, transaction_starting_index, transaction_ending_index
+
+def iter_transaction_rows(rows, header_index: int, column_mapping: dict[str, int], date_format: str | None = None):
+    """
+    Yields the index and transaction row of every transaction in the rows (any iterable, so that files can be streamed)
+
+    With a known `date_format` (from a template, or of a file that was parsed before), dates are only checked against it
+    instead of guessing the format of every row.
+
+    For each row after the header row, check if the data makes sense - date column should have a date, 
+    amount column should be a number after removing any special charatcers, spaces and "CR/DR" text.
+    Balance column should be a number after removing any special charatcers, spaces and "CR/DR" text.
+    """
 
     column_map_keys = column_mapping.keys()
 
-    for row_index, row in enumerate(valid_rows):
+    base_index = header_index + 1
+
+    for row_index, row in enumerate(islice(rows, base_index, None), start=base_index):
 
-        date = row[column_mapping["Date"]] if "Date" in column_map_keys else None
-        amount = row[column_mapping["Amount"]] if "Amount" in column_map_keys else None
-        withdrawal = row[column_mapping["Withdrawal"]] if "Withdrawal" in column_map_keys else None
-        deposit = row[column_mapping["Deposit"]] if "Deposit" in column_map_keys else None
-        balance = row[column_mapping["Balance"]] if "Balance" in column_map_keys else None
+        date = get_cell(row, column_mapping, "Date")
+        amount = get_cell(row, column_mapping, "Amount")
+        withdrawal = get_cell(row, column_mapping, "Withdrawal")
+        deposit = get_cell(row, column_mapping, "Deposit")
+        balance = get_cell(row, column_mapping, "Balance")
 
         if not date:
             continue
 
-        if isinstance(date, datetime):
+        is_datetime = isinstance(date, datetime)
+
+        if is_datetime:
             date = date.strftime("%Y-%m-%d")
 
         if not isinstance(date, str):
@@ -306,8 +1052,11 @@ def get_transaction_rows(data: list[list[str]], header_index: int, column_mappin
         if not amount and not withdrawal and not deposit:
             continue
 
-        # Check if date column is a valid date
-        row_date_format = frappe.utils.guess_date_format(date)
+        # Check if date column is a valid date - dates that are already datetimes don't need a format
+        if date_format and (is_datetime or is_date_in_format(date, date_format)):
+            row_date_format = date_format
+        else:
+            row_date_format = frappe.utils.guess_date_format(date)
 
         if not row_date_format:
             continue
@@ -321,43 +1070,35 @@ def get_transaction_rows(data: list[list[str]], header_index: int, column_mappin
         if not amount and not withdrawal and not deposit:
             continue
 
-        if transaction_starting_index is None:
-            transaction_starting_index = row_index
-
-        transaction_ending_index = row_index
-
         transaction_row = {
             "date_format": row_date_format,
         }
 
-        if "Date" in column_map_keys:
-            transaction_row["date"] = row[column_mapping["Date"]]
-        if "Amount" in column_map_keys:
-            transaction_row["amount"] = row[column_mapping["Amount"]]
-        if "Withdrawal" in column_map_keys:
-            transaction_row["withdrawal"] = row[column_mapping["Withdrawal"]]
-        if "Deposit" in column_map_keys:
-            transaction_row["deposit"] = row[column_mapping["Deposit"]]
-        if "Balance" in column_map_keys:
-            transaction_row["balance"] = row[column_mapping["Balance"]]
-        if "Reference" in column_map_keys:
-            transaction_row["reference"] = row[column_mapping["Reference"]]
-        if "Description" in column_map_keys:
-            transaction_row["description"] = row[column_mapping["Description"]]
-        if "Transaction Type" in column_map_keys:
-            transaction_row["transaction_type"] = row[column_mapping["Transaction Type"]]
+        for column, key in (("Date", "date"), ("Amount", "amount"), ("Withdrawal", "withdrawal"), ("Deposit", "deposit"), ("Balance", "balance"),
+                            ("Reference", "reference"), ("Description", "description"), ("Transaction Type", "transaction_type")):
+            if column in column_map_keys:
+                transaction_row[key] = get_cell(row, column_mapping, column)
         
-        transaction_rows.append(transaction_row)
-    
-    base_index = header_index + 1
+        yield row_index, transaction_row
 
-    if transaction_starting_index is not None:
-        transaction_starting_index += base_index
-    
-    if transaction_ending_index is not None:
-        transaction_ending_index += base_index
+def get_cell(row: list, column_mapping: dict[str, int], column: str):
+    """
+    Value of the mapped column in the row - rows can be shorter than the header (e.g. blank lines)
+    """
+    idx = column_mapping.get(column)
 
-    return transaction_rows, transaction_starting_index, transaction_ending_index
+    if idx is None or idx >= len(row):
+        return None
+
+    return row[idx]
+
+def is_date_in_format(date: str, date_format: str):
+    try:
+        datetime.strptime(date, date_format)
+    except ValueError:
+        return False
+
+    return True
 
 def get_float_amount(amount):
 
@@ -389,53 +1130,80 @@ def get_file_properties(transactions: list):
     2. Amount format - does it contain "CR/Dr" text or is it in a separate column (maybe transaction type?). Amount could also be positive and negative.
     """
 
-    date_format_frequency = {
-        "%d/%m/%Y": 0,
-    }
-
-    amount_format_frequency = {
-        "separate_columns_for_withdrawal_and_deposit": 0,
-        "dr_cr_in_amount": 0,
-        "positive_negative_in_amount": 0,
-        "cr_dr_in_transaction_type": 0,
-        "deposit_withdrawal_in_transaction_type": 0,
-    }
+    properties = FileProperties()
 
     for transaction in transactions:
+        properties.add(transaction)
+
+    return properties.get_formats()
+
+class FileProperties:
+    """
+    Frequencies of the date and amount formats of transaction rows, counted one row at a time (see `get_file_properties`)
+    """
+
+    def __init__(self):
+        self.date_format_frequency = {
+            "%d/%m/%Y": 0,
+        }
+
+        self.amount_format_frequency = {
+            "separate_columns_for_withdrawal_and_deposit": 0,
+            "dr_cr_in_amount": 0,
+            "positive_negative_in_amount": 0,
+            "cr_dr_in_transaction_type": 0,
+            "deposit_withdrawal_in_transaction_type": 0,
+        }
+
+    def add(self, transaction: dict):
         date_format = transaction.get("date_format")
 
         if date_format:
-            date_format_frequency[date_format] = date_format_frequency.get(date_format, 0) + 1
+            self.date_format_frequency[date_format] = self.date_format_frequency.get(date_format, 0) + 1
         
         # Check if there's an amount column
         # If there's a separate column for withdrawal and deposit, we can skip this
         if transaction.get("withdrawal", None) or transaction.get("deposit", None):
-            amount_format_frequency["separate_columns_for_withdrawal_and_deposit"] += 1
-            continue
+            self.amount_format_frequency["separate_columns_for_withdrawal_and_deposit"] += 1
+            return
 
         amount = transaction.get("amount", None)
 
         if not amount:
-            continue
+            return
 
         if isinstance(amount, str) and ("cr" in amount.lower() or "dr" in amount.lower()):
-            amount_format_frequency["dr_cr_in_amount"] += 1
+            self.amount_format_frequency["dr_cr_in_amount"] += 1
         
         # Check if there's a transaction type column containing "cr"/"dr"
         if transaction.get("transaction_type", None):
             if "cr" in transaction.get("transaction_type", "").lower() or "dr" in transaction.get("transaction_type", "").lower():
-                amount_format_frequency["cr_dr_in_transaction_type"] += 1
+                self.amount_format_frequency["cr_dr_in_transaction_type"] += 1
             if "deposit" in transaction.get("transaction_type", "").lower() or "withdrawal" in transaction.get("transaction_type", "").lower():
-                amount_format_frequency["deposit_withdrawal_in_transaction_type"] += 1
+                self.amount_format_frequency["deposit_withdrawal_in_transaction_type"] += 1
         
         # Else assume that the amount is expressed as positive/negative value
         else:
-            amount_format_frequency["positive_negative_in_amount"] += 1
-    
-    most_common_date_format = max(date_format_frequency, key=date_format_frequency.get)
-    most_common_amount_format = max(amount_format_frequency, key=amount_format_frequency.get)
+            self.amount_format_frequency["positive_negative_in_amount"] += 1
+
+    def matches_template(self, template: dict):
+        """
+        Check that all dates are in the date format of the template - a bank can change its date format
+        without changing the header, in which case the formats are detected as usual
+        """
+        return all(date_format == template["date_format"] for date_format, count in self.date_format_frequency.items() if count)
+
+    def get_formats(self, template: dict | None = None):
+        """
+        The date and amount formats of the template if it matches, else the most common ones
+        """
+        if template and self.matches_template(template):
+            return template["date_format"], template["amount_format"]
 
-    return most_common_date_format, most_common_amount_format
+        most_common_date_format = max(self.date_format_frequency, key=self.date_format_frequency.get)
+        most_common_amount_format = max(self.amount_format_frequency, key=self.amount_format_frequency.get)
+
+        return most_common_date_format, most_common_amount_format
 
 
 def get_closing_balance(transactions: list, date_format: str):
@@ -443,44 +1211,36 @@ def get_closing_balance(transactions: list, date_format: str):
     Given the transactions and date format, try to get the statement start date, end date and closing balance
     """
 
-    statement_start_date = None
-    statement_end_date = None
-    closing_balance = None
+    scan = StatementScan(date_format)
 
     for transaction in transactions:
-        date = transaction.get("date")
-        if not date:
-            continue
-
-        if isinstance(date, datetime):
-            tx_date = date
-        else:
-            tx_date = datetime.strptime(date, date_format)
-
-        if statement_start_date is None or tx_date < statement_start_date:
-            statement_start_date = tx_date
+        scan.add_date(transaction)
 
-        if statement_end_date is None or tx_date >= statement_end_date:
-            statement_end_date = tx_date
+    return scan.get_closing_balance()
 
-            closing_balance = transaction.get("balance")
 
-    return getdate(statement_start_date), getdate(statement_end_date), get_float_amount(closing_balance)
-
-
-def check_for_conflicts(bank_account: str, start_date: str, end_date: str):
+def check_for_conflicts(bank_account: str, start_date: str, end_date: str, start: int = 0, page_length: int = 0):
     """
     Given a bank account, start date and end date, check if there are any conflicts with existing bank transactions
     """
 
-    conflicts = frappe.get_all("Bank Transaction", filters={
+    conflicts = frappe.get_all("Bank Transaction", filters=get_conflict_filters(bank_account, start_date, end_date),
+    fields=["name", "date", "withdrawal", "deposit", "description", "reference_number", "currency"],
+    order_by="date",
+    limit_start=start,
+    limit_page_length=page_length)
+
+    return conflicts
+
+def count_conflicts(bank_account: str, start_date: str, end_date: str):
+    return frappe.db.count("Bank Transaction", get_conflict_filters(bank_account, start_date, end_date))
+
+def get_conflict_filters(bank_account: str, start_date: str, end_date: str):
+    return {
         "bank_account": bank_account,
         "date": ["between", [start_date, end_date]],
         "docstatus": 1,
-    }, fields=["name", "date", "withdrawal", "deposit", "description", "reference_number", "currency"],
-    order_by="date")
-
-    return conflicts
+    }
 
 
 def get_final_transactions(transactions: list, date_format: str, amount_format: str):
@@ -488,7 +1248,12 @@ def get_final_transactions(transactions: list, date_format: str, amount_format:
     Given the transactions, date format and amount format, try to get the final transactions
     """
 
-    final_transactions = []
+    return list(iter_final_transactions(transactions, date_format, amount_format))
+
+def iter_final_transactions(transactions, date_format: str, amount_format: str):
+    """
+    Final transactions of the transaction rows, one at a time
+    """
 
     def parse_amount(transaction_row: dict):
         """
@@ -540,13 +1305,11 @@ def get_final_transactions(transactions: list, date_format: str, amount_format:
             date = datetime.strptime(date, date_format).strftime("%Y-%m-%d")
 
         withdrawal, deposit = parse_amount(transaction)
-        final_transactions.append({
+        yield {
             "date": date,
             "withdrawal": withdrawal,
             "deposit": deposit,
             "description": transaction.get("description"),
             "reference": transaction.get("reference"),
             "transaction_type": transaction.get("transaction_type"),
-        })
-    
-    return final_transactions
\ No newline at end of file
+        }
\ No newline at end of file
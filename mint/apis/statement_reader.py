@@ -0,0 +1,130 @@
+import frappe
+import codecs
+import csv
+import hashlib
+import io
+import os
+from frappe import _
+from frappe.utils.xlsxutils import read_xls_file_from_attached_file
+
+# Size of the blocks a statement file is read in
+READ_BLOCK_SIZE = 1024 * 1024
+
+# Same encodings (and order) as frappe's read_csv_content
+CSV_ENCODINGS = ["utf-8", "windows-1250", "windows-1252"]
+
+SUPPORTED_EXTENSIONS = (".csv", ".xlsx", ".xls")
+
+
+def iter_file_rows(file_doc):
+    """
+    Rows of a statement file, read lazily - only a block of the file is in memory at a time.
+
+    Rows are the same as the ones returned by frappe's `read_csv_content` and `read_xlsx_file_from_attached_file`.
+    .xls files can't be streamed and are read in one go.
+    """
+    return get_row_reader(file_doc)()
+
+def get_row_reader(file_doc, encoding: str | None = None):
+    """
+    Function that returns a new iterator over the rows of the file, for reading it more than once.
+
+    The encoding of a CSV file is detected once (or passed in, if it is already known) instead of on every read.
+    """
+    extension = get_extension(file_doc)
+
+    if extension == ".csv":
+        encoding = encoding or detect_encoding(file_doc)
+        return lambda: iter_csv_rows(file_doc, encoding)
+
+    if extension == ".xlsx":
+        return lambda: iter_xlsx_rows(file_doc)
+
+    rows = read_xls_file_from_attached_file(file_doc.get_content())
+    return lambda: iter(rows)
+
+def get_file_encoding(file_doc):
+    """
+    Encoding of a CSV file - None for Excel files
+    """
+    return detect_encoding(file_doc) if get_extension(file_doc) == ".csv" else None
+
+def iter_csv_rows(file_doc, encoding: str):
+    with open_file(file_doc) as f:
+        text = io.TextIOWrapper(f, encoding=encoding, newline="")
+
+        try:
+            for row in csv.reader(text):
+                # Blank values are None, like in read_csv_content
+                yield [value.strip() or None for value in row]
+        except csv.Error:
+            frappe.throw(_("Not a valid Comma Separated Value (CSV File)"))
+
+def iter_xlsx_rows(file_doc):
+    from openpyxl import load_workbook
+
+    with open_file(file_doc) as f:
+        workbook = load_workbook(filename=f, read_only=True, data_only=True)
+
+        try:
+            sheet = workbook.active
+            # The dimensions stored in the file can be wrong - read the rows that are actually there (like frappe does)
+            sheet.reset_dimensions()
+
+            for row in sheet.iter_rows(values_only=True):
+                yield list(row)
+        finally:
+            workbook.close()
+
+def detect_encoding(file_doc):
+    """
+    The first encoding that can decode the whole file - checked block by block with an incremental decoder
+    """
+    for encoding in CSV_ENCODINGS:
+        decoder = codecs.getincrementaldecoder(encoding)()
+
+        try:
+            with open_file(file_doc) as f:
+                while block := f.read(READ_BLOCK_SIZE):
+                    decoder.decode(block)
+                decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            continue
+
+        return encoding
+
+    frappe.throw(_("Unknown file encoding. Tried utf-8, windows-1250, windows-1252."))
+
+def get_file_content_hash(file_doc):
+    """
+    Hash of the file content - the one stored on the File if there is one, else computed block by block
+    """
+    if file_doc.content_hash:
+        return file_doc.content_hash
+
+    content_hash = hashlib.sha256()
+    with open_file(file_doc) as f:
+        while block := f.read(READ_BLOCK_SIZE):
+            content_hash.update(block)
+
+    return content_hash.hexdigest()
+
+def open_file(file_doc):
+    """
+    Open the file for reading in binary mode - directly from disk for local files, else from its content
+    """
+    if not file_doc.is_remote_file:
+        path = file_doc.get_full_path()
+        if os.path.exists(path):
+            return open(path, "rb")
+
+    content = file_doc.get_content()
+    return io.BytesIO(content if isinstance(content, bytes) else content.encode())
+
+def get_extension(file_doc):
+    extension = (file_doc.get_extension()[1] or "").lower()
+
+    if extension not in SUPPORTED_EXTENSIONS:
+        frappe.throw(_("Import template should be of type .csv, .xlsx or .xls"), title="Invalid File Type")
+
+    return extension
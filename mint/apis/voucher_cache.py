@@ -0,0 +1,302 @@
+import frappe
+import datetime
+import json
+from frappe import _
+from frappe.query_builder.functions import Sum
+
+DEFAULT_DOCUMENT_TYPES = ["payment_entry", "journal_entry"]
+
+VOUCHER_DOCUMENT_TYPES = {
+    "payment_entry": "Payment Entry",
+    "journal_entry": "Journal Entry",
+}
+
+# Cached months expire after a day - covers clearance changes made outside of Mint (e.g. the Bank Clearance tool)
+VOUCHER_CACHE_EXPIRY = 24 * 60 * 60
+
+# Marker field of a month hash - only months that were fully loaded from the database are served from the cache
+LOADED_FIELD = "__loaded__"
+
+
+def get_uncleared_vouchers(bank_account: str, from_date: str, to_date: str, document_types: list[str] | str | None = None):
+    """
+    Payment Entries and Journal Entries posted against the GL account of the bank account that are not cleared yet,
+    with the amount that is not yet allocated to any bank transaction.
+
+    Vouchers are served from the per account cache, only the allocated amounts are queried every time.
+    Only the "payment_entry" and "journal_entry" document types are supported.
+    """
+    if isinstance(document_types, str):
+        document_types = json.loads(document_types)
+
+    document_types = document_types or DEFAULT_DOCUMENT_TYPES
+
+    gl_account = frappe.get_cached_value("Bank Account", bank_account, "account")
+
+    if not gl_account:
+        frappe.throw(_("Bank Account {0} is not linked to a GL account").format(bank_account))
+
+    doctypes = {VOUCHER_DOCUMENT_TYPES[document_type] for document_type in document_types if document_type in VOUCHER_DOCUMENT_TYPES}
+
+    vouchers = [voucher for voucher in get_cached_vouchers(gl_account, from_date, to_date) if voucher["doctype"] in doctypes]
+
+    allocated = get_allocated_amounts(vouchers)
+
+    uncleared = []
+    for voucher in vouchers:
+        amount = frappe.utils.flt(voucher["amount"] - allocated.get((voucher["doctype"], voucher["name"]), 0.0), 2)
+        if amount > 0.0:
+            # Cached dicts are shared between calls - do not modify them
+            uncleared.append({**voucher, "amount": amount})
+
+    return uncleared
+
+def get_cached_vouchers(gl_account: str, from_date: str, to_date: str):
+    """
+    Uncleared vouchers of the GL account posted in the date range.
+
+    The cache has one Redis hash per account and month, holding every uncleared voucher posted in that month.
+    Months that are not cached yet are loaded with one query per voucher type and then kept up to date by
+    the Payment Entry / Journal Entry / Bank Transaction hooks (see `update_voucher_cache`).
+    """
+    from_date = frappe.utils.getdate(from_date)
+    to_date = frappe.utils.getdate(to_date)
+
+    vouchers = []
+    missing_months = []
+
+    for month in get_months(from_date, to_date):
+        # Fields come back as bytes from Redis
+        cached = {frappe.safe_decode(field): voucher for field, voucher in (frappe.cache.hgetall(get_voucher_cache_key(gl_account, month)) or {}).items()}
+        if cached.pop(LOADED_FIELD, None):
+            vouchers.extend(cached.values())
+        else:
+            missing_months.append(month)
+
+    if missing_months:
+        # Load the whole months so that they can be cached - the date range is applied below
+        start = missing_months[0]
+        end = get_month_end(missing_months[-1])
+
+        loaded = get_uncleared_payment_entries(gl_account, start, end) + get_uncleared_journal_entries(gl_account, start, end)
+
+        by_month = {month: {} for month in missing_months}
+        for voucher in loaded:
+            month = get_month(voucher["posting_date"])
+            if month in by_month:
+                by_month[month][get_voucher_key(voucher["doctype"], voucher["name"])] = voucher
+
+        for month, month_vouchers in by_month.items():
+            set_cached_month(gl_account, month, month_vouchers)
+            vouchers.extend(month_vouchers.values())
+
+    return [voucher for voucher in vouchers if from_date <= voucher["posting_date"] <= to_date]
+
+def set_cached_month(gl_account: str, month: datetime.date, vouchers: dict):
+    key = get_voucher_cache_key(gl_account, month)
+
+    frappe.cache.delete_value(key)
+
+    for field, voucher in vouchers.items():
+        frappe.cache.hset(key, field, voucher)
+
+    frappe.cache.hset(key, LOADED_FIELD, True)
+    frappe.cache.expire(frappe.cache.make_key(key), VOUCHER_CACHE_EXPIRY)
+
+def update_voucher_cache(doctype: str, name: str):
+    """
+    Re-read a single voucher and update it in the cached months of every GL account it is posted to.
+
+    Called when a voucher is submitted or cancelled, and when its clearance date changes.
+    Accounts or months that are not cached are skipped - they will be loaded fresh when needed.
+    """
+    if doctype not in VOUCHER_DOCUMENT_TYPES.values():
+        return
+
+    if doctype == "Payment Entry":
+        voucher = frappe.db.get_value("Payment Entry", name, ["posting_date", "paid_from", "paid_to"], as_dict=True)
+        accounts = [voucher.paid_from, voucher.paid_to] if voucher else []
+    else:
+        voucher = frappe.db.get_value("Journal Entry", name, ["posting_date"], as_dict=True)
+        accounts = frappe.get_all("Journal Entry Account", filters={"parent": name, "parenttype": "Journal Entry"},
+                                  pluck="account", distinct=True) if voucher else []
+
+    if not voucher:
+        return
+
+    month = get_month(voucher.posting_date)
+    field = get_voucher_key(doctype, name)
+
+    for gl_account in set(accounts):
+        if not gl_account:
+            continue
+
+        key = get_voucher_cache_key(gl_account, month)
+        if not frappe.cache.hget(key, LOADED_FIELD):
+            continue
+
+        if doctype == "Payment Entry":
+            uncleared = get_uncleared_payment_entries(gl_account, names=[name])
+        else:
+            uncleared = get_uncleared_journal_entries(gl_account, names=[name])
+
+        if uncleared:
+            frappe.cache.hset(key, field, uncleared[0])
+        else:
+            frappe.cache.hdel(key, field)
+
+def queue_voucher_cache_update(vouchers: list[tuple[str, str]]):
+    """
+    Update the cached vouchers once the current transaction is committed, so that a rollback does not leave
+    the cache ahead of the database
+    """
+    vouchers = list(set(vouchers))
+
+    def update():
+        for doctype, name in vouchers:
+            update_voucher_cache(doctype, name)
+
+    if vouchers:
+        frappe.db.after_commit.add(update)
+
+def get_voucher_cache_key(gl_account: str, month: datetime.date):
+    return f"mint:voucher_cache:{gl_account}:{month.strftime('%Y-%m')}"
+
+def get_voucher_key(doctype: str, name: str):
+    return f"{doctype}::{name}"
+
+def get_month(date: datetime.date):
+    return date.replace(day=1)
+
+def get_month_end(month: datetime.date):
+    return frappe.utils.get_last_day(month)
+
+def get_months(from_date: datetime.date, to_date: datetime.date):
+    months = []
+    month = get_month(from_date)
+    while month <= to_date:
+        months.append(month)
+        month = frappe.utils.add_months(month, 1)
+    return months
+
+def get_uncleared_payment_entries(gl_account: str, from_date: str | None = None, to_date: str | None = None, names: list[str] | None = None):
+    PaymentEntry = frappe.qb.DocType("Payment Entry")
+
+    query = (
+        frappe.qb.from_(PaymentEntry)
+        .select(
+            PaymentEntry.name,
+            PaymentEntry.paid_from,
+            PaymentEntry.paid_to,
+            PaymentEntry.paid_amount,
+            PaymentEntry.received_amount,
+            PaymentEntry.paid_from_account_currency,
+            PaymentEntry.paid_to_account_currency,
+            PaymentEntry.reference_no,
+            PaymentEntry.reference_date,
+            PaymentEntry.posting_date,
+            PaymentEntry.party_type,
+            PaymentEntry.party,
+        )
+        .where(PaymentEntry.docstatus == 1)
+        .where(PaymentEntry.clearance_date.isnull())
+        .where((PaymentEntry.paid_from == gl_account) | (PaymentEntry.paid_to == gl_account))
+    )
+
+    if from_date and to_date:
+        query = query.where(PaymentEntry.posting_date.between(from_date, to_date))
+
+    if names:
+        query = query.where(PaymentEntry.name.isin(names))
+
+    payment_entries = query.run(as_dict=True)
+
+    vouchers = []
+    for payment_entry in payment_entries:
+        is_deposit = payment_entry.paid_to == gl_account
+        vouchers.append({
+            "doctype": "Payment Entry",
+            "name": payment_entry.name,
+            "amount": payment_entry.received_amount if is_deposit else payment_entry.paid_amount,
+            "is_deposit": is_deposit,
+            "currency": payment_entry.paid_to_account_currency if is_deposit else payment_entry.paid_from_account_currency,
+            "reference_no": payment_entry.reference_no,
+            "reference_date": payment_entry.reference_date,
+            "posting_date": payment_entry.posting_date,
+            "party_type": payment_entry.party_type,
+            "party": payment_entry.party,
+        })
+
+    return vouchers
+
+def get_uncleared_journal_entries(gl_account: str, from_date: str | None = None, to_date: str | None = None, names: list[str] | None = None):
+    JournalEntry = frappe.qb.DocType("Journal Entry")
+    JournalEntryAccount = frappe.qb.DocType("Journal Entry Account")
+
+    query = (
+        frappe.qb.from_(JournalEntryAccount)
+        .join(JournalEntry).on(JournalEntry.name == JournalEntryAccount.parent)
+        .select(
+            JournalEntry.name,
+            JournalEntry.cheque_no,
+            JournalEntry.cheque_date,
+            JournalEntry.posting_date,
+            JournalEntryAccount.account_currency,
+            Sum(JournalEntryAccount.debit_in_account_currency - JournalEntryAccount.credit_in_account_currency).as_("amount"),
+        )
+        .where(JournalEntry.docstatus == 1)
+        .where(JournalEntry.clearance_date.isnull())
+        .where(JournalEntryAccount.account == gl_account)
+        .groupby(JournalEntry.name, JournalEntryAccount.account_currency)
+    )
+
+    if from_date and to_date:
+        query = query.where(JournalEntry.posting_date.between(from_date, to_date))
+
+    if names:
+        query = query.where(JournalEntry.name.isin(names))
+
+    journal_entries = query.run(as_dict=True)
+
+    vouchers = []
+    for journal_entry in journal_entries:
+        if not journal_entry.amount:
+            continue
+
+        vouchers.append({
+            "doctype": "Journal Entry",
+            "name": journal_entry.name,
+            "amount": abs(journal_entry.amount),
+            "is_deposit": journal_entry.amount > 0,
+            "currency": journal_entry.account_currency,
+            "reference_no": journal_entry.cheque_no,
+            "reference_date": journal_entry.cheque_date,
+            "posting_date": journal_entry.posting_date,
+            "party_type": None,
+            "party": None,
+        })
+
+    return vouchers
+
+def get_allocated_amounts(vouchers: list):
+    """
+    Amount of each voucher that is already allocated to submitted bank transactions
+    """
+    if not vouchers:
+        return {}
+
+    BankTransactionPayments = frappe.qb.DocType("Bank Transaction Payments")
+
+    allocations = (
+        frappe.qb.from_(BankTransactionPayments)
+        .select(
+            BankTransactionPayments.payment_document,
+            BankTransactionPayments.payment_entry,
+            Sum(BankTransactionPayments.allocated_amount).as_("allocated_amount"),
+        )
+        .where(BankTransactionPayments.docstatus == 1)
+        .where(BankTransactionPayments.payment_entry.isin([voucher["name"] for voucher in vouchers]))
+        .groupby(BankTransactionPayments.payment_document, BankTransactionPayments.payment_entry)
+    ).run(as_dict=True)
+
+    return {(allocation.payment_document, allocation.payment_entry): allocation.allocated_amount for allocation in allocations}
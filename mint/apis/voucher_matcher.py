@@ -0,0 +1,297 @@
+import re
+import time
+from bisect import bisect_left
+from collections import Counter
+
+
+# References shorter than this are too generic to be looked up in a transaction description
+MIN_REFERENCE_LENGTH = 4
+
+# Limits for the combination (subset sum) search of a single target amount
+SUBSET_MAX_CANDIDATES = 20
+SUBSET_MAX_ITEMS = 5
+SUBSET_TIME_LIMIT = 0.2
+
+NON_ALPHANUMERIC = re.compile(r"[^0-9a-z]+")
+
+
+class VoucherIndex:
+    """
+    Hash indexes over a list of uncleared vouchers of a bank account.
+
+    Vouchers are indexed by direction and amount (in cents, bucketed by the tolerance) and by normalized reference number,
+    so the candidates for a transaction can be found without scanning all vouchers.
+
+    Every voucher is a dict with doctype, name, amount (the amount still to be reconciled), is_deposit, reference_no,
+    reference_date, posting_date, party_type, party and currency.
+    """
+
+    def __init__(self, vouchers: list, amount_tolerance: float = 0.0):
+        self.vouchers = vouchers
+        self.tolerance = get_cents(amount_tolerance)
+        self.bucket_size = max(self.tolerance, 1)
+
+        self.by_amount = {}
+        self.by_reference = {}
+
+        # Vouchers of each direction sorted by amount
+        self.by_direction = {}
+        for is_deposit in (True, False):
+            direction = sorted((voucher for voucher in vouchers if voucher["is_deposit"] == is_deposit),
+                               key=lambda voucher: voucher["amount"])
+            self.by_direction[is_deposit] = (direction, [get_cents(voucher["amount"]) for voucher in direction])
+
+        for voucher in vouchers:
+            key = (voucher["is_deposit"], get_cents(voucher["amount"]) // self.bucket_size)
+            self.by_amount.setdefault(key, []).append(voucher)
+
+            reference = normalize_reference(voucher.get("reference_no"))
+            if reference:
+                self.by_reference.setdefault(reference, []).append(voucher)
+
+    def get_amount_candidates(self, is_deposit: bool, amount: float):
+        """
+        Vouchers in the same direction whose amount is within the tolerance. Returns (voucher, difference in cents) pairs.
+        """
+        cents = get_cents(amount)
+        bucket = cents // self.bucket_size
+
+        candidates = []
+        for key in ((is_deposit, bucket - 1), (is_deposit, bucket), (is_deposit, bucket + 1)):
+            for voucher in self.by_amount.get(key, ()):
+                difference = abs(get_cents(voucher["amount"]) - cents)
+                if difference <= self.tolerance:
+                    candidates.append((voucher, difference))
+
+        return candidates
+
+    def get_reference_candidates(self, transaction):
+        """
+        Vouchers whose reference number is the transaction's reference number or appears as a word in its description
+        """
+        candidates = {}
+
+        references = set()
+        reference = normalize_reference(transaction.get("reference_number"))
+        if reference:
+            references.add(reference)
+
+        for word in (transaction.get("description") or "").lower().split():
+            word = NON_ALPHANUMERIC.sub("", word)
+            if len(word) >= MIN_REFERENCE_LENGTH:
+                references.add(word)
+
+        for reference in references:
+            for voucher in self.by_reference.get(reference, ()):
+                if voucher["is_deposit"] == transaction["is_deposit"]:
+                    candidates[(voucher["doctype"], voucher["name"])] = voucher
+
+        return candidates
+
+    def get_candidates(self, transaction, limit: int | None = None):
+        """
+        Ranked candidate vouchers for a transaction.
+
+        The rank adds up the criteria that match: 2 for an exact amount (1 if only within the tolerance),
+        1 for the reference number and 1 for the party. Ties are broken by the closest posting date.
+        """
+        candidates = {}
+
+        for voucher, difference in self.get_amount_candidates(transaction["is_deposit"], transaction["amount"]):
+            candidates[(voucher["doctype"], voucher["name"])] = get_candidate(transaction, voucher, difference)
+
+        for key, voucher in self.get_reference_candidates(transaction).items():
+            if key in candidates:
+                continue
+            difference = abs(get_cents(voucher["amount"]) - get_cents(transaction["amount"]))
+            candidates[key] = get_candidate(transaction, voucher, difference, within_tolerance=difference <= self.tolerance)
+
+        ranked = sorted(candidates.values(), key=get_rank_key)
+
+        return ranked[:limit] if limit else ranked
+
+    def get_linked_payments(self, transaction, exact_match: bool = False):
+        """
+        The vouchers ERPNext's `get_linked_payments` suggests for a transaction: all vouchers in the same direction
+        and currency with an amount above zero (only the exact amount with `exact_match`).
+
+        Ranked like ERPNext - 1 each for the same reference number, the exact amount and the same party.
+        Ties are broken by the closest posting date.
+        """
+        cents = get_cents(transaction["amount"])
+        currency = transaction.get("currency")
+
+        direction, amounts = self.by_direction[bool(transaction["is_deposit"])]
+
+        candidates = []
+        for voucher, amount in zip(direction, amounts):
+            if amount <= 0 or (exact_match and amount != cents):
+                continue
+
+            if currency and voucher.get("currency") and voucher["currency"] != currency:
+                continue
+
+            candidate = get_candidate(transaction, voucher, abs(amount - cents), within_tolerance=amount == cents)
+            candidate["rank"] = int(bool(voucher.get("reference_no")) and voucher["reference_no"] == transaction.get("reference_number")) \
+                + int(amount == cents) + int(candidate["party_match"])
+            candidates.append(candidate)
+
+        return sorted(candidates, key=get_rank_key)
+
+
+def get_candidate(transaction, voucher, difference: int, within_tolerance: bool = True):
+    reference = normalize_reference(voucher.get("reference_no"))
+    reference_match = bool(reference) and (
+        reference == normalize_reference(transaction.get("reference_number"))
+        or (len(reference) >= MIN_REFERENCE_LENGTH and reference in normalize_reference(transaction.get("description")))
+    )
+
+    party_match = bool(voucher.get("party")) and voucher.get("party_type") == transaction.get("party_type") \
+        and voucher.get("party") == transaction.get("party")
+
+    if not within_tolerance:
+        amount_match = None
+    elif difference == 0:
+        amount_match = "Exact"
+    else:
+        amount_match = "Within Tolerance"
+
+    rank = {"Exact": 2, "Within Tolerance": 1}.get(amount_match, 0) + int(reference_match) + int(party_match)
+
+    date_difference = None
+    if transaction.get("date") and voucher.get("posting_date"):
+        date_difference = abs((voucher["posting_date"] - transaction["date"]).days)
+
+    return {
+        "doctype": voucher["doctype"],
+        "name": voucher["name"],
+        "paid_amount": voucher["amount"],
+        "reference_no": voucher.get("reference_no"),
+        "reference_date": voucher.get("reference_date"),
+        "posting_date": voucher.get("posting_date"),
+        "party_type": voucher.get("party_type"),
+        "party": voucher.get("party"),
+        "currency": voucher.get("currency"),
+        "rank": rank,
+        "amount_match": amount_match,
+        "amount_difference": difference / 100,
+        "reference_match": reference_match,
+        "party_match": party_match,
+        "date_difference": date_difference if date_difference is not None else 0,
+    }
+
+
+def get_rank_key(candidate):
+    return (-candidate["rank"], candidate["date_difference"], candidate["amount_difference"])
+
+
+def get_exact_unique_matches(candidates_by_transaction: dict):
+    """
+    Pairs of transactions and vouchers that can be reconciled without a human looking at them:
+    the transaction has exactly one candidate with the exact amount, and that voucher is not an exact candidate
+    of any other transaction.
+    """
+    voucher_counts = Counter()
+    for candidates in candidates_by_transaction.values():
+        for candidate in candidates:
+            if candidate["amount_match"] == "Exact":
+                voucher_counts[(candidate["doctype"], candidate["name"])] += 1
+
+    matches = []
+    for transaction, candidates in candidates_by_transaction.items():
+        exact = [c for c in candidates if c["amount_match"] == "Exact"]
+        if len(exact) != 1:
+            continue
+
+        candidate = exact[0]
+        if voucher_counts[(candidate["doctype"], candidate["name"])] != 1:
+            continue
+
+        matches.append({
+            "bank_transaction": transaction,
+            "voucher_type": candidate["doctype"],
+            "voucher": candidate["name"],
+            "amount": candidate["paid_amount"],
+        })
+
+    return matches
+
+
+def find_subset_sum(target: int,
+                    items: list,
+                    tolerance: int = 0,
+                    max_candidates: int = SUBSET_MAX_CANDIDATES,
+                    max_items: int = SUBSET_MAX_ITEMS,
+                    time_limit: float = SUBSET_TIME_LIMIT):
+    """
+    Find the smallest combination of at least two items whose amounts add up to the target (within the tolerance).
+
+    `items` is a list of (key, amount in cents), ordered by relevance - only the first `max_candidates` items that
+    fit in the target are considered. Uses meet in the middle: the subset sums of both halves are enumerated
+    (pruned by the target and `max_items`) and every sum of the first half is looked up in the sorted sums of the second.
+
+    Returns the keys of the combination, or None if there is none or the time limit was hit.
+    """
+    items = [item for item in items if 0 < item[1] <= target + tolerance][:max_candidates]
+
+    if len(items) < 2:
+        return None
+
+    deadline = time.monotonic() + time_limit
+
+    half = len(items) // 2
+
+    try:
+        left = get_subset_sums(items[:half], 0, target + tolerance, max_items, deadline)
+        right = get_subset_sums(items[half:], half, target + tolerance, max_items, deadline)
+    except TimeoutError:
+        return None
+
+    right.sort(key=lambda r: r[0])
+    right_sums = [r[0] for r in right]
+
+    best = None
+
+    for checked, (left_sum, left_combination) in enumerate(left):
+        if checked % 256 == 0 and time.monotonic() > deadline:
+            return None
+
+        i = bisect_left(right_sums, target - tolerance - left_sum)
+        while i < len(right_sums) and right_sums[i] <= target + tolerance - left_sum:
+            combination = left_combination + right[i][1]
+            if 2 <= len(combination) <= max_items and (best is None or len(combination) < len(best)):
+                best = combination
+            i += 1
+
+        if best and len(best) == 2:
+            # Nothing smaller is possible
+            break
+
+    if not best:
+        return None
+
+    return [items[idx][0] for idx in best]
+
+def get_subset_sums(items: list, offset: int, limit: int, max_items: int, deadline: float):
+    """
+    All (sum, item indexes) combinations of the items with a sum up to the limit and at most `max_items` items
+    """
+    sums = [(0, ())]
+
+    for idx, (_key, amount) in enumerate(items, start=offset):
+        if time.monotonic() > deadline:
+            raise TimeoutError
+
+        sums.extend([(total + amount, combination + (idx,))
+                     for total, combination in sums
+                     if len(combination) < max_items and total + amount <= limit])
+
+    return sums
+
+
+def normalize_reference(reference: str | None):
+    return NON_ALPHANUMERIC.sub("", (reference or "").lower())
+
+
+def get_cents(amount: float | None):
+    return int(round((amount or 0.0) * 100))
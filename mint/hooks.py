@@ -140,7 +140,22 @@ after_install = "mint.setup.install.after_install"
 doc_events = {
 	"Bank Account": {
 		"on_trash": "mint.overrides.bank_account.on_trash",
-	}
+	},
+	"Bank Transaction": {
+		"on_submit": "mint.overrides.bank_transaction.on_submit",
+		"on_update_after_submit": "mint.overrides.bank_transaction.on_update_after_submit",
+		"on_cancel": "mint.overrides.bank_transaction.on_cancel",
+	},
+	"Payment Entry": {
+		"on_submit": "mint.overrides.payment_entry.on_change",
+		"on_update_after_submit": "mint.overrides.payment_entry.on_change",
+		"on_cancel": "mint.overrides.payment_entry.on_change",
+	},
+	"Journal Entry": {
+		"on_submit": "mint.overrides.journal_entry.on_change",
+		"on_update_after_submit": "mint.overrides.journal_entry.on_change",
+		"on_cancel": "mint.overrides.journal_entry.on_change",
+	},
 }
 
 # Scheduled Tasks
@@ -178,7 +193,7 @@ scheduler_events = {
 # Ignore links to specified DocTypes when deleting documents
 # -----------------------------------------------------------
 
-# ignore_links_on_delete = ["Communication", "ToDo"]
+ignore_links_on_delete = ["Mint Reconciliation Job"]
 
 # Request Events
 # ----------------
@@ -224,9 +239,9 @@ scheduler_events = {
 # Automatically update python controller files with type annotations for this app.
 export_python_type_annotations = True
 
-# default_log_clearing_doctypes = {
-# 	"Logging DocType Name": 30  # days to retain logs
-# }
+default_log_clearing_doctypes = {
+	"Mint Rule Evaluation Log": 30
+}
 
 
 website_route_rules = [{'from_route': '/mint/<path:app_path>', 'to_route': 'mint'}]
\ No newline at end of file
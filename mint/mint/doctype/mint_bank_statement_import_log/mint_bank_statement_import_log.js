@@ -1,8 +1,21 @@
 // Copyright (c) 2026, The Commit Company (Algocode Technologies Pvt. Ltd.) and contributors
 // For license information, please see license.txt
 
-// frappe.ui.form.on("Mint Bank Statement Import Log", {
-// 	refresh(frm) {
+frappe.ui.form.on("Mint Bank Statement Import Log", {
+    refresh(frm) {
 
-// 	},
-// });
+        if (frm.doc.status !== "Completed") {
+            frm.add_custom_button(__("Resume Import"), () => {
+                frappe.call({
+                    method: "mint.apis.statement_import.resume_statement_import",
+                    args: { import_id: frm.doc.name },
+                    freeze: true,
+                }).then(() => {
+                    frappe.show_alert({ message: __("Import queued"), indicator: "green" })
+                    frm.reload_doc()
+                })
+            })
+        }
+
+    },
+});
@@ -17,7 +17,10 @@ class MintBankStatementImportLog(Document):
 		bank_account: DF.Link
 		closing_balance: DF.Currency
 		end_date: DF.Date | None
+		error: DF.Code | None
 		file: DF.Attach
+		imported_transactions: DF.Int
 		number_of_transactions: DF.Int
 		start_date: DF.Date | None
+		status: DF.Literal["Queued", "In Progress", "Completed", "Failed"]
 	# end: auto-generated types
@@ -15,10 +15,12 @@ class MintBankStatementImportTemplate(Document):
 		from frappe.types import DF
 		from mint.mint.doctype.mint_bank_statement_import_template_columns.mint_bank_statement_import_template_columns import MintBankStatementImportTemplateColumns
 
-		amount_expressed_as: DF.Literal["Contains Cr/Dr", "Positive/Negative Value", "Transaction Type containing Cr/Dr", "Transaction Type containing Deposit/Withdrawal"]
+		amount_expressed_as: DF.Literal["Contains Cr/Dr", "Positive/Negative Value", "Transaction Type containing Cr/Dr", "Transaction Type containing Deposit/Withdrawal", "Separate Withdrawal/Deposit Columns"]
 		bank_account: DF.Link
 		column_mapping: DF.Table[MintBankStatementImportTemplateColumns]
 		consider_amount_as_deposit_if: DF.Literal[None]
+		date_format: DF.Data | None
+		header_fingerprint: DF.Data | None
 		header_index: DF.Int
 		statement_type: DF.Literal["Excel/CSV"]
 	# end: auto-generated types
@@ -5,6 +5,7 @@ import frappe
 import re
 from frappe import _
 from frappe.model.document import Document
+from mint.apis.rule_formula import compile_formula
 
 
 class MintBankTransactionRule(Document):
@@ -20,6 +21,7 @@ class MintBankTransactionRule(Document):
 
 		account: DF.Link | None
 		accounts: DF.Table[MintTransactionRuleAccounts]
+		auto_apply: DF.Check
 		bank_entry_type: DF.Literal["Single Account", "Multiple Accounts"]
 		classify_as: DF.Literal["Bank Entry", "Payment Entry", "Transfer"]
 		company: DF.Link
@@ -78,6 +80,15 @@ class MintBankTransactionRule(Document):
 					if index == len(self.accounts) - 1:
 						if account.debit or account.credit:
 							frappe.throw(_("The last account row must not have any debit or credit amounts set."))
+
+					# Formulas are compiled (and cached) here so that invalid ones cannot be saved
+					for formula in (account.debit, account.credit):
+						if formula:
+							compile_formula(formula)
+
+				# Rows before the last one need an amount, else the last row can't balance the entry
+				from mint.apis.rule_actions import validate_rule_account_rows
+				validate_rule_account_rows(self)
 		
 		# Validate regex
 		for rule in self.description_rules:
@@ -91,6 +102,41 @@ class MintBankTransactionRule(Document):
 		if account_company != self.company:
 			frappe.throw(_("Account company does not match with the rule company."))
 	
+	def on_update(self):
+		"""
+		Re-evaluate the transactions that could be affected by this rule
+		"""
+		previous = self.get_doc_before_save()
+
+		if previous and not self.has_matching_criteria_changed(previous):
+			# Matches are unchanged - only the rule's transactions need to be applied if auto apply was turned on
+			if self.auto_apply and not previous.auto_apply:
+				from mint.apis.rules import queue_auto_apply_if_enabled
+				queue_auto_apply_if_enabled(self.company, [self])
+			return
+
+		from mint.apis.rules import queue_rule_change_evaluation
+
+		if previous and previous.company != self.company:
+			queue_rule_change_evaluation(previous.company, previous.priority)
+			queue_rule_change_evaluation(self.company, self.priority)
+		else:
+			priority = min(self.priority, previous.priority) if previous else self.priority
+			queue_rule_change_evaluation(self.company, priority)
+
+	def has_matching_criteria_changed(self, previous):
+		"""
+		Check if any of the fields used to match transactions have changed
+		"""
+		for fieldname in ("company", "priority", "transaction_type", "min_amount", "max_amount"):
+			if self.get(fieldname) != previous.get(fieldname):
+				return True
+
+		def get_description_rules(doc):
+			return [(rule.check, rule.value) for rule in doc.description_rules]
+
+		return get_description_rules(self) != get_description_rules(previous)
+
 	def on_trash(self):
 		"""
 		Delete the matched rule from the bank transaction
@@ -108,4 +154,8 @@ class MintBankTransactionRule(Document):
 		for i, rule in enumerate(rules):
 			frappe.db.set_value("Mint Bank Transaction Rule", rule.name, "priority", i + 1)
 
+		# Transactions matched to this rule are now unmatched - the relative order of the other rules is unchanged
+		from mint.apis.rules import queue_rule_change_evaluation
+		queue_rule_change_evaluation(self.company, self.priority)
+
 
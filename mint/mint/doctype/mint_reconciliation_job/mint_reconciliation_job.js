@@ -0,0 +1,8 @@
+// Copyright (c) 2026, The Commit Company (Algocode Technologies Pvt. Ltd.) and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Mint Reconciliation Job", {
+// 	refresh(frm) {
+
+// 	},
+// });
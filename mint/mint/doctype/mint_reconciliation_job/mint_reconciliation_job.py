@@ -0,0 +1,83 @@
+# Copyright (c) 2026, The Commit Company (Algocode Technologies Pvt. Ltd.) and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class MintReconciliationJob(Document):
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+		from mint.mint.doctype.mint_reconciliation_job_item.mint_reconciliation_job_item import MintReconciliationJobItem
+
+		action: DF.Literal["Apply Rules", "Bank Entry", "Payment Entry", "Internal Transfer", "Match Vouchers", "Unreconcile"]
+		company: DF.Link | None
+		completed_on: DF.Datetime | None
+		error: DF.Code | None
+		failed: DF.Int
+		items: DF.Table[MintReconciliationJobItem]
+		parameters: DF.JSON | None
+		started_on: DF.Datetime | None
+		status: DF.Literal["Queued", "In Progress", "Completed", "Partially Completed", "Failed"]
+		successful: DF.Int
+		total: DF.Int
+	# end: auto-generated types
+
+	def add_item(self, bank_transaction: str, status: str, voucher_type: str | None = None, voucher: str | None = None,
+				 rule: str | None = None, error: str | None = None):
+		"""
+		Record the result for a single bank transaction.
+
+		The row is inserted directly so that a long running job does not have to re-save all previous rows.
+		"""
+		item = self.append("items", {
+			"bank_transaction": bank_transaction,
+			"status": status,
+			"voucher_type": voucher_type,
+			"voucher": voucher,
+			"rule": rule,
+			"error": error,
+		})
+		item.db_insert()
+
+		if status == "Success":
+			self.successful += 1
+		else:
+			self.failed += 1
+
+	def update_progress(self):
+		self.db_set({
+			"status": "In Progress",
+			"successful": self.successful,
+			"failed": self.failed,
+		})
+
+	def complete(self):
+		if not self.failed:
+			status = "Completed"
+		elif self.successful:
+			status = "Partially Completed"
+		else:
+			status = "Failed"
+
+		self.db_set({
+			"status": status,
+			"successful": self.successful,
+			"failed": self.failed,
+			"completed_on": frappe.utils.now_datetime(),
+		})
+
+	def fail(self, error: str):
+		"""
+		Mark the whole job as failed - used when the job itself crashes, not a single transaction
+		"""
+		self.db_set({
+			"status": "Failed",
+			"error": error,
+			"completed_on": frappe.utils.now_datetime(),
+		})
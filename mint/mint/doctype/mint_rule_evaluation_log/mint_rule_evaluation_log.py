@@ -0,0 +1,42 @@
+# Copyright (c) 2026, The Commit Company (Algocode Technologies Pvt. Ltd.) and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class MintRuleEvaluationLog(Document):
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+		from mint.mint.doctype.mint_rule_evaluation_log_rules.mint_rule_evaluation_log_rules import MintRuleEvaluationLogRules
+
+		bank_account: DF.Link | None
+		company: DF.Link
+		duration: DF.Float
+		evaluation_type: DF.Literal["Bank Account", "Rule Change", "New Transactions"]
+		rules: DF.Table[MintRuleEvaluationLogRules]
+		started_on: DF.Datetime | None
+		transactions_evaluated: DF.Int
+		transactions_matched: DF.Int
+	# end: auto-generated types
+
+	@staticmethod
+	def clear_old_logs(days=30):
+		"""
+		Called by the daily log clean up (see `default_log_clearing_doctypes` in hooks.py)
+		"""
+		from frappe.query_builder import Interval
+		from frappe.query_builder.functions import Now
+
+		Log = frappe.qb.DocType("Mint Rule Evaluation Log")
+		LogRule = frappe.qb.DocType("Mint Rule Evaluation Log Rules")
+
+		old_logs = frappe.qb.from_(Log).select(Log.name).where(Log.creation < (Now() - Interval(days=days)))
+
+		frappe.db.delete(LogRule, filters=(LogRule.parenttype == "Mint Rule Evaluation Log") & LogRule.parent.isin(old_logs))
+		frappe.db.delete(Log, filters=(Log.creation < (Now() - Interval(days=days))))
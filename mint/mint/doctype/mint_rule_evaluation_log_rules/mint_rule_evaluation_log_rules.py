@@ -0,0 +1,31 @@
+# Copyright (c) 2026, The Commit Company (Algocode Technologies Pvt. Ltd.) and contributors
+# For license information, please see license.txt
+
+# import frappe
+from frappe.model.document import Document
+
+
+class MintRuleEvaluationLogRules(Document):
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		amount_rejections: DF.Int
+		considered: DF.Int
+		description_checks: DF.Int
+		matches: DF.Int
+		parent: DF.Data
+		parentfield: DF.Data
+		parenttype: DF.Data
+		regex_checks: DF.Int
+		regex_time: DF.Float
+		rule: DF.Data
+		time: DF.Float
+		type_rejections: DF.Int
+	# end: auto-generated types
+
+	pass
@@ -16,6 +16,7 @@ class MintSettings(Document):
 
 		automatically_run_rules_on_unreconciled_transactions: DF.Check
 		bank_statement_gdoc_processor: DF.Data | None
+		cache_rule_evaluation_results: DF.Check
 		google_processor_location: DF.Literal["us", "eu"]
 		google_project_id: DF.Data | None
 		google_service_account_json_key: DF.Password | None
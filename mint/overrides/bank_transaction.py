@@ -0,0 +1,34 @@
+import frappe
+from mint.apis.rules import queue_transactions_for_rule_evaluation
+from mint.apis.voucher_cache import queue_voucher_cache_update
+
+def on_submit(doc, method):
+    """
+    When a bank transaction is submitted, queue it for rule evaluation
+    """
+    if doc.status != "Unreconciled":
+        return
+
+    # Statement imports queue the whole chunk at once
+    if doc.flags.skip_rule_evaluation:
+        return
+
+    if not frappe.db.exists("Mint Bank Transaction Rule", {"company": doc.company}):
+        return
+
+    queue_transactions_for_rule_evaluation(doc.company, [doc.name])
+
+def on_update_after_submit(doc, method):
+    """
+    Reconciling or unreconciling sets or clears the clearance date of the vouchers - including the ones that were just removed
+    """
+    payment_entries = list(doc.payment_entries)
+
+    previous = doc.get_doc_before_save()
+    if previous:
+        payment_entries.extend(previous.payment_entries)
+
+    queue_voucher_cache_update([(row.payment_document, row.payment_entry) for row in payment_entries])
+
+def on_cancel(doc, method):
+    queue_voucher_cache_update([(row.payment_document, row.payment_entry) for row in doc.payment_entries])
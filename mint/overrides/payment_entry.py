@@ -0,0 +1,8 @@
+from mint.apis.voucher_cache import queue_voucher_cache_update
+
+def on_change(doc, method):
+    """
+    Keep the cached uncleared vouchers of the bank accounts in sync when a payment entry is submitted, cancelled
+    or its clearance date changes
+    """
+    queue_voucher_cache_update([(doc.doctype, doc.name)])
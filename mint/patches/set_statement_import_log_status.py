@@ -0,0 +1,14 @@
+import frappe
+
+
+def execute():
+	"""
+	Statement imports before the background import were created in the request itself - every existing log is a completed import
+	"""
+	ImportLog = frappe.qb.DocType("Mint Bank Statement Import Log")
+
+	(
+		frappe.qb.update(ImportLog)
+		.set(ImportLog.status, "Completed")
+		.set(ImportLog.imported_transactions, ImportLog.number_of_transactions)
+	).run()
@@ -0,0 +1,323 @@
+# Copyright (c) 2026, The Commit Company (Algocode Technologies Pvt. Ltd.) and Contributors
+# See license.txt
+
+import json
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, getdate, today
+
+from mint.apis.bank_reconciliation import reconcile_vouchers
+
+COMPANY = "_Test Mint Company"
+ABBR = "_TMC"
+BANK = "_Test Mint Bank"
+BANK_GL_ACCOUNT = f"_Test Mint Bank - {ABBR}"
+CASH_ACCOUNT = f"Cash - {ABBR}"
+
+
+def reconcile_vouchers_with_save(bank_transaction_name: str | int, vouchers: str, is_new_voucher: bool = False):
+	"""
+	Reference implementation of `reconcile_vouchers` that loads and saves the full Bank Transaction document
+	"""
+	vouchers = json.loads(vouchers)
+	transaction = frappe.get_doc("Bank Transaction", bank_transaction_name)
+
+	if 0.0 >= transaction.unallocated_amount:
+		frappe.throw(frappe._("Bank Transaction {0} is already fully reconciled").format(transaction.name))
+
+	# Add the vouchers with zero allocation - the allocation methods set the amounts
+	for voucher in vouchers:
+		transaction.append(
+			"payment_entries",
+			{
+				"payment_document": voucher["payment_doctype"],
+				"payment_entry": voucher["payment_name"],
+				"allocated_amount": 0.0,
+				"reconciliation_type": "Voucher Created" if is_new_voucher else "Matched",
+			},
+		)
+	transaction.validate_duplicate_references()
+	transaction.allocate_payment_entries()
+	transaction.update_allocated_amount()
+	transaction.set_status()
+	transaction.save()
+
+	return transaction
+
+
+class TestReconcileVouchers(FrappeTestCase):
+	"""
+	Parity tests for the optimized `reconcile_vouchers`.
+
+	Every scenario is run twice on fresh transactions and vouchers - once with the reference implementation that
+	saves the full Bank Transaction, and once with the optimized path - and the resulting state has to be identical.
+	"""
+
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.bank_account = make_bank_account()
+
+	def test_exact_match(self):
+		def scenario(reconcile):
+			transaction = self.make_bank_transaction(deposit=100)
+			voucher = self.make_payment_entry(100)
+			return self.reconcile_and_snapshot(reconcile, [(transaction, [voucher])])
+
+		self.assertParity(scenario)
+
+	def test_voucher_smaller_than_transaction(self):
+		def scenario(reconcile):
+			transaction = self.make_bank_transaction(deposit=100)
+			voucher = self.make_payment_entry(60)
+			return self.reconcile_and_snapshot(reconcile, [(transaction, [voucher])])
+
+		self.assertParity(scenario)
+
+	def test_voucher_larger_than_transaction(self):
+		def scenario(reconcile):
+			transaction = self.make_bank_transaction(deposit=100)
+			voucher = self.make_payment_entry(150)
+			return self.reconcile_and_snapshot(reconcile, [(transaction, [voucher])])
+
+		self.assertParity(scenario)
+
+	def test_withdrawal(self):
+		def scenario(reconcile):
+			transaction = self.make_bank_transaction(withdrawal=80)
+			voucher = self.make_payment_entry(80, withdrawal=True)
+			return self.reconcile_and_snapshot(reconcile, [(transaction, [voucher])])
+
+		self.assertParity(scenario)
+
+	def test_multiple_vouchers(self):
+		def scenario(reconcile):
+			transaction = self.make_bank_transaction(deposit=300)
+			vouchers = [self.make_payment_entry(100), self.make_journal_entry(150), self.make_payment_entry(100)]
+			return self.reconcile_and_snapshot(reconcile, [(transaction, vouchers)])
+
+		self.assertParity(scenario)
+
+	def test_vouchers_beyond_transaction_amount_are_dropped(self):
+		def scenario(reconcile):
+			transaction = self.make_bank_transaction(deposit=100)
+			vouchers = [self.make_payment_entry(100), self.make_payment_entry(50)]
+			return self.reconcile_and_snapshot(reconcile, [(transaction, vouchers)])
+
+		self.assertParity(scenario)
+
+	def test_successive_reconciliations(self):
+		def scenario(reconcile):
+			transaction = self.make_bank_transaction(deposit=300)
+			first = self.make_payment_entry(100)
+			second = self.make_journal_entry(200)
+			return self.reconcile_and_snapshot(reconcile, [(transaction, [first]), (transaction, [second])])
+
+		self.assertParity(scenario)
+
+	def test_voucher_split_across_transactions(self):
+		def scenario(reconcile):
+			first = self.make_bank_transaction(deposit=100)
+			second = self.make_bank_transaction(deposit=50, date=add_days(today(), 1))
+			voucher = self.make_payment_entry(150)
+			return self.reconcile_and_snapshot(reconcile, [(first, [voucher]), (second, [voucher])])
+
+		self.assertParity(scenario)
+
+	def test_duplicate_voucher(self):
+		def scenario(reconcile):
+			transaction = self.make_bank_transaction(deposit=300)
+			voucher = self.make_payment_entry(100)
+			return self.reconcile_and_snapshot(reconcile, [(transaction, [voucher]), (transaction, [voucher])])
+
+		result = self.assertParity(scenario)
+		self.assertEqual(result["error"], "ValidationError")
+
+	def test_fully_reconciled_transaction(self):
+		def scenario(reconcile):
+			transaction = self.make_bank_transaction(deposit=100)
+			first = self.make_payment_entry(100)
+			second = self.make_payment_entry(100)
+			return self.reconcile_and_snapshot(reconcile, [(transaction, [first]), (transaction, [second])])
+
+		result = self.assertParity(scenario)
+		self.assertEqual(result["error"], "ValidationError")
+
+	def test_new_voucher_reconciliation_type(self):
+		def scenario(reconcile):
+			transaction = self.make_bank_transaction(deposit=100)
+			voucher = self.make_payment_entry(100)
+			return self.reconcile_and_snapshot(reconcile, [(transaction, [voucher])], is_new_voucher=True)
+
+		self.assertParity(scenario)
+
+	def assertParity(self, scenario):
+		expected = scenario(reconcile_vouchers_with_save)
+		actual = scenario(reconcile_vouchers)
+
+		self.assertEqual(expected, actual)
+		return actual
+
+	def reconcile_and_snapshot(self, reconcile, steps: list, is_new_voucher: bool = False):
+		"""
+		Run the reconciliation steps and return the resulting state with the document names replaced by their
+		position, so that the results of two runs on different documents can be compared.
+		"""
+		transactions = []
+		vouchers = []
+		for transaction, step_vouchers in steps:
+			if transaction not in transactions:
+				transactions.append(transaction)
+			for voucher in step_vouchers:
+				if voucher not in vouchers:
+					vouchers.append(voucher)
+
+		snapshot = {"error": None, "returned": []}
+
+		for transaction, step_vouchers in steps:
+			try:
+				returned = reconcile(transaction, json.dumps([{
+					"payment_doctype": voucher_type,
+					"payment_name": voucher_name,
+					"amount": 0,
+				} for voucher_type, voucher_name in step_vouchers]), is_new_voucher=is_new_voucher)
+			except frappe.ValidationError as e:
+				snapshot["error"] = type(e).__name__
+				frappe.clear_messages()
+				break
+
+			snapshot["returned"].append(get_transaction_state(returned, vouchers))
+
+		snapshot["transactions"] = [
+			get_transaction_state(frappe.get_doc("Bank Transaction", transaction), vouchers) for transaction in transactions
+		]
+		snapshot["clearance_dates"] = [
+			frappe.db.get_value(voucher_type, voucher_name, "clearance_date") for voucher_type, voucher_name in vouchers
+		]
+
+		return snapshot
+
+	def make_bank_transaction(self, deposit: float = 0, withdrawal: float = 0, date: str | None = None):
+		transaction = frappe.get_doc({
+			"doctype": "Bank Transaction",
+			"date": date or today(),
+			"bank_account": self.bank_account,
+			"company": COMPANY,
+			"deposit": deposit,
+			"withdrawal": withdrawal,
+			"currency": "INR",
+			"description": "Mint reconciliation parity test",
+		})
+		transaction.insert()
+		transaction.submit()
+		return transaction.name
+
+	def make_payment_entry(self, amount: float, withdrawal: bool = False):
+		payment_entry = frappe.get_doc({
+			"doctype": "Payment Entry",
+			"company": COMPANY,
+			"payment_type": "Internal Transfer",
+			"posting_date": today(),
+			"paid_from": BANK_GL_ACCOUNT if withdrawal else CASH_ACCOUNT,
+			"paid_to": CASH_ACCOUNT if withdrawal else BANK_GL_ACCOUNT,
+			"paid_amount": amount,
+			"received_amount": amount,
+			"source_exchange_rate": 1,
+			"target_exchange_rate": 1,
+			"reference_no": frappe.generate_hash(length=10),
+			"reference_date": today(),
+		})
+		payment_entry.insert()
+		payment_entry.submit()
+		return ("Payment Entry", payment_entry.name)
+
+	def make_journal_entry(self, amount: float):
+		journal_entry = frappe.get_doc({
+			"doctype": "Journal Entry",
+			"voucher_type": "Bank Entry",
+			"company": COMPANY,
+			"posting_date": today(),
+			"cheque_no": frappe.generate_hash(length=10),
+			"cheque_date": today(),
+			"accounts": [
+				{
+					"account": BANK_GL_ACCOUNT,
+					"bank_account": self.bank_account,
+					"debit_in_account_currency": amount,
+					"debit": amount,
+				},
+				{
+					"account": CASH_ACCOUNT,
+					"credit_in_account_currency": amount,
+					"credit": amount,
+				},
+			],
+		})
+		journal_entry.insert()
+		journal_entry.submit()
+		return ("Journal Entry", journal_entry.name)
+
+
+def get_transaction_state(transaction, vouchers: list):
+	return {
+		"status": transaction.status,
+		"docstatus": transaction.docstatus,
+		"allocated_amount": transaction.allocated_amount,
+		"unallocated_amount": transaction.unallocated_amount,
+		"payment_entries": [
+			{
+				"idx": row.idx,
+				"docstatus": row.docstatus,
+				"voucher": vouchers.index((row.payment_document, row.payment_entry)),
+				"allocated_amount": row.allocated_amount,
+				"reconciliation_type": row.reconciliation_type,
+			}
+			for row in transaction.payment_entries
+		],
+	}
+
+def make_bank_account():
+	if not frappe.db.exists("Company", COMPANY):
+		frappe.get_doc({
+			"doctype": "Company",
+			"company_name": COMPANY,
+			"abbr": ABBR,
+			"default_currency": "INR",
+			"country": "India",
+			"chart_of_accounts": "Standard",
+		}).insert()
+
+	if not frappe.db.exists("Account", BANK_GL_ACCOUNT):
+		frappe.get_doc({
+			"doctype": "Account",
+			"account_name": BANK,
+			"parent_account": f"Bank Accounts - {ABBR}",
+			"account_type": "Bank",
+			"company": COMPANY,
+		}).insert()
+
+	if not frappe.db.exists("Bank", BANK):
+		frappe.get_doc({"doctype": "Bank", "bank_name": BANK}).insert()
+
+	bank_account = frappe.db.get_value("Bank Account", {"account": BANK_GL_ACCOUNT})
+	if not bank_account:
+		bank_account = frappe.get_doc({
+			"doctype": "Bank Account",
+			"account_name": "_Test Mint Account",
+			"bank": BANK,
+			"account": BANK_GL_ACCOUNT,
+			"is_company_account": 1,
+			"company": COMPANY,
+		}).insert().name
+
+	if not frappe.db.exists("Fiscal Year", {"year_start_date": ["<=", today()], "year_end_date": [">=", today()]}):
+		year = getdate(today()).year
+		frappe.get_doc({
+			"doctype": "Fiscal Year",
+			"year": str(year),
+			"year_start_date": f"{year}-01-01",
+			"year_end_date": f"{year}-12-31",
+		}).insert()
+
+	return bank_account
@@ -0,0 +1,50 @@
+# Copyright (c) 2026, The Commit Company (Algocode Technologies Pvt. Ltd.) and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from mint.apis.rule_actions import get_rule_account_entries
+from mint.apis.rule_formula import evaluate_formula
+
+
+def make_rule(*accounts):
+	return frappe._dict({
+		"name": "Test Rule",
+		"accounts": [frappe._dict({"account": account, "debit": debit, "credit": credit}) for account, debit, credit in accounts],
+	})
+
+
+class TestRuleActions(FrappeTestCase):
+
+	def setUp(self):
+		self.transaction = frappe._dict({"unallocated_amount": 100, "withdrawal": 100, "deposit": 0})
+
+	def test_last_row_gets_the_difference(self):
+		rule = make_rule(("Rent", "transaction_amount * 0.25", None), ("Fees", "10", None), ("Expenses", None, None))
+
+		entries = get_rule_account_entries(rule, self.transaction)
+
+		self.assertEqual([entry["debit"] for entry in entries], [25, 10, 65])
+		self.assertEqual(sum(entry["debit"] for entry in entries), 100)
+		self.assertEqual(sum(entry["credit"] for entry in entries), 0)
+
+	def test_zero_row_still_balances(self):
+		rule = make_rule(("Rent", "0", None), ("Expenses", None, None))
+
+		entries = get_rule_account_entries(rule, self.transaction)
+
+		self.assertEqual([entry["debit"] for entry in entries], [0, 100])
+
+	def test_empty_row_before_the_last_row_is_rejected(self):
+		rule = make_rule(("Rent", "", " "), ("Fees", "10", None), ("Expenses", None, None))
+
+		with self.assertRaises(frappe.ValidationError) as error:
+			get_rule_account_entries(rule, self.transaction)
+
+		self.assertIn("Row 1 of rule Test Rule", str(error.exception))
+
+	def test_formula_errors_are_validation_errors(self):
+		for formula in ("min()", "abs(1, 2)", "ceil(1e309)", "1e308 * 10"):
+			with self.assertRaises(frappe.ValidationError):
+				evaluate_formula(formula, 100)
@@ -0,0 +1,212 @@
+# Copyright (c) 2026, The Commit Company (Algocode Technologies Pvt. Ltd.) and Contributors
+# See license.txt
+
+import random
+import re
+import unittest
+from types import SimpleNamespace
+
+from mint.apis.rule_matcher import RuleMatcher
+
+COMPANY = "_Test Company"
+
+
+def make_rule(name, transaction_type="Any", min_amount=0, max_amount=0, description_rules=None, company=COMPANY):
+	return SimpleNamespace(
+		name=name,
+		company=company,
+		transaction_type=transaction_type,
+		min_amount=min_amount,
+		max_amount=max_amount,
+		description_rules=[SimpleNamespace(check=check, value=value) for check, value in description_rules or []],
+	)
+
+
+def make_transaction(description, withdrawal=0.0, deposit=0.0, company=COMPANY):
+	return SimpleNamespace(company=company, description=description, withdrawal=withdrawal, deposit=deposit)
+
+
+def linear_match(transaction, rules):
+	"""
+	The matcher used before `RuleMatcher` - walks the rules in priority order and returns the first match
+	"""
+	for rule in rules:
+		if rule.company != transaction.company:
+			continue
+
+		if rule.transaction_type == "Withdrawal" and transaction.withdrawal == 0.0:
+			continue
+
+		if rule.transaction_type == "Deposit" and transaction.deposit == 0.0:
+			continue
+
+		amount = transaction.withdrawal or transaction.deposit
+		if rule.min_amount and amount < rule.min_amount:
+			continue
+
+		if rule.max_amount and amount > rule.max_amount:
+			continue
+
+		desc = (transaction.description or "").lower()
+		for rule_desc_rule in rule.description_rules:
+			value = (rule_desc_rule.value or "").lower()
+
+			if rule_desc_rule.check == "Contains" and value in desc:
+				return rule
+			if rule_desc_rule.check == "Starts With" and desc.startswith(value):
+				return rule
+			if rule_desc_rule.check == "Ends With" and desc.endswith(value):
+				return rule
+			if rule_desc_rule.check == "Regex" and re.search(value, desc):
+				return rule
+
+	return None
+
+
+class TestRuleMatcher(unittest.TestCase):
+
+	def assertMatches(self, rules, transactions):
+		matcher = RuleMatcher(rules)
+
+		for transaction in transactions:
+			expected = linear_match(transaction, rules)
+			matched = matcher.match(transaction)
+
+			self.assertIs(matched, expected, f"{transaction} matched {getattr(matched, 'name', None)}, expected {getattr(expected, 'name', None)}")
+
+	def test_description_checks(self):
+		rules = [
+			make_rule("contains", description_rules=[("Contains", "Coffee")]),
+			make_rule("starts_with", description_rules=[("Starts With", "UPI/")]),
+			make_rule("ends_with", description_rules=[("Ends With", "/salary")]),
+			make_rule("regex", description_rules=[("Regex", r"^neft-\d+$")]),
+		]
+
+		self.assertEqual(RuleMatcher(rules).match(make_transaction("Morning COFFEE shop", 5)).name, "contains")
+		self.assertEqual(RuleMatcher(rules).match(make_transaction("upi/1234/grocer", 5)).name, "starts_with")
+		self.assertEqual(RuleMatcher(rules).match(make_transaction("ACME/SALARY", deposit=5)).name, "ends_with")
+		self.assertEqual(RuleMatcher(rules).match(make_transaction("NEFT-9912", deposit=5)).name, "regex")
+		self.assertIsNone(RuleMatcher(rules).match(make_transaction("neft-9912 ref", deposit=5)))
+
+		self.assertMatches(rules, [
+			make_transaction(description, withdrawal=5)
+			for description in ("coffee", "x upi/", "upi/", "/salary x", "neft-1", "neft-", "", None)
+		])
+
+	def test_transaction_type(self):
+		rules = [
+			make_rule("withdrawal", transaction_type="Withdrawal", description_rules=[("Contains", "card")]),
+			make_rule("deposit", transaction_type="Deposit", description_rules=[("Contains", "card")]),
+			make_rule("any", description_rules=[("Contains", "card")]),
+		]
+		matcher = RuleMatcher(rules)
+
+		self.assertEqual(matcher.match(make_transaction("card", withdrawal=10)).name, "withdrawal")
+		self.assertEqual(matcher.match(make_transaction("card", deposit=10)).name, "deposit")
+		self.assertEqual(matcher.match(make_transaction("card")).name, "any")
+
+	def test_priority_order(self):
+		rules = [
+			make_rule("first", description_rules=[("Contains", "rent")]),
+			make_rule("second", description_rules=[("Contains", "rent")]),
+		]
+
+		self.assertEqual(RuleMatcher(rules).match(make_transaction("office rent", 10)).name, "first")
+		self.assertEqual(RuleMatcher(rules[::-1]).match(make_transaction("office rent", 10)).name, "second")
+
+	def test_overlapping_patterns(self):
+		rules = [
+			make_rule("long_contains", description_rules=[("Contains", "amazon prime")]),
+			make_rule("short_contains", description_rules=[("Contains", "prime")]),
+			make_rule("nested_contains", description_rules=[("Contains", "azon")]),
+			make_rule("long_prefix", description_rules=[("Starts With", "amazon pay")]),
+			make_rule("short_prefix", description_rules=[("Starts With", "amazon")]),
+			make_rule("long_suffix", description_rules=[("Ends With", "pay india")]),
+			make_rule("short_suffix", description_rules=[("Ends With", "india")]),
+			make_rule("empty_value", description_rules=[("Contains", "")]),
+		]
+
+		self.assertMatches(rules, [
+			make_transaction(description, withdrawal=10)
+			for description in (
+				"amazon prime video", "prime day", "amazon pay india", "amazon pay", "amazonpay",
+				"pay india", "india", "mazon", "azo", "", "amazon",
+			)
+		])
+
+	def test_amount_boundaries(self):
+		rules = [
+			make_rule("min_only", min_amount=100, description_rules=[("Contains", "a")]),
+			make_rule("max_only", max_amount=50, description_rules=[("Contains", "a")]),
+			make_rule("range", min_amount=50, max_amount=100, description_rules=[("Contains", "a")]),
+			make_rule("no_limit", description_rules=[("Contains", "a")]),
+		]
+		matcher = RuleMatcher(rules)
+
+		# Both limits are inclusive
+		self.assertEqual(matcher.match(make_transaction("a", 100)).name, "min_only")
+		self.assertEqual(matcher.match(make_transaction("a", 99.99)).name, "range")
+		self.assertEqual(matcher.match(make_transaction("a", 50)).name, "max_only")
+		self.assertEqual(matcher.match(make_transaction("a", 50.01)).name, "range")
+
+		self.assertMatches(rules, [
+			make_transaction("a", withdrawal=amount)
+			for amount in (0, 0.01, 49.99, 50, 50.01, 75, 99.99, 100, 100.01, 1000)
+		])
+
+	def test_regex_rules(self):
+		rules = [
+			make_rule("regex_first", description_rules=[("Regex", r"inv-\d{4}")]),
+			make_rule("contains", description_rules=[("Contains", "inv")]),
+			make_rule("regex_after_contains", description_rules=[("Regex", r"^inv")]),
+			make_rule("regex_last", description_rules=[("Regex", r"ref \d")]),
+		]
+
+		self.assertEqual(RuleMatcher(rules).match(make_transaction("paid INV-2024", 10)).name, "regex_first")
+		self.assertEqual(RuleMatcher(rules).match(make_transaction("inv-12", 10)).name, "contains")
+
+		self.assertMatches(rules, [
+			make_transaction(description, withdrawal=10)
+			for description in ("inv-2024", "x inv-1234 y", "invoice", "ref 1", "nothing")
+		])
+
+	def test_rules_of_other_companies_are_ignored(self):
+		rules = [
+			make_rule("other", company="_Test Company 2", description_rules=[("Contains", "fee")]),
+			make_rule("own", description_rules=[("Contains", "fee")]),
+		]
+
+		self.assertEqual(RuleMatcher(rules).match(make_transaction("bank fee", 10)).name, "own")
+		self.assertIsNone(RuleMatcher(rules).match(make_transaction("bank fee", 10, company="_Test Company 3")))
+
+	def test_random_rules_match_the_linear_matcher(self):
+		rng = random.Random(42)
+		words = ["ab", "abc", "bc", "cab", "a", "b", "ca"]
+		checks = ["Contains", "Starts With", "Ends With", "Regex"]
+		amounts = [0, 10, 25, 50, 100]
+
+		for _ in range(20):
+			rules = []
+			for idx in range(rng.randint(1, 12)):
+				min_amount = rng.choice(amounts)
+				max_amount = rng.choice([0] + [amount for amount in amounts if amount >= min_amount])
+				description_rules = [
+					(check, f"^{value}" if check == "Regex" else value)
+					for check, value in ((rng.choice(checks), rng.choice(words)) for _ in range(rng.randint(1, 3)))
+				]
+				rules.append(make_rule(f"rule {idx}",
+					transaction_type=rng.choice(["Any", "Withdrawal", "Deposit"]),
+					min_amount=min_amount,
+					max_amount=max_amount,
+					description_rules=description_rules))
+
+			transactions = []
+			for _ in range(100):
+				description = "".join(rng.choice("abc ") for _ in range(rng.randint(0, 6)))
+				amount = rng.choice(amounts + [5, 30, 75, 200])
+				if rng.random() < 0.5:
+					transactions.append(make_transaction(description, withdrawal=amount))
+				else:
+					transactions.append(make_transaction(description, deposit=amount))
+
+			self.assertMatches(rules, transactions)
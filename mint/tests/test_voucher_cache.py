@@ -0,0 +1,65 @@
+# Copyright (c) 2026, The Commit Company (Algocode Technologies Pvt. Ltd.) and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import today
+
+from mint.apis import voucher_cache
+from mint.apis.voucher_cache import get_cached_vouchers, get_month, get_voucher_cache_key
+from mint.tests.test_reconcile_vouchers import BANK_GL_ACCOUNT, CASH_ACCOUNT, COMPANY, make_bank_account
+
+
+class TestVoucherCache(FrappeTestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.bank_account = make_bank_account()
+
+	def setUp(self):
+		frappe.cache.delete_value(get_voucher_cache_key(BANK_GL_ACCOUNT, get_month(frappe.utils.getdate(today()))))
+
+	def test_cached_month_is_not_queried_again(self):
+		payment_entry = self.make_payment_entry(100)
+
+		with patch.object(voucher_cache, "get_uncleared_payment_entries", wraps=voucher_cache.get_uncleared_payment_entries) as payment_entries, \
+			patch.object(voucher_cache, "get_uncleared_journal_entries", wraps=voucher_cache.get_uncleared_journal_entries) as journal_entries:
+
+			first = get_cached_vouchers(BANK_GL_ACCOUNT, today(), today())
+			second = get_cached_vouchers(BANK_GL_ACCOUNT, today(), today())
+
+		self.assertEqual(payment_entries.call_count, 1)
+		self.assertEqual(journal_entries.call_count, 1)
+
+		self.assertIn(payment_entry, [voucher["name"] for voucher in first])
+		self.assertEqual(sorted(voucher["name"] for voucher in first), sorted(voucher["name"] for voucher in second))
+
+	def test_loaded_marker_is_not_a_voucher(self):
+		self.make_payment_entry(100)
+
+		get_cached_vouchers(BANK_GL_ACCOUNT, today(), today())
+		vouchers = get_cached_vouchers(BANK_GL_ACCOUNT, today(), today())
+
+		self.assertTrue(all(isinstance(voucher, dict) and voucher.get("doctype") for voucher in vouchers))
+
+	def make_payment_entry(self, amount: float):
+		payment_entry = frappe.get_doc({
+			"doctype": "Payment Entry",
+			"company": COMPANY,
+			"payment_type": "Internal Transfer",
+			"posting_date": today(),
+			"paid_from": CASH_ACCOUNT,
+			"paid_to": BANK_GL_ACCOUNT,
+			"paid_amount": amount,
+			"received_amount": amount,
+			"source_exchange_rate": 1,
+			"target_exchange_rate": 1,
+			"reference_no": frappe.generate_hash(length=10),
+			"reference_date": today(),
+		})
+		payment_entry.insert()
+		payment_entry.submit()
+		return payment_entry.name